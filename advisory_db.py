@@ -0,0 +1,225 @@
+"""
+Локальная база уязвимостей - индексированное хранилище SQLite, загружаемое из JSON-фида
+Рекомендации индексируются по имени формулы и содержат диапазоны затронутых версий;
+установленные версии сверяются с диапазонами одним пакетным запросом
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Optional
+
+from app_paths import cache_dir
+from inventory import version_key
+
+DB_FILENAME = "advisories.sqlite3"
+# Фид по умолчанию поставляется вместе с приложением
+BUNDLED_FEED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "advisories.json")
+SCHEMA_VERSION = 2
+
+SEVERITIES = ("critical", "high", "medium", "low")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS advisories (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    package TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    summary TEXT,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ranges (
+    advisory INTEGER NOT NULL REFERENCES advisories(rowid) ON DELETE CASCADE,
+    package TEXT NOT NULL,
+    introduced TEXT,
+    fixed TEXT,
+    last_affected TEXT,
+    introduced_key TEXT,
+    fixed_key TEXT,
+    last_affected_key TEXT
+);
+-- Покрывающий индекс: сравнение диапазонов не обращается к самой таблице
+CREATE INDEX IF NOT EXISTS ranges_package ON ranges(package, introduced_key, fixed_key,
+                                                     last_affected_key, advisory, fixed);
+CREATE INDEX IF NOT EXISTS ranges_advisory ON ranges(advisory);
+"""
+
+
+@dataclass
+class AdvisoryMatch:
+    """Установленная версия, попавшая в диапазон рекомендации"""
+    package: str
+    version: Optional[str]
+    advisory_id: str
+    severity: str
+    summary: str = ""
+    fixed: Optional[str] = None
+
+
+def feed_path():
+    """Путь к JSON-фиду: HOMEBREW_MANAGER_ADVISORY_FEED или встроенный файл"""
+    return os.environ.get("HOMEBREW_MANAGER_ADVISORY_FEED") or BUNDLED_FEED
+
+
+def sortable_version(version):
+    """Кодирует версию строкой, порядок которой совпадает с порядком version_key"""
+    if version is None:
+        return None
+    # Ревизия бутылки (1.2.3_1) не меняет версию исходников
+    key = version_key(version.split("_", 1)[0])
+    # 7.70 и 7.70.0 - одна и та же версия (и 7.70rc1 и 7.70.0rc1 тоже)
+    trimmed = []
+    for part in key:
+        if part[0] <= 0:
+            while len(trimmed) > 1 and trimmed[-1] == (2, 0, ""):
+                trimmed.pop()
+        trimmed.append(part)
+    parts = []
+    for kind, number, text in trimmed:
+        if kind == 2:
+            digits = str(number)
+            parts.append(f"n{len(digits):02d}{digits}")
+        elif kind == 1:
+            # Буквенная часть младше числовой ("c" < "n") и заканчивается разделителем
+            parts.append(f"c{text}\x01")
+        elif kind == 0:
+            # Конец версии старше pre-release ("a" < "b") и младше любых продолжений
+            parts.append("b")
+        else:
+            parts.append(f"a{number}{text}\x01")
+    return "".join(parts)
+
+
+def _digest(advisory):
+    return hashlib.sha1(json.dumps(advisory, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class AdvisoryDB:
+    """Хранилище рекомендаций по безопасности"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir(), DB_FILENAME)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        if self._meta("schema_version") != str(SCHEMA_VERSION):
+            # Несовместимая схема - база является производной от фида, пересоздаем
+            self.conn.executescript("DROP TABLE IF EXISTS ranges; DROP TABLE IF EXISTS advisories;"
+                                    "DROP TABLE IF EXISTS meta;")
+        self.conn.executescript(SCHEMA)
+        self._set_meta("schema_version", str(SCHEMA_VERSION))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def _meta(self, key):
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM advisories").fetchone()[0]
+
+    def import_feed(self, path=None, force=False):
+        """Инкрементально импортирует фид, возвращает (добавлено, изменено, удалено)"""
+        path = path or feed_path()
+        stat = os.stat(path)
+        signature = f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        if not force and self._meta("feed_signature") == signature:
+            # Файл не менялся с прошлого импорта
+            return 0, 0, 0
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        advisories = data.get("advisories", []) if isinstance(data, dict) else data
+
+        existing = dict(self.conn.execute("SELECT id, digest FROM advisories"))
+        seen = set()
+        added = changed = 0
+        with self.conn:
+            for advisory in advisories:
+                advisory_id = advisory["id"]
+                seen.add(advisory_id)
+                digest = _digest(advisory)
+                if existing.get(advisory_id) == digest:
+                    continue
+                if advisory_id in existing:
+                    changed += 1
+                    self.conn.execute("DELETE FROM advisories WHERE id = ?", (advisory_id,))
+                else:
+                    added += 1
+                self._insert(advisory, digest)
+
+            removed = [(advisory_id,) for advisory_id in existing if advisory_id not in seen]
+            self.conn.executemany("DELETE FROM advisories WHERE id = ?", removed)
+            self._set_meta("feed_signature", signature)
+        return added, changed, len(removed)
+
+    def _insert(self, advisory, digest):
+        package = advisory["package"]
+        severity = advisory.get("severity", "medium").lower()
+        rowid = self.conn.execute("INSERT INTO advisories (id, package, severity, summary, digest) "
+                                  "VALUES (?, ?, ?, ?, ?)",
+                                  (advisory["id"], package, severity, advisory.get("summary", ""),
+                                   digest)).lastrowid
+        # Рекомендация без диапазонов затрагивает все версии
+        ranges = advisory.get("affected") or [{}]
+        rows = []
+        for item in ranges:
+            bounds = [item.get("introduced"), item.get("fixed"), item.get("last_affected")]
+            rows.append((rowid, package, *bounds, *[sortable_version(bound) for bound in bounds]))
+        self.conn.executemany(
+            "INSERT INTO ranges (advisory, package, introduced, fixed, last_affected, "
+            "introduced_key, fixed_key, last_affected_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def match(self, installed):
+        """Сверяет установленные пакеты [(имя, версия)] с диапазонами, возвращает AdvisoryMatch"""
+        installed = list(installed)
+        if not installed:
+            return []
+
+        # Установленные версии загружаются во временную таблицу, диапазоны сравниваются в SQL
+        # по закодированным ключам; версия NULL попадает только в неограниченные диапазоны.
+        # CROSS JOIN фиксирует порядок: перебор установленных, поиск диапазонов по индексу
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS installed "
+                          "(name TEXT, version TEXT, version_key TEXT)")
+        self.conn.execute("DELETE FROM installed")
+        self.conn.executemany("INSERT INTO installed (name, version, version_key) VALUES (?, ?, ?)",
+                              [(name, version, sortable_version(version)) for name, version in installed])
+        rows = self.conn.execute(
+            "SELECT i.name, i.version, a.id, a.severity, a.summary, r.fixed "
+            "FROM installed i CROSS JOIN ranges r ON r.package = i.name "
+            "JOIN advisories a ON a.rowid = r.advisory "
+            "WHERE (r.introduced_key IS NULL OR i.version_key >= r.introduced_key) "
+            "AND (r.fixed_key IS NULL OR i.version_key < r.fixed_key) "
+            "AND (r.last_affected_key IS NULL OR i.version_key <= r.last_affected_key)").fetchall()
+        self.conn.execute("DELETE FROM installed")
+
+        # Несколько диапазонов одной рекомендации дают одно совпадение
+        matches = {}
+        for name, version, advisory_id, severity, summary, fixed in rows:
+            if (name, advisory_id) not in matches:
+                matches[(name, advisory_id)] = AdvisoryMatch(name, version, advisory_id, severity,
+                                                             summary or "", fixed)
+        rank = {severity: index for index, severity in enumerate(SEVERITIES)}
+        return sorted(matches.values(),
+                      key=lambda item: (rank.get(item.severity, len(SEVERITIES)), item.package))
+
+
+def check_installed(installed, db_path=None, feed=None):
+    """Обновляет базу из фида при необходимости и сверяет с ней установленные пакеты"""
+    db = AdvisoryDB(db_path)
+    try:
+        db.import_feed(feed)
+        return db.match(installed)
+    finally:
+        db.close()
@@ -0,0 +1,36 @@
+"""
+Пути приложения - каталоги кеша и данных Homebrew Manager
+"""
+
+import os
+import sys
+
+APP_NAME = "homebrew-manager"
+
+
+def cache_dir():
+    """Возвращает (и при необходимости создает) каталог кеша приложения"""
+    base = os.environ.get("HOMEBREW_MANAGER_CACHE_DIR")
+    if not base:
+        if sys.platform == 'darwin':
+            base = os.path.join(os.path.expanduser("~"), "Library", "Caches", APP_NAME)
+        else:
+            xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            base = os.path.join(xdg_cache, APP_NAME)
+
+    os.makedirs(base, exist_ok=True)
+    return base
+
+
+def data_dir():
+    """Возвращает (и при необходимости создает) каталог данных приложения"""
+    base = os.environ.get("HOMEBREW_MANAGER_DATA_DIR")
+    if not base:
+        if sys.platform == 'darwin':
+            base = os.path.join(os.path.expanduser("~"), "Library", "Application Support", APP_NAME)
+        else:
+            xdg_data = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+            base = os.path.join(xdg_data, APP_NAME)
+
+    os.makedirs(base, exist_ok=True)
+    return base
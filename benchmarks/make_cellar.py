@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Генератор синтетического Homebrew - Cellar/Caskroom с N пакетами, M версиями и K файлами
+Каждая версия получает INSTALL_RECEIPT.json с зависимостями и opt-симлинк на последнюю версию,
+в cache/api пишется индекс формул как в кеше Homebrew; cask'и могут получить .app в Applications
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+
+
+def write_api_cache(prefix, names, versions=1, outdated=0, extra=0, dependencies=None):
+    """Пишет cache/api/formula.jws.json как в кеше Homebrew; первые outdated формул устарели"""
+    dependencies = dependencies or {}
+    entries = []
+    for index, name in enumerate(names):
+        stable = f"1.{versions if index < outdated else versions - 1}"
+        entries.append({"name": name, "versions": {"stable": stable}, "revision": 0,
+                        "dependencies": dependencies.get(name, [])})
+    # Остальные формулы каталога, которые не установлены
+    entries.extend({"name": f"notinstalled{index:05d}", "versions": {"stable": "2.0"}, "revision": 0}
+                   for index in range(extra))
+    api_dir = os.path.join(prefix, "cache", "api")
+    os.makedirs(api_dir, exist_ok=True)
+    with open(os.path.join(api_dir, "formula.jws.json"), "w") as f:
+        json.dump({"payload": json.dumps(entries), "signatures": []}, f)
+
+
+def make_prefix(prefix, packages=100, versions=1, files=50, casks=10, file_size=4096,
+                hardlinks=True, seed=42, outdated=0, api_formulae=7000, app_files=0):
+    """Создает синтетический префикс Homebrew, возвращает число созданных файлов"""
+    rng = random.Random(seed)
+    cellar = os.path.join(prefix, "Cellar")
+    caskroom = os.path.join(prefix, "Caskroom")
+    opt = os.path.join(prefix, "opt")
+    for path in (cellar, caskroom, opt, os.path.join(prefix, "cache")):
+        os.makedirs(path, exist_ok=True)
+
+    names = [f"pkg{index:04d}" for index in range(packages)]
+    dependencies = {}
+    payload = b"\0" * file_size
+    created = 0
+
+    for index, name in enumerate(names):
+        deps = rng.sample(names[:index], min(index, rng.randint(0, 3))) if index else []
+        dependencies[name] = deps
+        for version_index in range(versions):
+            version = f"1.{version_index}"
+            keg = os.path.join(cellar, name, version)
+            for sub in ("bin", "lib", "share"):
+                os.makedirs(os.path.join(keg, sub), exist_ok=True)
+
+            for file_index in range(files):
+                sub = ("bin", "lib", "share")[file_index % 3]
+                path = os.path.join(keg, sub, f"file{file_index}")
+                with open(path, "wb") as f:
+                    f.write(payload[:rng.randint(1, file_size)])
+                created += 1
+
+            # Жесткая ссылка внутри кега, как у реальных бутылок
+            if hardlinks and files:
+                link = os.path.join(keg, "bin", "hardlink")
+                if not os.path.exists(link):
+                    os.link(os.path.join(keg, "bin", "file0"), link)
+
+            receipt = {
+                "installed_on_request": index % 3 == 0,
+                "installed_as_dependency": index % 3 != 0,
+                "runtime_dependencies": [{"full_name": dep, "version": "1.0"} for dep in deps],
+                "source": {"tap": "homebrew/core"},
+                "time": 1700000000 + index,
+            }
+            with open(os.path.join(keg, "INSTALL_RECEIPT.json"), "w") as f:
+                json.dump(receipt, f)
+
+        link_path = os.path.join(opt, name)
+        if not os.path.lexists(link_path):
+            os.symlink(os.path.join("..", "Cellar", name, f"1.{versions - 1}"), link_path)
+
+    write_api_cache(prefix, names, versions, outdated, max(0, api_formulae - packages), dependencies)
+
+    for index in range(casks):
+        token = f"cask{index:03d}"
+        version_dir = os.path.join(caskroom, token, "1.0")
+        os.makedirs(version_dir, exist_ok=True)
+        with open(os.path.join(version_dir, "payload.bin"), "wb") as f:
+            f.write(payload)
+        created += 1
+        if app_files:
+            created += make_app(prefix, token, f"Cask{index:03d}.app", app_files, file_size, rng)
+
+    return created
+
+
+def make_app(prefix, token, app_name, files, file_size=4096, rng=None):
+    """Описание cask'а в Caskroom/.metadata и его .app в <prefix>/Applications"""
+    rng = rng or random.Random(0)
+    metadata = os.path.join(prefix, "Caskroom", token, ".metadata", "1.0", "20240101000000.000", "Casks")
+    os.makedirs(metadata, exist_ok=True)
+    with open(os.path.join(metadata, f"{token}.json"), "w") as f:
+        json.dump({"token": token, "version": "1.0", "artifacts": [{"app": [app_name]}]}, f)
+
+    payload = b"\0" * file_size
+    contents = os.path.join(prefix, "Applications", app_name, "Contents")
+    # Файлы раскладываются по нескольким фреймворкам, как в настоящих больших приложениях
+    subdirs = [os.path.join(contents, "MacOS")] + [
+        os.path.join(contents, "Frameworks", f"Part{part}.framework", "Versions", "A", "Resources")
+        for part in range(max(1, files // 1000))]
+    for path in subdirs:
+        os.makedirs(path, exist_ok=True)
+    for file_index in range(files):
+        with open(os.path.join(subdirs[file_index % len(subdirs)], f"file{file_index}"), "wb") as f:
+            f.write(payload[:rng.randint(1, file_size)])
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генератор синтетического Cellar/Caskroom")
+    parser.add_argument("prefix", help="каталог префикса Homebrew")
+    parser.add_argument("--packages", type=int, default=100, help="число формул (N)")
+    parser.add_argument("--versions", type=int, default=1, help="версий на формулу (M)")
+    parser.add_argument("--files", type=int, default=50, help="файлов на кег (K)")
+    parser.add_argument("--casks", type=int, default=10, help="число cask'ов")
+    parser.add_argument("--outdated", type=int, default=0, help="устаревших формул в индексе API")
+    parser.add_argument("--app-files", type=int, default=0,
+                        help="файлов в .app каждого cask'а (Applications в префиксе)")
+    parser.add_argument("--clean", action="store_true", help="удалить префикс перед генерацией")
+    args = parser.parse_args()
+
+    if args.clean:
+        shutil.rmtree(args.prefix, ignore_errors=True)
+    created = make_prefix(args.prefix, args.packages, args.versions, args.files, args.casks,
+                          outdated=args.outdated, app_files=args.app_files)
+    print(f"Создано файлов: {created} в {args.prefix}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки Homebrew Manager на синтетическом Homebrew
+Каждый замер выполняется в отдельном процессе с заглушкой brew в PATH и сообщает
+время, число запусков brew, пиковый RSS и пропускную способность очереди вывода в JSON
+"""
+
+import argparse
+import json
+import os
+import platform
+import queue
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+BENCHMARKS = ["sizes_cold", "sizes_warm", "outdated_cold", "outdated_warm", "security",
+              "queue_throughput", "multiple_commands", "concurrent_commands", "cancel",
+              "jobs", "progress", "errors", "cleanup_estimate", "cask_sizes", "sync", "advisories"]
+
+
+# Запас сверх kill_grace, за который отмена должна вернуть управление
+CANCEL_MARGIN = 2.0
+# Допуск на шум замера, с которым сканирование по поддеревьям не должно уступать одному потоку
+SPLIT_MARGIN = 1.1
+# Повторы замера cask_sizes: берется лучшее время
+CASK_SIZES_REPEATS = 3
+
+
+class BenchmarkCheckError(Exception):
+    """Замер нарушил проверяемую границу"""
+
+
+class NullOutput:
+    """Приемник вывода, который только считает строки"""
+
+    def __init__(self):
+        self.lines = 0
+
+    def put(self, message):
+        if isinstance(message, str):
+            self.lines += message.count("\n")
+
+
+def peak_rss_kb(who):
+    """Пиковый RSS в килобайтах (на macOS ru_maxrss в байтах)"""
+    value = resource.getrusage(who).ru_maxrss
+    return value // 1024 if sys.platform == "darwin" else value
+
+
+def bench_sizes(options):
+    from homebrew_core import HomebrewCore
+
+    output = NullOutput()
+    data = HomebrewCore(output).analyze_sizes()
+    return {"packages": len(data["packages"]) if data else 0,
+            "cache": data.get("cache") if data else None,
+            "output_lines": output.lines}
+
+
+def bench_security(options):
+    from homebrew_core import HomebrewCore
+
+    output = NullOutput()
+    data = HomebrewCore(output).security_check()
+    return {"outdated": len(data["outdated"]) if data else 0, "output_lines": output.lines}
+
+
+def bench_outdated(options):
+    from outdated import find_outdated
+
+    outdated, source = find_outdated()
+    return {"outdated": len(outdated), "source": source}
+
+
+def bench_queue_throughput(options):
+    """Поток-производитель пишет строки как stream_command, потребитель - как process_queue"""
+    from output_buffer import OutputBuffer
+    from output_pump import OutputPump
+
+    total = options.lines
+    output_queue = queue.Queue()
+    pump = OutputPump(output_queue)
+    buffer = OutputBuffer()
+
+    def producer():
+        for index in range(total):
+            output_queue.put(f"==> Pouring pkg{index % 500}--1.1.arm64_sonoma.bottle.tar.gz\n")
+        output_queue.put("COMMAND_FINISHED")
+
+    thread = threading.Thread(target=producer)
+    started = time.perf_counter()
+    thread.start()
+
+    max_backlog = 0
+    ticks = 0
+    finished = False
+    while not finished:
+        max_backlog = max(max_backlog, output_queue.qsize())
+        text, done, _, backlog = pump.drain()
+        render_started = time.perf_counter()
+        buffer.append(text)
+        pump.record(text, time.perf_counter() - render_started)
+        ticks += 1
+        finished = bool(done)
+        if not finished:
+            # Интервал, который выбрал бы process_queue
+            time.sleep(pump.next_delay(True, bool(text) or backlog) / 1000)
+
+    elapsed = time.perf_counter() - started
+    thread.join()
+    buffer.close()
+    return {"lines": pump.lines, "ticks": ticks, "max_backlog": max_backlog,
+            "lines_per_second": round(pump.lines / elapsed) if elapsed else None}
+
+
+def bench_multiple_commands(options):
+    from homebrew_core import HomebrewCore
+
+    output = NullOutput()
+    core = HomebrewCore(output)
+    results = core.run_steps(core.plan("maintenance"))
+    return {"steps": {result.step.name: result.status for result in results},
+            "output_lines": output.lines}
+
+
+def bench_concurrent_commands(options):
+    """Много одновременных brew doctor через движок процессов в ограниченную очередь"""
+    from output_pump import QUEUE_MAX_MESSAGES, OutputPump
+    from process_engine import default_engine
+
+    output_queue = queue.Queue(maxsize=QUEUE_MAX_MESSAGES)
+    pump = OutputPump(output_queue)
+    engine = default_engine()
+    started = time.perf_counter()
+    futures = [engine.submit(["brew", "doctor"], output_queue, prefix=f"[{index}] ")
+               for index in range(options.processes)]
+
+    max_backlog = 0
+    peak_active = 0
+    while not all(future.done() for future in futures) or not output_queue.empty():
+        max_backlog = max(max_backlog, output_queue.qsize())
+        peak_active = max(peak_active, engine.active)
+        text, _, _, backlog = pump.drain()
+        pump.record(text, 0.0)
+        time.sleep(pump.next_delay(True, bool(text) or backlog) / 1000)
+
+    elapsed = time.perf_counter() - started
+    return {"processes": options.processes, "peak_active": peak_active,
+            "failed": sum(1 for future in futures if future.result().returncode != 0),
+            "lines": pump.lines, "max_backlog": max_backlog,
+            "lines_per_second": round(pump.lines / elapsed) if elapsed else None}
+
+
+def bench_cancel(options):
+    """Время от отмены до готовности при зависшем brew update (SIGTERM и SIGTERM + SIGKILL)"""
+    from homebrew_core import HomebrewCore
+    from process_engine import default_engine
+
+    engine = default_engine()
+    engine.kill_grace = 1.0
+    report = {"kill_grace": engine.kill_grace}
+    problems = []
+    for label, ignore_term in (("term", False), ("kill", True)):
+        if ignore_term:
+            os.environ["FAKE_BREW_IGNORE_TERM"] = "1"
+        output = NullOutput()
+        core = HomebrewCore(output)
+        outcome = {}
+        thread = threading.Thread(target=lambda: outcome.update(result=core.run_operation("maintenance")),
+                                  daemon=True)
+        thread.start()
+        time.sleep(0.5)
+        started = time.perf_counter()
+        core.cancel()
+        thread.join(engine.kill_grace + CANCEL_MARGIN)
+        elapsed = time.perf_counter() - started
+        ok, data = outcome.get("result", (None, None))
+        steps = {step["name"]: step["status"] for step in (data or {}).get("steps", [])}
+        report[label] = {"cancel_to_ready_ms": round(elapsed * 1000, 1),
+                         "finished": not thread.is_alive(), "steps": steps}
+
+        # Зависшая команда и все незавершенные шаги должны быть отменены в пределах kill_grace + запас
+        if thread.is_alive():
+            problems.append(f"{label}: не завершилось за {engine.kill_grace + CANCEL_MARGIN:.1f}с")
+            continue
+        if steps.get("update") != "cancelled":
+            problems.append(f"{label}: update в статусе {steps.get('update')}")
+        problems.extend(f"{label}: {name} в статусе {status}" for name, status in steps.items()
+                        if status not in ("ok", "cancelled"))
+    if problems:
+        raise BenchmarkCheckError("; ".join(problems))
+    return report
+
+
+def bench_jobs(options):
+    """Полное обслуживание вместе с read-only операциями: по очереди и через менеджер заданий"""
+    from homebrew_core import HomebrewCore
+    from jobs import JobManager
+
+    operations = ["maintenance", "list", "outdated", "doctor", "security", "sizes"]
+
+    started = time.perf_counter()
+    for operation in operations:
+        HomebrewCore(NullOutput()).run_operation(operation)
+    sequential = time.perf_counter() - started
+
+    finished = {}
+    done = threading.Event()
+
+    def on_finish(job):
+        finished[job.operation] = (job.ok, round(time.perf_counter() - started, 3))
+        if len(finished) == len(operations):
+            done.set()
+
+    output = NullOutput()
+    manager = JobManager(output, HomebrewCore, on_finish=on_finish)
+    started = time.perf_counter()
+    for operation in operations:
+        manager.start(operation)
+    done.wait(300)
+    concurrent = time.perf_counter() - started
+    return {"sequential_seconds": round(sequential, 3), "concurrent_seconds": round(concurrent, 3),
+            "speedup": round(sequential / concurrent, 2) if concurrent else None,
+            "finished_at": finished}
+
+
+def bench_progress(options):
+    """brew upgrade без разбора и с разбором маркеров: строки, дошедшие до виджета, и скорость разбора"""
+    from brew_progress import BrewOutputParser, ProgressTracker
+    from process_engine import default_engine
+
+    raw = default_engine().run(["brew", "upgrade"], capture=True).output
+    parser = BrewOutputParser()
+    started = time.perf_counter()
+    visible, events = parser.feed(raw)
+    parse_seconds = time.perf_counter() - started
+
+    tracker = ProgressTracker()
+    for event in events:
+        tracker.update(event)
+    raw_lines = raw.count("\n")
+    return {"raw_lines": raw_lines, "visible_lines": visible.count("\n"), "collapsed": parser.collapsed,
+            "events": len(events), "packages_done": len(tracker.done), "total": tracker.total,
+            "lines_per_second": round(raw_lines / parse_seconds) if parse_seconds else None}
+
+
+def bench_errors(options):
+    """Классификатор ошибок на многомегабайтном логе и чтение вывода команды с ним и без него"""
+    from error_rules import default_rules
+    from process_engine import default_engine
+
+    rules = default_rules()
+    # Обычный вывод установки с редкими строками ошибок
+    lines = []
+    for index in range(options.lines * 4):
+        if index % 1000 == 999:
+            lines.append("curl: (28) Failed to connect to ghcr.io port 443: Connection timed out\n")
+        else:
+            lines.append(f"==> Pouring pkg{index % 500}--1.1.arm64_sonoma.bottle.tar.gz\n")
+    log = "".join(lines)
+    blocks = []
+    for start in range(0, len(log), 64 * 1024):
+        blocks.append(log[start:start + 64 * 1024])
+
+    classifier = rules.classifier()
+    started = time.perf_counter()
+    for block in blocks:
+        classifier.feed(block)
+    found = [diagnosis.rule.id for diagnosis in classifier.finish()]
+    classify_seconds = time.perf_counter() - started
+
+    reader = {}
+    for label in ("plain", "classified"):
+        classifier = rules.classifier()
+        started = time.perf_counter()
+        default_engine().run(["brew", "doctor"], NullOutput(),
+                             on_output=classifier.feed if label == "classified" else None)
+        reader[label] = round(time.perf_counter() - started, 3)
+    megabytes = len(log.encode("utf-8")) / 1e6
+    return {"log_mb": round(megabytes, 1), "classify_mb_per_second": round(megabytes / classify_seconds),
+            "found": found, "reader_seconds": reader}
+
+
+def bench_cleanup_estimate(options):
+    """Оценка очистки при кеше загрузок в десятки ГБ (разреженные файлы) и старых версиях кегов"""
+    from homebrew_core import HomebrewCore
+
+    downloads = os.path.join(options.prefix, "cache", "downloads")
+    os.makedirs(downloads, exist_ok=True)
+    for index in range(200):
+        with open(os.path.join(downloads, f"{index:04d}--pkg{index:04d}--1.0.bottle.tar.gz"), "wb") as f:
+            f.truncate(256 * 1024 * 1024)
+
+    core = HomebrewCore(NullOutput())
+    results = {}
+    for run in ("cold", "warm"):
+        started = time.perf_counter()
+        data = core.estimate_cleanup()
+        results[f"{run}_seconds"] = round(time.perf_counter() - started, 4)
+    results.update({"reclaimable_gb": round(data["total"] / 1024 ** 3, 2),
+                    "cache_hits": data["cache_hits"],
+                    "categories": {item["category"]: item["count"] for item in data["categories"]}})
+    return results
+
+
+def bench_cask_sizes(options):
+    """Огромное .app (options.app_files файлов): одним потоком, по поддеревьям и с бюджетом;
+    по поддеревьям должно быть не медленнее, чем одним потоком"""
+    from make_cellar import make_app
+    from size_scanner import SizeScanner
+
+    results = {"app_files": options.app_files}
+    with tempfile.TemporaryDirectory(prefix="hbm-app-") as prefix:
+        make_app(prefix, "huge", "Huge.app", options.app_files)
+        path = os.path.join(prefix, "Applications", "Huge.app")
+        for label, depth, max_files in (("single", 0, None), ("split", 3, None),
+                                        ("budget", 3, options.app_files // 4)):
+            timings = []
+            for _ in range(CASK_SIZES_REPEATS):
+                started = time.perf_counter()
+                scanned = SizeScanner().scan_packages([("huge", [path])], max_files=max_files,
+                                                      split_depth=depth)
+                timings.append(time.perf_counter() - started)
+            size_bytes, file_count, partial = scanned["huge"]
+            results[f"{label}_seconds"] = round(min(timings), 4)
+            results[f"{label}_files"] = file_count
+        results["budget_partial"] = partial
+    if results["split_seconds"] > results["single_seconds"] * SPLIT_MARGIN:
+        raise BenchmarkCheckError(f"по поддеревьям медленнее: {results['split_seconds']}с "
+                                  f"против {results['single_seconds']}с одним потоком")
+    return results
+
+
+def bench_sync(options):
+    """План синхронизации по манифесту со всеми установленными пакетами: с устаревшими и без них"""
+    from homebrew_core import HomebrewCore
+    from inventory import load_inventory
+
+    inventory = load_inventory()
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="hbm-sync-") as workdir:
+        brewfile = os.path.join(workdir, "Brewfile")
+        with open(brewfile, "w") as f:
+            for package in inventory.formulae:
+                if package.installed_on_request:
+                    f.write(f'brew "{package.name}"\n')
+            for package in inventory.casks:
+                f.write(f'cask "{package.name}"\n')
+        os.environ["HOMEBREW_BUNDLE_FILE"] = brewfile
+
+        # С устаревшими формулами план содержит только их обновление
+        started = time.perf_counter()
+        ok, data = HomebrewCore(NullOutput()).run_operation("sync-plan")
+        results["plan_seconds"] = round(time.perf_counter() - started, 4)
+        results["plan_actions"] = len(data["actions"]) if data else None
+
+        # Соответствующая манифесту установка (индекс API без новых версий): ни одной команды brew
+        from make_cellar import write_api_cache
+
+        api_file = os.path.join(options.prefix, "cache", "api", "formula.jws.json")
+        with open(api_file, "rb") as f:
+            original = f.read()
+        write_api_cache(options.prefix, inventory.formula_names, options.versions,
+                        dependencies={package.name: package.runtime_dependencies for package in inventory.formulae})
+        try:
+            started = time.perf_counter()
+            ok, data = HomebrewCore(NullOutput()).run_operation("sync")
+            results["compliant_seconds"] = round(time.perf_counter() - started, 4)
+            results["compliant_actions"] = len(data["actions"]) if data else None
+        finally:
+            with open(api_file, "wb") as f:
+                f.write(original)
+    return results
+
+
+def bench_advisories(options):
+    """Импорт фида из options.advisories записей и сверка с установленными кегами"""
+    import random
+
+    from advisory_db import AdvisoryDB
+    from inventory import load_inventory
+
+    rng = random.Random(42)
+    workdir = os.environ["HOMEBREW_MANAGER_CACHE_DIR"]
+    os.makedirs(workdir, exist_ok=True)
+    installed = [(pkg.name, pkg.version) for pkg in load_inventory().formulae]
+    # Половина рекомендаций относится к установленным формулам, остальные - к чужим
+    names = [name for name, _ in installed] + [f"other{index}" for index in range(len(installed) or 1)]
+    advisories = []
+    for index in range(options.advisories):
+        # Как в реальных фидах, большинство рекомендаций исправлено в давних версиях
+        introduced = f"0.{rng.randint(0, 4)}"
+        fixed = f"0.{rng.randint(5, 9)}" if rng.random() < 0.98 else "9.0"
+        advisories.append({"id": f"BENCH-{index}", "package": rng.choice(names),
+                           "severity": rng.choice(["high", "medium", "low"]),
+                           "affected": [{"introduced": introduced, "fixed": fixed}]})
+    feed = os.path.join(workdir, "feed.json")
+    with open(feed, "w") as f:
+        json.dump({"advisories": advisories}, f)
+
+    db = AdvisoryDB(os.path.join(workdir, "bench-advisories.sqlite3"))
+    started = time.perf_counter()
+    added, _, _ = db.import_feed(feed)
+    import_seconds = time.perf_counter() - started
+
+    # Повторный импорт измененного фида затрагивает только измененные записи
+    for advisory in advisories[:100]:
+        advisory["severity"] = "critical"
+    with open(feed, "w") as f:
+        json.dump({"advisories": advisories}, f)
+    started = time.perf_counter()
+    _, changed, _ = db.import_feed(feed)
+    reimport_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matches = db.match(installed)
+    match_seconds = time.perf_counter() - started
+    db.close()
+    return {"advisories": added, "installed": len(installed), "matches": len(matches),
+            "import_seconds": round(import_seconds, 4), "changed": changed,
+            "reimport_seconds": round(reimport_seconds, 4),
+            "match_ms": round(match_seconds * 1000, 2)}
+
+
+RUNNERS = {
+    "sizes_cold": bench_sizes,
+    "sizes_warm": bench_sizes,
+    "outdated_cold": bench_outdated,
+    "outdated_warm": bench_outdated,
+    "security": bench_security,
+    "queue_throughput": bench_queue_throughput,
+    "multiple_commands": bench_multiple_commands,
+    "concurrent_commands": bench_concurrent_commands,
+    "cancel": bench_cancel,
+    "jobs": bench_jobs,
+    "progress": bench_progress,
+    "errors": bench_errors,
+    "cleanup_estimate": bench_cleanup_estimate,
+    "cask_sizes": bench_cask_sizes,
+    "sync": bench_sync,
+    "advisories": bench_advisories,
+}
+
+
+def run_single(name, options):
+    """Выполняет один замер в текущем процессе"""
+    started = time.perf_counter()
+    details = RUNNERS[name](options)
+    wall = time.perf_counter() - started
+
+    subprocess_count = 0
+    log_path = os.environ.get("FAKE_BREW_LOG")
+    if log_path and os.path.exists(log_path):
+        with open(log_path) as f:
+            subprocess_count = sum(1 for _ in f)
+
+    return {
+        "name": name,
+        "wall_seconds": round(wall, 4),
+        "subprocesses": subprocess_count,
+        "peak_rss_kb": peak_rss_kb(resource.RUSAGE_SELF),
+        "peak_child_rss_kb": peak_rss_kb(resource.RUSAGE_CHILDREN),
+        "details": details,
+    }
+
+
+def run_isolated(name, options, workdir):
+    """Запускает замер в дочернем процессе с заглушкой brew"""
+    log_path = os.path.join(workdir, f"{name}.calls")
+    if os.path.exists(log_path):
+        os.remove(log_path)
+
+    env = dict(os.environ)
+    env.update({
+        "PATH": os.path.join(BENCH_DIR, "bin") + os.pathsep + env.get("PATH", ""),
+        "FAKE_BREW_PREFIX": options.prefix,
+        "FAKE_BREW_LOG": log_path,
+        "FAKE_BREW_LINES": str(options.lines if name in ("multiple_commands", "concurrent_commands", "progress", "errors") else 20),
+        "FAKE_BREW_OUTDATED": str(options.outdated),
+        "FAKE_BREW_STARTUP": str(options.brew_startup),
+        "HOMEBREW_PREFIX": options.prefix,
+        "HOMEBREW_CACHE": os.path.join(options.prefix, "cache"),
+        "HOMEBREW_CASK_OPTS": f"--appdir={os.path.join(options.prefix, 'Applications')}",
+        "HOMEBREW_MANAGER_CACHE_DIR": os.path.join(workdir, "cache"),
+    })
+    if name == "cancel":
+        env["FAKE_BREW_HANG"] = "update"
+    if name == "jobs":
+        # Команды brew длятся заметное время, как у настоящего Homebrew
+        env["FAKE_BREW_LINE_DELAY"] = "0.01"
+
+    command = [sys.executable, os.path.abspath(__file__), "--single", name,
+               "--prefix", options.prefix, "--lines", str(options.lines),
+               "--advisories", str(options.advisories), "--processes", str(options.processes),
+               "--app-files", str(options.app_files)]
+    result = subprocess.run(command, capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        return {"name": name, "error": result.stderr.strip().splitlines()[-1:] or ["unknown"]}
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки Homebrew Manager")
+    parser.add_argument("--prefix", help="готовый синтетический префикс (иначе будет создан)")
+    parser.add_argument("--packages", type=int, default=200, help="число формул")
+    parser.add_argument("--versions", type=int, default=1, help="версий на формулу")
+    parser.add_argument("--files", type=int, default=50, help="файлов на кег")
+    parser.add_argument("--lines", type=int, default=50000, help="строк вывода для замеров очереди")
+    parser.add_argument("--outdated", type=int, default=20, help="устаревших формул")
+    parser.add_argument("--advisories", type=int, default=20000, help="записей в фиде уязвимостей")
+    parser.add_argument("--processes", type=int, default=32, help="одновременных команд в concurrent_commands")
+    parser.add_argument("--app-files", type=int, default=40000, help="файлов в .app для cask_sizes")
+    parser.add_argument("--brew-startup", type=float, default=0.0,
+                        help="задержка запуска заглушки brew, с")
+    parser.add_argument("--only", action="append", choices=BENCHMARKS, help="выполнить только этот замер")
+    parser.add_argument("--output", help="записать JSON в файл")
+    parser.add_argument("--single", choices=BENCHMARKS, help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.single:
+        print(json.dumps(run_single(options.single, options)))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="hbm-bench-") as workdir:
+        if not options.prefix:
+            from make_cellar import make_prefix
+
+            options.prefix = os.path.join(workdir, "homebrew")
+            make_prefix(options.prefix, options.packages, options.versions, options.files,
+                        outdated=options.outdated, app_files=100)
+
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {"packages": options.packages, "versions": options.versions,
+                       "files": options.files, "lines": options.lines,
+                       "outdated": options.outdated, "brew_startup": options.brew_startup,
+                       "advisories": options.advisories, "processes": options.processes,
+                       "app_files": options.app_files},
+            # *_warm идут после *_cold и используют их кеш
+            "benchmarks": [run_isolated(name, options, workdir) for name in (options.only or BENCHMARKS)],
+        }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    if any("error" in item for item in report["benchmarks"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
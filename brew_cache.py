@@ -0,0 +1,157 @@
+"""
+Кеш команд brew - запоминает результаты read-only команд brew на время сессии
+Записи сбрасываются по TTL, после изменяющих команд (update, upgrade, cleanup, ...)
+и при изменении mtime каталогов Cellar/Caskroom
+"""
+
+import os
+import subprocess
+import threading
+import time
+
+# TTL в секундах по первому аргументу команды; None - до инвалидации
+READ_ONLY_TTL = {
+    '--prefix': None,
+    '--cellar': None,
+    '--repository': None,
+    '--cache': None,
+    '--version': 3600,
+    'config': 600,
+    'list': 600,
+    'leaves': 600,
+    'deps': 600,
+    'uses': 600,
+    'info': 300,
+    'outdated': 300,
+}
+
+MUTATING_COMMANDS = {
+    'update', 'upgrade', 'cleanup', 'autoremove', 'install', 'reinstall',
+    'uninstall', 'remove', 'rm', 'link', 'unlink', 'pin', 'unpin', 'tap', 'untap',
+    'fetch', 'bundle',
+}
+
+
+class BrewCommandCache:
+    """Мемоизация read-only вызовов brew с ключом по argv"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._watched = []
+        self._generation = None
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.invalidations = 0
+
+    def watch(self, paths):
+        """Добавляет каталоги (Cellar, Caskroom), изменение которых сбрасывает кеш"""
+        with self._lock:
+            for path in paths:
+                if path and path not in self._watched:
+                    self._watched.append(path)
+            self._generation = self._current_generation()
+
+    def _current_generation(self):
+        generation = []
+        for path in self._watched:
+            try:
+                generation.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                generation.append(None)
+        return tuple(generation)
+
+    @staticmethod
+    def ttl_for(argv):
+        """TTL для команды или False, если команда не кешируется"""
+        if len(argv) < 2 or os.path.basename(argv[0]) != 'brew':
+            return False
+        return READ_ONLY_TTL.get(argv[1], False)
+
+    @staticmethod
+    def is_mutating(argv):
+        return len(argv) >= 2 and os.path.basename(argv[0]) == 'brew' and argv[1] in MUTATING_COMMANDS
+
+    def run(self, argv, check=True):
+        """Аналог subprocess.run(capture_output=True, text=True) с кешированием"""
+        argv = list(argv)
+        ttl = self.ttl_for(argv)
+        key = tuple(argv)
+
+        if ttl is not False:
+            with self._lock:
+                self._check_generation()
+                entry = self._entries.get(key)
+                if entry and (entry["ttl"] is None or time.monotonic() - entry["time"] < entry["ttl"]):
+                    self.hits += 1
+                    self.saved_seconds += entry["duration"]
+                    return entry["result"]
+
+        started = time.monotonic()
+        result = subprocess.run(argv, capture_output=True, text=True)
+        duration = time.monotonic() - started
+
+        if ttl is not False:
+            with self._lock:
+                self.misses += 1
+                # Ошибки не кешируем - следующий вызов попробует снова
+                if result.returncode == 0:
+                    self._entries[key] = {"result": result, "time": time.monotonic(),
+                                          "ttl": ttl, "duration": duration}
+        elif self.is_mutating(argv):
+            self.invalidate()
+
+        if check and result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, argv,
+                                                output=result.stdout, stderr=result.stderr)
+        return result
+
+    def _check_generation(self):
+        # Вызывается под блокировкой
+        if not self._watched:
+            return
+        generation = self._current_generation()
+        if generation != self._generation:
+            self._generation = generation
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def notify_finished(self, argv):
+        """Сообщает о завершении внешней команды; изменяющие команды сбрасывают кеш"""
+        if self.is_mutating(list(argv)):
+            self.invalidate()
+
+    def invalidate(self):
+        """Полностью очищает кеш"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+            self._generation = self._current_generation()
+
+    def stats(self):
+        """Статистика работы кеша"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "invalidations": self.invalidations,
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
+
+    def summary(self):
+        """Краткая строка со статистикой для вывода"""
+        stats = self.stats()
+        return (f"попаданий {stats['hits']}, промахов {stats['misses']}, "
+                f"сэкономлено {stats['saved_seconds']:.2f}с")
+
+
+# Общий кеш на процесс
+default_cache = BrewCommandCache()
+
+
+def run_brew(argv, check=True):
+    """Запускает команду brew через общий кеш"""
+    return default_cache.run(argv, check=check)
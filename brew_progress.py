@@ -0,0 +1,310 @@
+"""
+Прогресс операций brew - разбор вывода в один проход и оценка оставшегося времени
+Парсер узнает маркеры Homebrew (==> Upgrading/Fetching/Downloading/Pouring, Removing:,
+строки процентов загрузки) одним скомпилированным выражением и превращает их в
+компактные события; строки прогресса загрузки сворачиваются и не доходят до виджета.
+Длительности обновления пакетов запоминаются и служат оценкой для следующих запусков
+"""
+
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+from app_paths import data_dir
+
+TIMINGS_FILENAME = "package_timings.json"
+# Вес нового замера в скользящей оценке длительности пакета
+TIMING_WEIGHT = 0.5
+# Шаг процентов загрузки, с которым отправляются события
+DOWNLOAD_STEP = 5.0
+
+EVENT_PLAN = "plan"
+EVENT_START = "start"
+EVENT_PHASE = "phase"
+EVENT_DOWNLOAD = "download"
+EVENT_DONE = "done"
+EVENT_REMOVED = "removed"
+
+
+@dataclass
+class ProgressEvent:
+    """Событие прогресса операции"""
+    kind: str
+    package: Optional[str] = None
+    total: Optional[int] = None
+    packages: List[str] = field(default_factory=list)
+    estimates: dict = field(default_factory=dict)
+    phase: Optional[str] = None
+    percent: Optional[float] = None
+    job: Optional[int] = None
+
+    def to_dict(self):
+        return {key: value for key, value in asdict(self).items() if value not in (None, [], {})}
+
+
+# Строка полосы загрузки curl: только символы # или полоса с процентом в конце
+_BAR_LINE = r"(?:#+|[#=O\- ]*\d{1,3}(?:\.\d+)?%) *"
+# Одна альтернатива на маркер; серия строк полосы берется одним совпадением.
+# Блок просматривается целиком одним finditer, строки без маркеров копируются срезами
+_MARKERS = re.compile(
+    r"^(?:==> Upgrading (?P<count>\d+) outdated packages?:"
+    r"|==> (?P<verb>Upgrading|Fetching|Downloading|Pouring|Installing) (?!dependencies |downloads )(?P<arg>\S+)(?: .*)?"
+    r"|Removing: (?P<removed>\S+)(?: .*)?"
+    r"|🍺\s+(?P<installed>\S+?):?\s.*"
+    rf"|(?P<bar>{_BAR_LINE}(?:\n{_BAR_LINE})*))$",
+    re.MULTILINE)
+_LAST_PERCENT = re.compile(r"(\d{1,3}(?:\.\d+)?)%")
+_PHASES = {"Fetching": "fetch", "Downloading": "download", "Pouring": "pour", "Installing": "install"}
+PHASE_TITLES = {"fetch": "загрузка", "download": "загрузка", "pour": "установка", "install": "установка"}
+
+
+def _package_from_path(path):
+    """Имя пакета из пути кега .../Cellar/<имя>/<версия>"""
+    parts = path.rstrip("/.").split("/")
+    for marker in ("Cellar", "Caskroom"):
+        if marker in parts:
+            index = parts.index(marker)
+            if index + 1 < len(parts):
+                return parts[index + 1]
+    return None
+
+
+def _package_from_bottle(arg):
+    # pkg--1.1.arm64_sonoma.bottle.tar.gz -> pkg
+    return arg.split("--", 1)[0]
+
+
+class BrewOutputParser:
+    """Однопроходный разбор вывода brew: feed(текст) -> (видимый текст, события)"""
+
+    def __init__(self, estimates=None):
+        self.estimates = estimates or {}
+        self.collapsed = 0
+        self._expect_plan = False
+        self._current = None
+        self._phase = None
+        self._reported = None
+        # Идет загрузка: последний маркер - Fetching/Downloading
+        self._transfer = False
+        self.done = set()
+
+    def feed(self, text):
+        visible = []
+        events = []
+        download = None
+        position = 0
+        if self._expect_plan:
+            position = self._plan(text, 0, events)
+            visible.append(text[:position])
+
+        for found in _MARKERS.finditer(text, position):
+            start, end = found.span()
+            if end < len(text):
+                end += 1  # перевод строки
+            bar = found.group("bar")
+            if bar is not None:
+                if not self._transfer:
+                    # Вне загрузки такие строки - обычный вывод
+                    continue
+                # Полоса загрузки не выводится, вместо нее - событие с последним процентом серии
+                visible.append(text[position:start])
+                position = end
+                self.collapsed += bar.count("\n") + 1
+                # Последняя строка серии может быть полосой без процента
+                percent = _LAST_PERCENT.search(bar, bar.rfind("\n", 0, bar.rfind("%") + 1) + 1)
+                if percent is not None:
+                    download = float(percent.group(1))
+                continue
+
+            if download is not None:
+                self._report_download(download, events)
+                download = None
+            self._transfer = found.group("verb") in ("Fetching", "Downloading")
+            if found.group("count") is not None:
+                self._expect_plan = True
+                end = self._plan(text, end, events)
+            elif found.group("verb") == "Upgrading":
+                self._switch(found.group("arg"), "upgrade", events)
+            elif found.group("verb") is not None:
+                arg = found.group("arg")
+                phase = _PHASES[found.group("verb")]
+                if phase == "pour":
+                    arg = _package_from_bottle(arg)
+                elif phase == "download":
+                    arg = self._current
+                self._switch(arg, phase, events)
+            elif found.group("removed") is not None:
+                events.append(ProgressEvent(EVENT_REMOVED, _package_from_path(found.group("removed"))))
+            elif found.group("installed") is not None:
+                name = _package_from_path(found.group("installed")) or self._current
+                if name not in self.done:
+                    self.done.add(name)
+                    events.append(ProgressEvent(EVENT_DONE, name))
+            visible.append(text[position:end])
+            position = end
+
+        visible.append(text[position:])
+        if download is not None:
+            self._report_download(download, events)
+        return "".join(visible), events
+
+    def _plan(self, text, start, events):
+        """Строка после заголовка: "a 1.0 -> 1.1, b 2.0 -> 2.1"; возвращает позицию за ней"""
+        if start >= len(text):
+            return start
+        self._expect_plan = False
+        newline = text.find("\n", start)
+        end = len(text) if newline < 0 else newline + 1
+        packages = [item.split()[0] for item in text[start:end].strip().split(", ") if item.strip()]
+        events.append(ProgressEvent(EVENT_PLAN, total=len(packages), packages=packages,
+                                    estimates={name: self.estimates[name] for name in packages
+                                               if name in self.estimates}))
+        return end
+
+    def _switch(self, package, phase, events):
+        # События только при смене пакета или этапа: повторы маркеров не доходят до очереди
+        if package in self.done or (package, phase) == (self._current, self._phase):
+            return
+        if package != self._current:
+            self._current = package
+            self._reported = None
+            if phase == "upgrade":
+                events.append(ProgressEvent(EVENT_START, package))
+        self._phase = phase
+        if phase != "upgrade":
+            events.append(ProgressEvent(EVENT_PHASE, package, phase=phase))
+
+    def _report_download(self, percent, events):
+        # Из серии обновлений полосы остается последнее, и только при заметном сдвиге
+        if self._current in self.done or percent == self._reported:
+            return
+        if (self._reported is None or percent < self._reported or percent >= 100
+                or percent - self._reported >= DOWNLOAD_STEP):
+            self._reported = percent
+            events.append(ProgressEvent(EVENT_DOWNLOAD, self._current, percent=percent))
+
+
+class ProgressTracker:
+    """Состояние прогресса одного задания по его событиям"""
+
+    def __init__(self):
+        self.total = None
+        self.packages = []
+        self.estimates = {}
+        self.done = []
+        self.removed = 0
+        self.current = None
+        self.phase = None
+        self.percent = 0.0
+        self.started = time.monotonic()
+        self.current_started = self.started
+
+    def update(self, event):
+        if event.kind == EVENT_PLAN:
+            self.total = event.total
+            self.packages = list(event.packages)
+            self.estimates.update(event.estimates)
+        elif event.kind in (EVENT_START, EVENT_PHASE):
+            if event.package and event.package != self.current and event.package not in self.done:
+                self.current = event.package
+                self.current_started = time.monotonic()
+                self.percent = 0.0
+                self.phase = None
+            self.phase = event.phase or self.phase
+        elif event.kind == EVENT_DOWNLOAD and event.percent is not None:
+            self.percent = event.percent
+        elif event.kind == EVENT_DONE:
+            if event.package and event.package not in self.done:
+                self.done.append(event.package)
+            if event.package == self.current:
+                self.current = None
+                self.percent = 0.0
+        elif event.kind == EVENT_REMOVED:
+            self.removed += 1
+
+    def fraction(self):
+        """Доля выполненного от 0 до 1 или None, если объем неизвестен"""
+        if not self.total:
+            return None
+        # Загрузка - первая половина пакета, установка - вторая
+        partial = 0.0
+        if self.current is not None:
+            partial = 0.5 if self.phase in ("pour", "install") else self.percent / 200
+        return min(1.0, (len(self.done) + partial) / self.total)
+
+    def eta(self, now=None):
+        """Оценка оставшегося времени в секундах по истории и по уже обновленным пакетам"""
+        if not self.total:
+            return None
+        now = time.monotonic() if now is None else now
+        observed = (now - self.started) / len(self.done) if self.done else None
+        remaining = [name for name in self.packages if name not in self.done]
+        if not remaining:
+            remaining = [None] * max(0, self.total - len(self.done))
+        default = observed or (sum(self.estimates.values()) / len(self.estimates) if self.estimates else None)
+        seconds = 0.0
+        for name in remaining:
+            estimate = self.estimates.get(name, default)
+            if estimate is None:
+                return None
+            if name is not None and name == self.current:
+                estimate = max(0.0, estimate - (now - self.current_started))
+            seconds += estimate
+        return seconds
+
+    def describe(self, now=None):
+        """Короткая строка состояния: 3/10 · pkg · ~2 мин"""
+        parts = []
+        if self.total:
+            parts.append(f"{len(self.done)}/{self.total}")
+        elif self.removed:
+            parts.append(f"удалено: {self.removed}")
+        if self.current:
+            title = PHASE_TITLES.get(self.phase)
+            parts.append(f"{self.current} ({title})" if title else self.current)
+        eta = self.eta(now)
+        if eta is not None:
+            parts.append(f"~{format_duration(eta)}")
+        return " · ".join(parts)
+
+
+def format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f} с"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} мин"
+    return f"{seconds / 3600:.1f} ч"
+
+
+class PackageTimings:
+    """Скользящие оценки длительности обновления пакетов между запусками"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), TIMINGS_FILENAME)
+        self.seconds = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.seconds = {name: float(value) for name, value in data.get("packages", {}).items()}
+        except (OSError, ValueError, AttributeError):
+            self.seconds = {}
+
+    def estimates(self, names):
+        return {name: round(self.seconds[name], 3) for name in names if name in self.seconds}
+
+    def record(self, name, seconds):
+        previous = self.seconds.get(name)
+        self.seconds[name] = seconds if previous is None else (
+            TIMING_WEIGHT * seconds + (1 - TIMING_WEIGHT) * previous)
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"packages": {name: round(value, 3) for name, value in self.seconds.items()}}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
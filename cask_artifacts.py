@@ -0,0 +1,144 @@
+"""
+Артефакты cask'ов - пути, которые cask установил вне Caskroom (.app, панели настроек, шрифты)
+Читает описание cask'а, которое brew сохраняет при установке в
+Caskroom/<cask>/.metadata/<версия>/<время>/Casks/<cask>.json (или .rb у старых версий),
+и разрешает артефакты в каталоги назначения так же, как brew (--appdir из HOMEBREW_CASK_OPTS)
+"""
+
+import json
+import os
+import re
+import shlex
+
+from inventory import version_key
+
+# Каталоги назначения по типу артефакта; ключ совпадает с опцией --<ключ> в HOMEBREW_CASK_OPTS
+ARTIFACT_DIRS = {
+    "app": ("appdir", "/Applications"),
+    "suite": ("appdir", "/Applications"),
+    "prefpane": ("prefpanedir", "~/Library/PreferencePanes"),
+    "qlplugin": ("qlplugindir", "~/Library/QuickLook"),
+    "font": ("fontdir", "~/Library/Fonts"),
+    "colorpicker": ("colorpickerdir", "~/Library/ColorPickers"),
+    "screen_saver": ("screen_saverdir", "~/Library/Screen Savers"),
+    "service": ("servicedir", "~/Library/Services"),
+    "audio_unit_plugin": ("audio_unit_plugindir", "~/Library/Audio/Plug-Ins/Components"),
+    "vst_plugin": ("vst_plugindir", "~/Library/Audio/Plug-Ins/VST"),
+    "vst3_plugin": ("vst3_plugindir", "~/Library/Audio/Plug-Ins/VST3"),
+}
+
+# app "Foo.app" или app "Foo.app", target: "Bar.app" в описании на Ruby
+_RUBY_ARTIFACT = re.compile(r'^\s*(' + "|".join(ARTIFACT_DIRS) + r')\s+"([^"]+)"(?:\s*,\s*target:\s*"([^"]+)")?',
+                            re.MULTILINE)
+# depends_on formula: "foo" или depends_on formula: ["foo", "bar"]
+_RUBY_FORMULA_DEPS = re.compile(r'^\s*depends_on\s+formula:\s*(\[[^\]]*\]|"[^"]+")', re.MULTILINE)
+
+
+def artifact_dirs(cask_opts=None):
+    """Каталоги назначения с учетом --appdir=... и подобных опций HOMEBREW_CASK_OPTS"""
+    options = {}
+    try:
+        args = shlex.split(os.environ.get("HOMEBREW_CASK_OPTS", "") if cask_opts is None else cask_opts)
+    except ValueError:
+        # Незакрытая кавычка: опции не разобрать, используем каталоги по умолчанию
+        args = []
+    for arg in args:
+        if arg.startswith("--") and "=" in arg:
+            key, value = arg[2:].split("=", 1)
+            options[key] = value
+    return {kind: os.path.expanduser(options.get(option, default))
+            for kind, (option, default) in ARTIFACT_DIRS.items()}
+
+
+def find_metadata(cask_path, token, version=None):
+    """Последнее сохраненное описание cask'а (путь к .json или .rb) или None"""
+    metadata = os.path.join(cask_path, ".metadata")
+    try:
+        versions = sorted((name for name in os.listdir(metadata) if not name.startswith(".")), key=version_key)
+    except OSError:
+        return None
+    # Сначала текущая версия, затем остальные от новых к старым
+    if version in versions:
+        versions.remove(version)
+        versions.append(version)
+    for candidate in reversed(versions):
+        try:
+            stamps = sorted(os.listdir(os.path.join(metadata, candidate)), reverse=True)
+        except OSError:
+            continue
+        for stamp in stamps:
+            for extension in ("json", "rb"):
+                path = os.path.join(metadata, candidate, stamp, "Casks", f"{token}.{extension}")
+                if os.path.isfile(path):
+                    return path
+    return None
+
+
+def _json_artifacts(data):
+    for artifact in data.get("artifacts") or []:
+        if not isinstance(artifact, dict):
+            continue
+        for kind, args in artifact.items():
+            if kind not in ARTIFACT_DIRS or not isinstance(args, list) or not args:
+                continue
+            source = args[0]
+            options = args[1] if len(args) > 1 and isinstance(args[1], dict) else {}
+            if isinstance(source, str):
+                yield kind, source, options.get("target")
+
+
+def read_artifacts(metadata_path):
+    """Список (тип, источник, цель или None) из описания cask'а"""
+    try:
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except OSError:
+        return []
+    if metadata_path.endswith(".json"):
+        try:
+            return list(_json_artifacts(json.loads(text)))
+        except (ValueError, AttributeError):
+            return []
+    return [(kind, source, target or None) for kind, source, target in _RUBY_ARTIFACT.findall(text)]
+
+
+def formula_dependencies(package):
+    """Формулы, от которых зависит установленный cask, по его описанию; None, если описания нет"""
+    if not package.path:
+        return None
+    metadata_path = find_metadata(package.path, package.name, package.version)
+    if metadata_path is None:
+        return None
+    try:
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except OSError:
+        return None
+    if metadata_path.endswith(".json"):
+        try:
+            deps = (json.loads(text).get("depends_on") or {}).get("formula") or []
+        except (ValueError, AttributeError):
+            return None
+        deps = [deps] if isinstance(deps, str) else deps
+    else:
+        deps = [dep for found in _RUBY_FORMULA_DEPS.findall(text) for dep in re.findall(r'"([^"]+)"', found)]
+    return [dep.split("/")[-1] for dep in deps]
+
+
+def artifact_paths(package, dirs=None):
+    """Существующие пути артефактов установленного cask'а"""
+    if not package.path:
+        return []
+    metadata_path = find_metadata(package.path, package.name, package.version)
+    if metadata_path is None:
+        return []
+    dirs = dirs or artifact_dirs()
+    paths = []
+    for kind, source, target in read_artifacts(metadata_path):
+        target = os.path.expanduser(target or os.path.basename(source))
+        # Абсолютная цель задает путь целиком, относительная - имя в каталоге назначения
+        path = target if os.path.isabs(target) else os.path.join(dirs[kind], target)
+        # Без follow_symlinks: старые cask'и ставят симлинк на .app внутри Caskroom, он уже учтен
+        if path not in paths and os.path.lexists(path) and not os.path.islink(path):
+            paths.append(path)
+    return paths
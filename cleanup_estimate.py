@@ -0,0 +1,175 @@
+"""
+Оценка очистки - сколько места освободят brew cleanup --prune=all и brew autoremove
+Кандидаты собираются с диска без запуска brew: старые версии кегов в Cellar и Caskroom,
+сироты по графу зависимостей, загрузки в кеше Homebrew и логи. Размеры кегов берутся
+из кеша размеров, все остальное сканируется одним пулом потоков
+"""
+
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+CATEGORY_OLD_FORMULAE = "old_formulae"
+CATEGORY_OLD_CASKS = "old_casks"
+CATEGORY_ORPHANS = "orphans"
+CATEGORY_CACHE = "cache"
+CATEGORY_LOGS = "logs"
+
+# Порядок вывода категорий
+CATEGORY_TITLES = {
+    CATEGORY_OLD_FORMULAE: "Старые версии формул",
+    CATEGORY_OLD_CASKS: "Старые версии cask'ов",
+    CATEGORY_ORPHANS: "Неиспользуемые зависимости (autoremove)",
+    CATEGORY_CACHE: "Кеш загрузок",
+    CATEGORY_LOGS: "Логи Homebrew",
+}
+
+# Индекс API в кеше brew cleanup не трогает: без него brew снова скачает весь каталог
+KEPT_CACHE_ENTRIES = {"api"}
+
+
+@dataclass
+class CleanupCandidate:
+    """Каталог или файл, который удалит очистка"""
+    category: str
+    name: str
+    path: str
+    size: int = 0
+    files: int = 0
+    # Версия кега для кеша размеров; у прочих кандидатов None
+    version: Optional[str] = None
+
+
+@dataclass
+class CleanupEstimate:
+    """Результат оценки по категориям"""
+    candidates: List[CleanupCandidate] = field(default_factory=list)
+    cache_hits: int = 0
+
+    @property
+    def total(self):
+        return sum(candidate.size for candidate in self.candidates)
+
+    def by_category(self):
+        """{категория: (байты, число кандидатов, файлы)} в порядке CATEGORY_TITLES"""
+        totals = {category: [0, 0, 0] for category in CATEGORY_TITLES}
+        for candidate in self.candidates:
+            totals[candidate.category][0] += candidate.size
+            totals[candidate.category][1] += 1
+            totals[candidate.category][2] += candidate.files
+        return {category: tuple(value) for category, value in totals.items()}
+
+    def largest(self, category, limit=3):
+        found = [candidate for candidate in self.candidates if candidate.category == category]
+        return sorted(found, key=lambda candidate: candidate.size, reverse=True)[:limit]
+
+
+def homebrew_logs_path(cache_path=None):
+    """Каталог логов Homebrew: HOMEBREW_LOGS, ~/Library/Logs/Homebrew или Logs в кеше"""
+    if os.environ.get("HOMEBREW_LOGS"):
+        return os.environ["HOMEBREW_LOGS"]
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Logs", "Homebrew")
+    return os.path.join(cache_path, "Logs") if cache_path else None
+
+
+def _old_versions(package, category):
+    # Текущая версия идет последней
+    return [CleanupCandidate(category, f"{package.name} {version}", os.path.join(package.path, version),
+                             version=version)
+            for version in package.versions[:-1]]
+
+
+def _top_entries(path, category, skip=()):
+    """Кандидаты верхнего уровня каталога: подкаталоги сканируются, файлы сразу получают размер"""
+    candidates = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name in skip or entry.path in skip:
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        candidates.append(CleanupCandidate(category, entry.name, entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        candidates.append(CleanupCandidate(category, entry.name, entry.path,
+                                                           size=entry.stat(follow_symlinks=False).st_size,
+                                                           files=1))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return candidates
+
+
+def collect_candidates(inventory, orphans=(), pinned=(), cache_path=None, logs_path=None):
+    """Список кандидатов на удаление; размеры файлов верхнего уровня уже известны"""
+    candidates = []
+    for package in inventory.formulae:
+        if not package.path:
+            continue
+        if package.name in orphans:
+            # autoremove удаляет пакет целиком, вместе со старыми версиями
+            candidates.extend(CleanupCandidate(CATEGORY_ORPHANS, f"{package.name} {version}",
+                                               os.path.join(package.path, version), version=version)
+                              for version in package.versions)
+        elif package.name not in pinned:
+            # Закрепленные формулы brew cleanup не трогает
+            candidates.extend(_old_versions(package, CATEGORY_OLD_FORMULAE))
+    for package in inventory.casks:
+        if package.path:
+            candidates.extend(_old_versions(package, CATEGORY_OLD_CASKS))
+
+    if cache_path:
+        skip = set(KEPT_CACHE_ENTRIES)
+        if logs_path:
+            skip.add(logs_path)
+        candidates.extend(_top_entries(cache_path, CATEGORY_CACHE, skip))
+    if logs_path:
+        candidates.extend(_top_entries(logs_path, CATEGORY_LOGS))
+    return candidates
+
+
+def measure_candidates(candidates, scanner=None, size_cache=None):
+    """Считает размеры каталогов параллельно; кеги сначала ищутся в кеше размеров"""
+    from size_scanner import SizeScanner
+
+    pending = []
+    stats = {}
+    hits = 0
+    for index, candidate in enumerate(candidates):
+        if candidate.files:
+            continue
+        if size_cache is not None and candidate.version is not None:
+            try:
+                stat_info = os.lstat(candidate.path)
+            except OSError:
+                continue
+            stats[index] = stat_info
+            cached = size_cache.lookup(candidate.path, stat_info, candidate.version)
+            if cached is not None:
+                candidate.size, candidate.files = cached
+                hits += 1
+                continue
+        pending.append((index, candidate.path))
+
+    def on_result(index, size_bytes, file_count):
+        candidate = candidates[index]
+        candidate.size, candidate.files = size_bytes, file_count
+        if index in stats:
+            size_cache.store(candidate.path, stats[index], candidate.version, size_bytes, file_count)
+
+    (scanner or SizeScanner()).scan(pending, on_result=on_result)
+    if size_cache is not None and stats:
+        # Кеш общий с анализом размеров: записи текущих кегов не выбрасываем
+        size_cache.save(prune=False)
+    return hits
+
+
+def estimate_cleanup(inventory, orphans=(), pinned=(), cache_path=None, logs_path=None,
+                     scanner=None, size_cache=None):
+    """Собирает кандидатов и считает их размеры"""
+    candidates = collect_candidates(inventory, orphans, pinned, cache_path, logs_path)
+    hits = measure_candidates(candidates, scanner, size_cache)
+    return CleanupEstimate(candidates, hits)
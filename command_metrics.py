@@ -0,0 +1,193 @@
+"""
+Метрики команд brew - время, CPU и память дочерних процессов, объем вывода, код возврата
+История хранится на диске и экспортируется в JSON и в textfile для node_exporter
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+from app_paths import data_dir
+
+HISTORY_FILENAME = "command_metrics.json"
+PROM_FILENAME = "homebrew_manager.prom"
+MAX_HISTORY = 1000
+
+
+class CommandUsage:
+    """Накопитель ресурсов одной команды (или нескольких процессов одной операции)"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.wall_seconds = 0.0
+        self.user_seconds = 0.0
+        self.system_seconds = 0.0
+        self.max_rss_bytes = 0
+        self.output_bytes = 0
+        self.output_lines = 0
+
+    def add_output(self, text):
+        self.output_bytes += len(text.encode("utf-8", "replace"))
+        self.output_lines += text.count("\n")
+
+    def add_rusage(self, rusage):
+        if rusage is None:
+            return
+        self.user_seconds += rusage.ru_utime
+        self.system_seconds += rusage.ru_stime
+        # На macOS ru_maxrss в байтах, на Linux - в килобайтах
+        rss = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+        self.max_rss_bytes = max(self.max_rss_bytes, rss)
+
+    def stop(self):
+        self.wall_seconds = time.monotonic() - self.started
+        return self
+
+
+def wait_with_rusage(process):
+    """Дожидается процесса через os.wait4, возвращает (код возврата, rusage)"""
+    if not hasattr(os, "wait4"):
+        return process.wait(), None
+    try:
+        _, status, rusage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        # Процесс уже собран кем-то другим
+        return process.wait(), None
+    returncode = os.waitstatus_to_exitcode(status)
+    # Popen не должен повторно ждать уже собранный процесс
+    process.returncode = returncode
+    return returncode, rusage
+
+
+def command_label(argv):
+    """Короткое имя команды для метрик: brew update -> update"""
+    argv = list(argv)
+    if len(argv) >= 2 and os.path.basename(argv[0]) == "brew":
+        return argv[1]
+    return os.path.basename(argv[0]) if argv else "unknown"
+
+
+class MetricsStore:
+    """Скользящая история метрик команд с экспортом"""
+
+    def __init__(self, directory=None, textfile_dir=None):
+        self.directory = directory or data_dir()
+        self.history_path = os.path.join(self.directory, HISTORY_FILENAME)
+        self.textfile_dir = textfile_dir or os.environ.get("HOMEBREW_MANAGER_TEXTFILE_DIR") or self.directory
+        self._lock = threading.Lock()
+        self.history = []
+        self.totals = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.history = data.get("history", [])[-MAX_HISTORY:]
+            self.totals = data.get("totals", {})
+        except (OSError, ValueError, AttributeError):
+            self.history, self.totals = [], {}
+
+    def record(self, argv, usage, returncode):
+        """Добавляет запись о выполненной команде и обновляет экспорт"""
+        entry = {
+            "command": command_label(argv),
+            "argv": list(argv),
+            "timestamp": round(time.time(), 3),
+            "wall_seconds": round(usage.wall_seconds, 3),
+            "user_seconds": round(usage.user_seconds, 3),
+            "system_seconds": round(usage.system_seconds, 3),
+            "max_rss_bytes": usage.max_rss_bytes,
+            "output_bytes": usage.output_bytes,
+            "output_lines": usage.output_lines,
+            "exit_code": returncode,
+        }
+        with self._lock:
+            self.history.append(entry)
+            del self.history[:-MAX_HISTORY]
+            # Счетчики не обрезаются вместе с историей
+            totals = self.totals.setdefault(entry["command"], {"success": 0, "failure": 0,
+                                                                "wall_seconds": 0.0})
+            totals["success" if returncode == 0 else "failure"] += 1
+            totals["wall_seconds"] = round(totals["wall_seconds"] + usage.wall_seconds, 3)
+            try:
+                self._save()
+            except OSError:
+                pass
+        return entry
+
+    def _save(self):
+        self._atomic_write(self.history_path,
+                           json.dumps({"history": self.history, "totals": self.totals}))
+        self._atomic_write(os.path.join(self.textfile_dir, PROM_FILENAME), self.prometheus_text())
+
+    @staticmethod
+    def _atomic_write(path, text):
+        # node_exporter не должен увидеть наполовину записанный файл
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def latest(self):
+        """Последняя запись по каждой команде"""
+        latest = {}
+        for entry in self.history:
+            latest[entry["command"]] = entry
+        return latest
+
+    def prometheus_text(self):
+        """Метрики в текстовом формате Prometheus"""
+        gauges = [
+            ("duration_seconds", "wall_seconds", "Wall time of the last run"),
+            ("cpu_user_seconds", "user_seconds", "Child user CPU time of the last run"),
+            ("cpu_system_seconds", "system_seconds", "Child system CPU time of the last run"),
+            ("max_rss_bytes", "max_rss_bytes", "Peak child RSS of the last run"),
+            ("output_bytes", "output_bytes", "Bytes of output of the last run"),
+            ("output_lines", "output_lines", "Lines of output of the last run"),
+            ("exit_code", "exit_code", "Exit code of the last run"),
+            ("last_run_timestamp_seconds", "timestamp", "Unix time of the last run"),
+        ]
+        latest = self.latest()
+        lines = []
+        for metric, key, help_text in gauges:
+            name = f"homebrew_manager_command_{metric}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for command in sorted(latest):
+                value = latest[command][key]
+                lines.append(f'{name}{{command="{command}"}} {value if value is not None else "NaN"}')
+
+        name = "homebrew_manager_command_runs_total"
+        lines.append(f"# HELP {name} Number of runs by exit status")
+        lines.append(f"# TYPE {name} counter")
+        for command in sorted(self.totals):
+            for status in ("success", "failure"):
+                lines.append(f'{name}{{command="{command}",status="{status}"}} {self.totals[command][status]}')
+
+        name = "homebrew_manager_command_duration_seconds_total"
+        lines.append(f"# HELP {name} Total wall time of all runs")
+        lines.append(f"# TYPE {name} counter")
+        for command in sorted(self.totals):
+            lines.append(f'{name}{{command="{command}"}} {self.totals[command]["wall_seconds"]}')
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """История, итоги и последние запуски одним согласованным снимком"""
+        with self._lock:
+            return {"history": list(self.history), "totals": dict(self.totals), "latest": self.latest()}
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """Общее хранилище метрик процесса"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = MetricsStore()
+        return _default_store
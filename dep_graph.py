@@ -0,0 +1,234 @@
+"""
+Граф зависимостей установленных формул - прямые и обратные ребра из runtime_dependencies
+По графу за один линейный проход вычисляются листья, сироты и размер исключительного
+замыкания каждого пакета: сколько места освободится, если удалить пакет вместе с
+зависимостями, которые больше никому не нужны (то, что сделает brew autoremove)
+Граф общий для заданий, которые могут идти параллельно, поэтому все изменения и анализ
+выполняются под блокировкой, а результат анализа - неизменяемый снимок
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Set
+
+# Виртуальный корень: от него идут ребра ко всем пакетам, которые никто не держит
+_ROOT = object()
+
+
+@dataclass
+class GraphNode:
+    """Установленная формула в графе"""
+    name: str
+    deps: Set[str] = field(default_factory=set)
+    dependents: Set[str] = field(default_factory=set)
+    on_request: bool = True
+    size: int = 0
+    signature: tuple = ()
+
+
+@dataclass
+class GraphAnalysis:
+    """Результат анализа графа"""
+    leaves: Set[str] = field(default_factory=set)
+    orphans: Set[str] = field(default_factory=set)
+    reclaimable: dict = field(default_factory=dict)
+    # Размеры узлов и число зависящих пакетов на момент анализа
+    sizes: dict = field(default_factory=dict)
+    dependents: dict = field(default_factory=dict)
+
+
+class DependencyGraph:
+    """Граф зависимостей с инкрементальным обновлением"""
+
+    def __init__(self):
+        self.nodes = {}
+        # Ребра к еще не установленным зависимостям ждут появления узла
+        self._pending = {}
+        self._analysis = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, name):
+        return name in self.nodes
+
+    def sync(self, packages):
+        """Приводит граф к списку пакетов, меняя только изменившиеся узлы; возвращает число изменений"""
+        with self._lock:
+            changed = 0
+            names = set()
+            for package in packages:
+                names.add(package.name)
+                if self.update(package):
+                    changed += 1
+            for name in [name for name in self.nodes if name not in names]:
+                self.remove(name)
+                changed += 1
+            return changed
+
+    def refresh(self, packages):
+        """Синхронизирует граф и анализирует его атомарно; возвращает (число изменений, GraphAnalysis)"""
+        with self._lock:
+            changed = self.sync(packages)
+            return changed, self.analyze()
+
+    def update(self, package):
+        """Добавляет или обновляет узел пакета; возвращает False, если ничего не изменилось"""
+        with self._lock:
+            signature = (tuple(package.versions), tuple(sorted(package.runtime_dependencies)),
+                         package.installed_on_request)
+            node = self.nodes.get(package.name)
+            if node is not None and node.signature == signature:
+                # Размер меняется без изменения структуры
+                if package.size is not None and node.size != package.size:
+                    node.size = package.size
+                    self._analysis = None
+                return False
+
+            if node is None:
+                node = GraphNode(package.name)
+                self.nodes[package.name] = node
+                # Уже установленные пакеты могли ссылаться на этот
+                for dependent in self._pending.pop(package.name, set()):
+                    node.dependents.add(dependent)
+
+            for dep in node.deps:
+                self._unlink(package.name, dep)
+            node.deps = set(package.runtime_dependencies) - {package.name}
+            for dep in node.deps:
+                self._link(package.name, dep)
+
+            node.on_request = package.installed_on_request
+            node.size = package.size or 0
+            node.signature = signature
+            self._analysis = None
+            return True
+
+    def remove(self, name):
+        """Удаляет узел; ребра зависящих от него пакетов остаются ожидающими"""
+        with self._lock:
+            node = self.nodes.pop(name, None)
+            if node is None:
+                return
+            for dep in node.deps:
+                self._unlink(name, dep)
+            if node.dependents:
+                self._pending[name] = set(node.dependents)
+            self._analysis = None
+
+    def _link(self, name, dep):
+        target = self.nodes.get(dep)
+        if target is not None:
+            target.dependents.add(name)
+        else:
+            self._pending.setdefault(dep, set()).add(name)
+
+    def _unlink(self, name, dep):
+        target = self.nodes.get(dep)
+        if target is not None:
+            target.dependents.discard(name)
+        else:
+            waiting = self._pending.get(dep)
+            if waiting is not None:
+                waiting.discard(name)
+                if not waiting:
+                    del self._pending[dep]
+
+    def _roots(self):
+        # Пакет держится сам, если установлен по запросу или от него никто не зависит
+        return [name for name, node in self.nodes.items() if node.on_request or not node.dependents]
+
+    def _predecessors(self, name, roots):
+        node = self.nodes[name]
+        preds = list(node.dependents)
+        if name in roots:
+            preds.append(_ROOT)
+        return preds
+
+    def analyze(self):
+        """Листья, сироты и освобождаемое место для всех пакетов (результат кешируется)"""
+        with self._lock:
+            if self._analysis is None:
+                self._analysis = self._build_analysis()
+            return self._analysis
+
+    def _build_analysis(self):
+        # Вызывается под блокировкой
+        roots = set(self._roots())
+        order = self._reverse_postorder(sorted(roots))
+        number = {name: index for index, name in enumerate(order)}
+
+        # Доминаторы по Cooper-Harvey-Kennedy: для ацикличного графа хватает одного прохода
+        # в обратном постпорядке; пакет P доминирует над V, если любой путь от корней к V
+        # проходит через P, то есть V станет ненужным после удаления P
+        idom = {_ROOT: _ROOT}
+        changed = True
+        while changed:
+            changed = False
+            for name in order[1:]:
+                new_idom = None
+                for pred in self._predecessors(name, roots):
+                    if pred not in idom:
+                        continue
+                    new_idom = pred if new_idom is None else self._intersect(pred, new_idom, idom, number)
+                if idom.get(name) != new_idom:
+                    idom[name] = new_idom
+                    changed = True
+
+        # Размер поддерева в дереве доминаторов - исключительное замыкание
+        reclaimable = {name: node.size for name, node in self.nodes.items()}
+        for name in reversed(order[1:]):
+            parent = idom.get(name)
+            if parent is not _ROOT:
+                reclaimable[parent] += reclaimable[name]
+
+        leaves = {name for name, node in self.nodes.items() if not node.dependents}
+        # Сироты - все, что недостижимо от пакетов, установленных по запросу (их удалит brew autoremove)
+        needed = set()
+        stack = [name for name, node in self.nodes.items() if node.on_request]
+        while stack:
+            name = stack.pop()
+            if name in needed:
+                continue
+            needed.add(name)
+            stack.extend(dep for dep in self.nodes[name].deps if dep in self.nodes and dep not in needed)
+        orphans = set(self.nodes) - needed
+
+        sizes = {name: node.size for name, node in self.nodes.items()}
+        dependents = {name: len(node.dependents) for name, node in self.nodes.items()}
+        return GraphAnalysis(leaves, orphans, reclaimable, sizes, dependents)
+
+    @staticmethod
+    def _intersect(first, second, idom, number):
+        # Поднимаемся по дереву доминаторов до общего предка; корень меньше всех
+        def rank(name):
+            return -1 if name is _ROOT else number[name]
+
+        while first != second:
+            while rank(first) > rank(second):
+                first = idom[first]
+            while rank(second) > rank(first):
+                second = idom[second]
+        return first
+
+    def _reverse_postorder(self, roots):
+        """Обратный постпорядок от виртуального корня (итеративный обход в глубину)"""
+        visited = set()
+        postorder = []
+        for root in roots:
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(sorted(self.nodes[root].deps)))]
+            while stack:
+                name, children = stack[-1]
+                for child in children:
+                    if child in self.nodes and child not in visited:
+                        visited.add(child)
+                        stack.append((child, iter(sorted(self.nodes[child].deps))))
+                        break
+                else:
+                    stack.pop()
+                    postorder.append(name)
+        return [_ROOT] + postorder[::-1]
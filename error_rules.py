@@ -0,0 +1,180 @@
+"""
+Классификатор ошибок brew - правила по выводу команды вместо догадок по ее имени
+Шаблоны всех правил собраны в одно регулярное выражение. Вывод проверяется блоками по
+мере поступления: блок просматривается поиском нескольких слов-триггеров (str.find
+быстрее любого регулярного выражения), и общим выражением проверяются только строки с ними.
+Хранятся лишь найденные строки и ограниченный хвост вывода, который проверяется
+целиком при отчете. Правила читаются из error_rules.json и дополняются файлом пользователя
+"""
+
+import json
+import os
+import re
+import threading
+from collections import deque
+
+from app_paths import data_dir
+
+# Правила по умолчанию поставляются вместе с приложением
+BUNDLED_RULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "error_rules.json")
+USER_RULES_FILENAME = "error_rules.json"
+# Последние строки вывода, которые держит классификатор
+TAIL_LINES = 50
+# Сколько найденных строк хранится на одно правило
+EVIDENCE_LINES = 3
+
+
+def user_rules_path():
+    """Файл правил пользователя: HOMEBREW_MANAGER_ERROR_RULES или error_rules.json в каталоге данных"""
+    return os.environ.get("HOMEBREW_MANAGER_ERROR_RULES") or os.path.join(data_dir(), USER_RULES_FILENAME)
+
+
+class ErrorRule:
+    """Правило: шаблон вывода, описание проблемы и советы"""
+
+    def __init__(self, rule_id, title, pattern, suggestions):
+        self.id = rule_id
+        self.title = title
+        self.pattern = pattern
+        self.suggestions = list(suggestions or [])
+
+
+class Diagnosis:
+    """Сработавшее правило и строки вывода, на которых оно сработало"""
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.lines = []
+
+
+class ErrorRules:
+    """Скомпилированный набор правил"""
+
+    def __init__(self, rules, triggers=None, fallback=None):
+        self.rules = []
+        self.invalid = []
+        alternatives = []
+        for rule in rules:
+            try:
+                re.compile(rule.pattern)
+            except re.error as e:
+                self.invalid.append((rule.id, str(e)))
+                continue
+            # Группа с номером правила: по lastgroup сразу видно, какое правило сработало
+            alternatives.append(f"(?P<r{len(self.rules)}>{rule.pattern})")
+            self.rules.append(rule)
+        self.triggers = sorted(set(triggers or []))
+        self.fallback = fallback or {}
+        # Без IGNORECASE выражение проверяется в разы быстрее; регистр задается в правиле через (?i:...)
+        self.matcher = re.compile("|".join(alternatives)) if alternatives else None
+
+    @classmethod
+    def load(cls, paths=None):
+        """Загружает встроенные правила и правила пользователя; правило с тем же id заменяется"""
+        rules = {}
+        triggers = set()
+        fallback = {}
+        for path in paths or [BUNDLED_RULES, user_rules_path()]:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for item in data.get("rules", []):
+                if item.get("id") and item.get("pattern"):
+                    rules[item["id"]] = ErrorRule(item["id"], item.get("title") or item["id"],
+                                                  item["pattern"], item.get("suggestions"))
+            triggers.update(data.get("triggers", []))
+            fallback.update(data.get("fallback", {}))
+        return cls(list(rules.values()), triggers, fallback)
+
+    def classifier(self):
+        return ErrorClassifier(self)
+
+    def fallback_for(self, command):
+        """Общие советы по подкоманде brew, если ни одно правило не сработало"""
+        subcommand = next((arg for arg in command[1:] if not arg.startswith("-")), None)
+        return self.fallback.get(subcommand, [])
+
+
+class ErrorClassifier:
+    """Потоковая классификация вывода одной команды"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.diagnoses = {}
+        self.tail = deque(maxlen=TAIL_LINES)
+        self._lock = threading.Lock()
+
+    def feed(self, text):
+        """Проверяет очередной блок вывода (целые строки)"""
+        with self._lock:
+            # Хвост берется с конца блока, без разбиения всего блока на строки
+            start = len(text)
+            for _ in range(TAIL_LINES + 1):
+                start = text.rfind("\n", 0, start)
+                if start < 0:
+                    break
+            self.tail.extend(text[start + 1:].splitlines())
+
+            if self.rules.matcher is None:
+                return
+            checked = set()
+            for trigger in self.rules.triggers:
+                index = text.find(trigger)
+                while index >= 0:
+                    line_start = text.rfind("\n", 0, index) + 1
+                    line_end = text.find("\n", index)
+                    if line_end < 0:
+                        line_end = len(text)
+                    if line_start not in checked:
+                        checked.add(line_start)
+                        self._match(text[line_start:line_end])
+                    index = text.find(trigger, line_end)
+
+    def _match(self, line):
+        for found in self.rules.matcher.finditer(line):
+            rule = self.rules.rules[int(found.lastgroup[1:])]
+            diagnosis = self.diagnoses.get(rule.id)
+            if diagnosis is None:
+                diagnosis = self.diagnoses[rule.id] = Diagnosis(rule)
+            line = line.strip()
+            if len(diagnosis.lines) < EVIDENCE_LINES and line not in diagnosis.lines:
+                diagnosis.lines.append(line)
+
+    def finish(self):
+        """Проверяет хвост целиком: в нем могут быть ошибки без слов-триггеров"""
+        with self._lock:
+            if self.rules.matcher is not None:
+                for line in self.tail:
+                    self._match(line)
+            return list(self.diagnoses.values())
+
+    def report(self, command=None):
+        """Строки вывода с найденными проблемами и советами"""
+        lines = []
+        for diagnosis in self.finish():
+            lines.append(f"🩺 {diagnosis.rule.title}\n")
+            for line in diagnosis.lines[:1]:
+                lines.append(f"   > {line}\n")
+            for suggestion in diagnosis.rule.suggestions:
+                lines.append(f"   {suggestion}\n")
+        if not lines and command:
+            suggestions = self.rules.fallback_for(command)
+            if suggestions:
+                lines.append("💡 Возможные решения:\n")
+                lines.extend(f"   {suggestion}\n" for suggestion in suggestions)
+        return lines
+
+
+_default_rules = None
+_default_lock = threading.Lock()
+
+
+def default_rules():
+    """Общий набор правил процесса"""
+    global _default_rules
+    with _default_lock:
+        if _default_rules is None:
+            _default_rules = ErrorRules.load()
+        return _default_rules
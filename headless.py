@@ -0,0 +1,134 @@
+"""
+Headless-режим Homebrew Manager - выполнение операций без графического интерфейса
+Вывод либо обычным текстом, либо потоком NDJSON (одно событие JSON на строку)
+"""
+
+import json
+import sys
+import threading
+import time
+
+from homebrew_core import HomebrewCore
+
+
+class TextOutput:
+    """Печатает вывод операций как есть"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def put(self, message):
+        # События прогресса нужны только окну и NDJSON
+        if not isinstance(message, str):
+            return
+        with self._lock:
+            self.stream.write(message)
+            self.stream.flush()
+
+    def result(self, operation, ok, data, duration):
+        pass
+
+
+class NDJSONOutput:
+    """Печатает вывод операций событиями NDJSON"""
+
+    def __init__(self, operation, stream=None):
+        self.operation = operation
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def put(self, message):
+        if not isinstance(message, str):
+            self.emit({"event": "progress", "op": self.operation, **message.to_dict()})
+            return
+        for line in message.splitlines():
+            if line.strip():
+                self.emit({"event": "output", "op": self.operation, "text": line})
+
+    def result(self, operation, ok, data, duration):
+        self.emit({"event": "result", "op": operation, "ok": ok,
+                   "duration": round(duration, 3), "data": data})
+
+
+def run(operation, as_json=False):
+    """Выполняет операцию, возвращает код выхода процесса"""
+    output = NDJSONOutput(operation) if as_json else TextOutput()
+    core = HomebrewCore(output)
+    outcome = {}
+    done = threading.Event()
+
+    def work():
+        try:
+            outcome["result"] = core.run_operation(operation)
+        except Exception as e:
+            output.put(f"❌ Ошибка выполнения: {str(e)}\n")
+        finally:
+            done.set()
+
+    started = time.monotonic()
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+    # Ждем по событию: прерванный Ctrl+C Thread.join может потом вернуться раньше времени
+    try:
+        while not done.wait(0.2):
+            pass
+    except KeyboardInterrupt:
+        # Команды brew работают в своих группах процессов и Ctrl+C не получают - отменяем их сами
+        output.put("\n⛔ Отмена...\n")
+        core.cancel()
+        done.wait()
+    ok, data = outcome.get("result", (False, None))
+    output.result(operation, ok, data, time.monotonic() - started)
+    if core.cancelled:
+        return 130
+    return 0 if ok else 1
+
+
+def history(query=None, operation=None, run_id=None, limit=50, as_json=False):
+    """Запрос к журналу запусков: последние запуски, поиск или вывод одного запуска"""
+    from datetime import datetime
+
+    from log_store import default_store as default_log
+
+    store = default_log()
+
+    def stamp(timestamp):
+        return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+    def emit(event, text):
+        if as_json:
+            print(json.dumps(event, ensure_ascii=False), flush=True)
+        else:
+            print(text, flush=True)
+
+    if run_id is not None:
+        for step in store.steps(run_id):
+            emit({"event": "step", "run": run_id, **step},
+                 f"# {step['description']}: {step['status']} (код: {step['returncode']}), "
+                 f"{step['duration']:.1f}с")
+        # Строки читаются из сегмента по мере печати
+        for number, line in enumerate(store.iter_lines(run_id), start=1):
+            emit({"event": "line", "run": run_id, "line": number, "text": line}, line)
+        return 0
+
+    if query:
+        found = False
+        for run, number, line in store.search(query, operation=operation, limit=limit):
+            found = True
+            emit({"event": "match", "run": run["id"], "operation": run["operation"],
+                  "started": run["started"], "ok": bool(run["ok"]), "line": number, "text": line},
+                 f"[{run['id']}] {stamp(run['started'])} {run['operation']}:{number}: {line}")
+        return 0 if found else 1
+
+    for run in store.runs(operation=operation, limit=limit):
+        emit({"event": "run", **run, "ok": bool(run["ok"])},
+             f"[{run['id']}] {stamp(run['started'])} {run['operation']:<14} "
+             f"{'✅' if run['ok'] else '❌'} {run['lines']} строк")
+    return 0
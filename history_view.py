@@ -0,0 +1,155 @@
+"""
+Окно истории запусков - поиск по журналу и просмотр вывода прошлых операций
+Результаты и строки вывода подгружаются порциями из генераторов LogStore
+"""
+
+import itertools
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk, messagebox
+
+RESULTS_PAGE = 100
+LINES_PAGE = 1000
+
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else ""
+
+
+class HistoryWindow(tk.Toplevel):
+    """История запусков с поиском"""
+
+    def __init__(self, parent, store, operations):
+        super().__init__(parent)
+        self.title("История запусков")
+        self.geometry("900x600")
+        self.store = store
+        self._results = None
+        self._lines = None
+        self._header_lines = 0
+        self._loaded_lines = 0
+
+        frame = ttk.Frame(self, padding="10")
+        frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+        frame.columnconfigure(1, weight=1)
+        frame.rowconfigure(1, weight=1)
+        frame.rowconfigure(3, weight=2)
+
+        # Панель поиска
+        ttk.Label(frame, text="Поиск:").grid(row=0, column=0, sticky=tk.W)
+        self.query_var = tk.StringVar()
+        query_entry = ttk.Entry(frame, textvariable=self.query_var)
+        query_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=5)
+        query_entry.bind("<Return>", lambda event: self.search())
+
+        self.operation_var = tk.StringVar()
+        ttk.Combobox(frame, textvariable=self.operation_var, values=[""] + list(operations),
+                     width=14, state="readonly").grid(row=0, column=2, padx=5)
+        ttk.Button(frame, text="Найти", command=self.search).grid(row=0, column=3, padx=5)
+        ttk.Button(frame, text="Последние запуски", command=self.show_runs).grid(row=0, column=4)
+
+        # Найденные строки или список запусков
+        columns = ("run", "time", "operation", "status", "line", "text")
+        self.tree = ttk.Treeview(frame, columns=columns, show="headings", height=10)
+        for column, title, width in [("run", "Запуск", 60), ("time", "Время", 140),
+                                     ("operation", "Операция", 100), ("status", "Итог", 50),
+                                     ("line", "Строка", 60), ("text", "Текст", 450)]:
+            self.tree.heading(column, text=title)
+            self.tree.column(column, width=width, stretch=column == "text")
+        self.tree.grid(row=1, column=0, columnspan=5, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+        self.more_results_btn = ttk.Button(frame, text="Еще результаты", command=self.load_results,
+                                           state="disabled")
+        self.more_results_btn.grid(row=2, column=0, columnspan=5, sticky=tk.E, pady=5)
+
+        # Вывод выбранного запуска
+        self.output = tk.Text(frame, height=15, font=("Courier", 10), wrap="none")
+        self.output.grid(row=3, column=0, columnspan=5, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.more_lines_btn = ttk.Button(frame, text="Еще строки", command=self.load_lines,
+                                         state="disabled")
+        self.more_lines_btn.grid(row=4, column=0, columnspan=5, sticky=tk.E, pady=(5, 0))
+
+        self.show_runs()
+
+    def _clear_tree(self):
+        self.tree.delete(*self.tree.get_children())
+
+    def show_runs(self):
+        """Показывает последние запуски без чтения их вывода"""
+        self._clear_tree()
+        self._results = None
+        self.more_results_btn.configure(state="disabled")
+        for run in self.store.runs(operation=self.operation_var.get() or None, limit=200):
+            self.tree.insert("", tk.END, values=(run["id"], format_time(run["started"]), run["operation"],
+                                                 "✅" if run["ok"] else "❌", run["lines"], ""))
+
+    def search(self):
+        query = self.query_var.get().strip()
+        if not query:
+            self.show_runs()
+            return
+        self._clear_tree()
+        self._results = self.store.search(query, operation=self.operation_var.get() or None)
+        self.load_results()
+
+    def load_results(self):
+        """Подгружает следующую порцию результатов поиска"""
+        if self._results is None:
+            return
+        page = list(itertools.islice(self._results, RESULTS_PAGE))
+        for run, number, line in page:
+            self.tree.insert("", tk.END, values=(run["id"], format_time(run["started"]), run["operation"],
+                                                 "✅" if run["ok"] else "❌", number, line.strip()))
+        if len(page) < RESULTS_PAGE:
+            self._results = None
+            self.more_results_btn.configure(state="disabled")
+        else:
+            self.more_results_btn.configure(state="normal")
+        if not self.tree.get_children():
+            messagebox.showinfo("История", "Ничего не найдено", parent=self)
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        values = self.tree.item(selection[0], "values")
+        run_id = int(values[0])
+        self.output.delete("1.0", tk.END)
+        steps = self.store.steps(run_id)
+        for step in steps:
+            code = "" if step["returncode"] is None else f" (код: {step['returncode']})"
+            self.output.insert(tk.END, f"# {step['description']}: {step['status']}{code}, "
+                                       f"{step['duration']:.1f}с\n")
+        self._header_lines = len(steps)
+        self._loaded_lines = 0
+        self._lines = self.store.iter_lines(run_id)
+        self.load_lines()
+        # Для найденной строки сразу прокручиваем к ней
+        if values[5] and str(values[4]).isdigit():
+            self._scroll_to_line(int(values[4]))
+
+    def load_lines(self):
+        """Подгружает следующую порцию строк вывода запуска"""
+        if self._lines is None:
+            return
+        page = list(itertools.islice(self._lines, LINES_PAGE))
+        if page:
+            self.output.insert(tk.END, "\n".join(page) + "\n")
+            self._loaded_lines += len(page)
+        if len(page) < LINES_PAGE:
+            self._lines = None
+            self.more_lines_btn.configure(state="disabled")
+        else:
+            self.more_lines_btn.configure(state="normal")
+
+    def _scroll_to_line(self, number):
+        while self._lines is not None and number > self._loaded_lines:
+            self.load_lines()
+        index = f"{self._header_lines + number}.0"
+        self.output.see(index)
+        self.output.tag_remove("found", "1.0", tk.END)
+        self.output.tag_add("found", index, f"{index} lineend")
+        self.output.tag_configure("found", background="yellow")
@@ -0,0 +1,856 @@
+"""
+Ядро Homebrew Manager - операции над Homebrew без зависимости от tkinter
+Используется как графическим интерфейсом, так и headless-режимом
+Весь вывод идет в output_queue (любой объект с методом put)
+"""
+
+import os
+import sqlite3
+import subprocess
+
+from brew_cache import default_cache, run_brew
+from command_metrics import CommandUsage, default_store
+from scheduler import (STATUS_OK, STATUS_FAILED, STATUS_SKIPPED, STATUS_CANCELLED, CancelToken, Scheduler,
+                       Step, steps_from_commands)
+
+# Операции, доступные в GUI и headless-режиме
+OPERATIONS = ["update", "doctor", "cleanup", "cleanup-estimate", "upgrade", "list", "outdated", "sizes", "security",
+              "security-deep", "maintenance", "sync", "sync-plan", "sync-cleanup", "metrics"]
+# Операции, которые только читают собственные данные приложения, в журнал не пишутся
+UNLOGGED_OPERATIONS = {"metrics"}
+
+# Доступ операций к установке: write меняет ее, snapshot сканирует файлы Cellar и кеширует
+# результат (нельзя во время изменений), read безопасна в любой момент
+ACCESS_WRITE = "write"
+ACCESS_SNAPSHOT = "snapshot"
+ACCESS_READ = "read"
+OPERATION_ACCESS = {
+    "update": ACCESS_WRITE, "cleanup": ACCESS_WRITE, "upgrade": ACCESS_WRITE, "maintenance": ACCESS_WRITE,
+    "sync": ACCESS_WRITE, "sync-cleanup": ACCESS_WRITE, "sync-plan": ACCESS_READ,
+    "sizes": ACCESS_SNAPSHOT, "security-deep": ACCESS_SNAPSHOT, "cleanup-estimate": ACCESS_SNAPSHOT,
+    "doctor": ACCESS_READ, "list": ACCESS_READ, "outdated": ACCESS_READ, "security": ACCESS_READ,
+    "metrics": ACCESS_READ,
+}
+
+
+def operation_access(operation):
+    """Доступ операции к установке; неизвестные операции считаются изменяющими"""
+    return OPERATION_ACCESS.get(operation, ACCESS_WRITE)
+
+
+class HomebrewCore:
+    """Операции Homebrew: команды brew, анализ размеров, проверка безопасности"""
+
+    def __init__(self, output_queue):
+        self.output_queue = output_queue
+        # Граф зависимостей живет между запусками анализа и обновляется инкрементально
+        self.dep_graph = None
+        self._recorder = None
+        self._cancel = CancelToken()
+        # Классификаторы ошибок выполняемых шагов; читаются, если шаг завершился с ошибкой
+        self._classifiers = {}
+
+    def plan(self, operation):
+        """Возвращает план шагов для операции, выполняемой командами brew"""
+        if operation == "update":
+            return [Step("update", ["brew", "update"], "Обновление Homebrew")]
+        if operation == "doctor":
+            return [Step("doctor", ["brew", "doctor"], "Диагностика")]
+        if operation == "cleanup":
+            return steps_from_commands([
+                (["brew", "cleanup", "--prune=all"], "Очистка старых версий"),
+                (["brew", "autoremove"], "Удаление неиспользуемых зависимостей")
+            ])
+        if operation == "upgrade":
+            return [Step("upgrade", self.run_upgrade_pipeline, "Обновление пакетов",
+                         brew_command=["brew", "upgrade"])]
+        if operation == "maintenance":
+            # Диагностика и замер кеша ничего не меняют и идут параллельно с остальными шагами
+            return [
+                Step("update", ["brew", "update"], "Обновление Homebrew"),
+                Step("cache_size", self.report_download_cache_size, "Размер кеша загрузок",
+                     mutating=False),
+                Step("upgrade", self.run_upgrade_pipeline, "Обновление пакетов",
+                     deps=["update"], brew_command=["brew", "upgrade"]),
+                Step("doctor", ["brew", "doctor"], "Диагностика", deps=["upgrade"]),
+                Step("cleanup", ["brew", "cleanup", "--prune=all"], "Очистка старых версий",
+                     deps=["upgrade"]),
+                Step("autoremove", ["brew", "autoremove"], "Удаление неиспользуемых зависимостей",
+                     deps=["upgrade"])
+            ]
+        raise ValueError(f"Неизвестная операция: {operation}")
+
+    def cancel(self):
+        """Отменяет текущую операцию: процессы завершаются, оставшиеся шаги не запускаются"""
+        self._cancel.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def run_operation(self, operation, cancel=None, plan=None):
+        """Выполняет операцию по имени, возвращает (успех, структурированный результат).
+        plan - подтвержденный план синхронизации (actions из sync-plan) для операции sync"""
+        self._cancel = cancel or CancelToken()
+        if operation in UNLOGGED_OPERATIONS:
+            return self._run_operation(operation, plan)
+
+        # Весь вывод операции дублируется в журнал запусков
+        from log_store import TeeOutput, default_store as default_log
+
+        try:
+            recorder = default_log().start_run(operation)
+        except (OSError, sqlite3.Error):
+            return self._run_operation(operation, plan)
+
+        output = self.output_queue
+        self.output_queue = TeeOutput(output, recorder)
+        self._recorder = recorder
+        ok = False
+        try:
+            ok, data = self._run_operation(operation, plan)
+            return ok, data
+        finally:
+            self.output_queue = output
+            self._recorder = None
+            try:
+                recorder.finish(ok)
+            except (OSError, sqlite3.Error):
+                pass
+
+    def _run_operation(self, operation, plan=None):
+        if operation == "list":
+            data = self.list_packages()
+            return data is not None, data
+        if operation == "sizes":
+            data = self.analyze_sizes()
+            return data is not None, data
+        if operation == "cleanup-estimate":
+            data = self.estimate_cleanup()
+            return data is not None, data
+        if operation in ("security", "security-deep"):
+            data = self.security_check(deep=operation == "security-deep")
+            return data is not None, data
+        if operation == "outdated":
+            data = self.report_outdated()
+            return data is not None, [pkg.to_dict() for pkg in data or []]
+        if operation == "metrics":
+            return True, self.report_metrics()
+        if operation in ("sync", "sync-plan", "sync-cleanup"):
+            return self.sync_manifest(dry_run=operation == "sync-plan", uninstall=operation == "sync-cleanup",
+                                      confirmed=plan)
+
+        results = self.run_steps(self.plan(operation))
+        data = {"steps": [{"name": result.step.name,
+                           "description": result.step.description,
+                           "status": result.status,
+                           "returncode": result.returncode,
+                           "duration": round(result.duration, 3)} for result in results]}
+        return all(result.ok for result in results), data
+
+    def run_upgrade_pipeline(self, cancel=None, outdated=None):
+        """Обновляет пакеты конвейером: параллельные загрузки, последовательная установка"""
+        from upgrade_pipeline import UpgradePipeline, get_outdated
+
+        if outdated is not None:
+            pipeline = UpgradePipeline(self.output_queue, cancel=cancel)
+            return 0 if pipeline.run(outdated) else 1
+        try:
+            outdated = get_outdated()
+        except (subprocess.CalledProcessError, ValueError, KeyError):
+            # Старый brew без --json=v2 - обновляем одной командой
+            from brew_progress import BrewOutputParser, PackageTimings
+
+            self.output_queue.put("ℹ️ Не удалось получить список устаревших пакетов, выполняю brew upgrade\n")
+            parser = BrewOutputParser(PackageTimings().seconds)
+            return self.stream_command(["brew", "upgrade"], cancel=cancel, parser=parser)
+
+        pipeline = UpgradePipeline(self.output_queue, cancel=cancel)
+        return 0 if pipeline.run(outdated) else 1
+
+    def sync_manifest(self, dry_run=False, uninstall=False, confirmed=None):
+        """Приводит установку к манифесту (Brewfile), выполняя только недостающие действия.
+        confirmed - подтвержденные действия: если план с тех пор изменился, он не выполняется"""
+        from cask_artifacts import formula_dependencies
+        from manifest import ACTION_TITLES, installed_taps, load_manifest, plan_sync
+        from inventory import load_inventory
+        from outdated import api_dependencies, find_outdated, pinned_formulae
+
+        try:
+            manifest = load_manifest()
+        except OSError as e:
+            self.output_queue.put(f"❌ Не удалось прочитать манифест: {str(e)}\n")
+            return False, None
+        if manifest is None:
+            self.output_queue.put("ℹ️ Манифест не найден: создайте Brewfile в каталоге данных, ~/.Brewfile "
+                                  "или укажите путь в HOMEBREW_BUNDLE_FILE\n")
+            return False, None
+
+        self.output_queue.put(f"\n📜 Сверка с манифестом {manifest.path}...\n")
+        for number, line in manifest.errors:
+            self.output_queue.put(f"⚠️ Строка {number} не разобрана и пропущена: {line}\n")
+
+        inventory = load_inventory()
+        try:
+            outdated, _ = find_outdated(inventory)
+        except (subprocess.CalledProcessError, FileNotFoundError, OSError, ValueError, KeyError):
+            self.output_queue.put("ℹ️ Не удалось проверить устаревшие пакеты, обновления не планируются\n")
+            outdated = []
+        # Зависимости устанавливаемых пакетов - из кеша API, установленных cask'ов - из их описаний
+        dependencies = api_dependencies()
+        cask_dependencies = dict(dependencies.get("cask") or {})
+        for package in inventory.casks:
+            found = formula_dependencies(package)
+            if found is not None:
+                cask_dependencies[package.name] = found
+        dependencies["cask"] = cask_dependencies
+        plan = plan_sync(manifest, inventory, outdated, pinned_formulae(inventory.prefix),
+                         installed_taps(inventory.prefix), uninstall=uninstall, dependencies=dependencies)
+        data = {"manifest": manifest.path, "actions": [item.to_dict() for item in plan.actions],
+                "unmanaged": [item.to_dict() for item in plan.unmanaged], "unresolved": plan.unresolved}
+
+        if plan:
+            self.output_queue.put(f"📋 План синхронизации ({len(plan.actions)} действий):\n")
+            for action, items in plan.by_action().items():
+                self.output_queue.put(f"   {ACTION_TITLES[action]}:\n")
+                for item in items:
+                    label = " (cask)" if item.kind == "cask" else ""
+                    versions = (f" {item.installed_version or '?'} → {item.latest_version or '?'}"
+                                if item.latest_version else "")
+                    self.output_queue.put(f"      📦 {item.target or item.name}{label}{versions}\n")
+        else:
+            self.output_queue.put("✅ Установка соответствует манифесту\n")
+
+        if plan.unmanaged and not uninstall:
+            names = ", ".join(item.name for item in plan.unmanaged[:10])
+            more = f" и еще {len(plan.unmanaged) - 10}" if len(plan.unmanaged) > 10 else ""
+            self.output_queue.put(f"ℹ️ Не из манифеста установлено пакетов: {len(plan.unmanaged)} ({names}{more}); "
+                                  "удаляет их только операция sync-cleanup\n")
+        if plan.unresolved and any(item.kind == "formula" for item in plan.unmanaged):
+            self.output_queue.put(f"⚠️ Зависимости {', '.join(plan.unresolved[:10])} неизвестны (нет в кеше API), "
+                                  "поэтому формулы не из манифеста не удаляются\n")
+        if dry_run or not plan:
+            return True, data
+        if confirmed is not None and confirmed != data["actions"]:
+            # Установка или манифест изменились после подтверждения: нужен новый ответ на новый план
+            self.output_queue.put("⚠️ План изменился после подтверждения, синхронизация не выполнена; "
+                                  "подтвердите новый план\n")
+            data["changed"] = True
+            return False, data
+
+        results = self.run_steps(self.sync_steps(plan))
+        data["steps"] = [{"name": result.step.name, "description": result.step.description,
+                          "status": result.status, "returncode": result.returncode,
+                          "duration": round(result.duration, 3)} for result in results]
+        return all(result.ok for result in results), data
+
+    def sync_steps(self, plan):
+        """Шаги для плана синхронизации: одна команда brew на группу однотипных действий"""
+        from manifest import ACTION_TAP, ACTION_TITLES, ACTION_UPGRADE, SYNC_DEPENDENCIES
+
+        steps = []
+        names = {}
+        for action, items in plan.by_action().items():
+            current = []
+            if action == ACTION_TAP:
+                for item in items:
+                    current.append(Step(f"tap-{item.name}", ["brew", "tap", item.name],
+                                        f"Подключение {item.name}"))
+            elif action == ACTION_UPGRADE:
+                # Обновление через тот же конвейер, что и у операции upgrade, но только этих пакетов
+                outdated = [(item.name, item.kind, item.installed_version, item.latest_version) for item in items]
+                current.append(Step("upgrade", lambda cancel, outdated=outdated: self.run_upgrade_pipeline(
+                    cancel, outdated), ACTION_TITLES[action], brew_command=["brew", "upgrade"]))
+            else:
+                # Пакеты с одинаковыми аргументами ставятся одной командой
+                groups = {}
+                for item in items:
+                    groups.setdefault((item.kind, tuple(item.args)), []).append(item.target or item.name)
+                for index, ((kind, args), targets) in enumerate(groups.items()):
+                    command = ["brew", action] + (["--cask"] if kind == "cask" else []) + list(args) + targets
+                    description = ACTION_TITLES[action] + (" cask'ов" if kind == "cask" else "")
+                    if args:
+                        description += f" ({' '.join(args)})"
+                    current.append(Step(f"{action}{index or ''}", command, description))
+            # Ошибка шага пропускает только действия, которым он действительно нужен
+            for step in current:
+                step.deps = [name for required in SYNC_DEPENDENCIES.get(action, ())
+                             for name in names.get(required, [])]
+            names[action] = [step.name for step in current]
+            steps.extend(current)
+        return steps
+
+    def report_download_cache_size(self, cancel=None):
+        """Показывает размер кеша загрузок Homebrew"""
+        from size_scanner import scan_tree
+
+        cache_path = run_brew(["brew", "--cache"]).stdout.strip()
+        size_bytes, file_count = scan_tree(cache_path)
+        self.output_queue.put(f"💾 Кеш загрузок {cache_path}: {self.format_size(size_bytes)} "
+                              f"({file_count} файлов)\n")
+        return 0
+
+    def list_packages(self):
+        """Выводит установленные пакеты из Cellar и Caskroom"""
+        from inventory import load_inventory
+
+        try:
+            inventory = load_inventory()
+            result = {}
+
+            for key, description, packages in [("formulae", "Установленные формулы", inventory.formulae),
+                                               ("casks", "Установленные cask'и", inventory.casks)]:
+                self.output_queue.put(f"\n🔄 {description}...\n")
+                for package in packages:
+                    version = f" {package.version}" if package.version else ""
+                    self.output_queue.put(f"{package.name}{version}\n")
+                self.output_queue.put(f"✅ {description} завершено успешно ({len(packages)})\n")
+                result[key] = [{"name": package.name, "versions": package.versions} for package in packages]
+
+            return result
+
+        except Exception as e:
+            self.output_queue.put(f"❌ Ошибка получения списка пакетов: {str(e)}\n")
+            return None
+
+    def report_outdated(self, inventory=None, limit=None):
+        """Выводит устаревшие пакеты с версиями, возвращает список OutdatedPackage или None"""
+        from outdated import find_outdated
+
+        try:
+            outdated, source = find_outdated(inventory)
+        except (subprocess.CalledProcessError, FileNotFoundError, OSError, ValueError, KeyError):
+            self.output_queue.put("ℹ️ Не удалось проверить устаревшие пакеты\n")
+            return None
+
+        if not outdated:
+            self.output_queue.put("✅ Все пакеты актуальны\n")
+            return outdated
+
+        self.output_queue.put(f"⚠️ Найдено {len(outdated)} устаревших пакетов "
+                              f"(источник: {'кеш API Homebrew' if source == 'api' else 'brew outdated'}):\n")
+        for pkg in outdated[:limit]:
+            pinned = " 📌 закреплен" if pkg.pinned else ""
+            self.output_queue.put(f"   📦 {pkg.name} {pkg.installed_version or '?'} → "
+                                  f"{pkg.latest_version or '?'}{pinned}\n")
+        if limit and len(outdated) > limit:
+            self.output_queue.put(f"   ... и еще {len(outdated) - limit} пакетов\n")
+        return outdated
+
+    def report_metrics(self):
+        """Выводит метрики команд в формате Prometheus и возвращает их историю"""
+        store = default_store()
+        self.output_queue.put(store.prometheus_text())
+        return store.snapshot()
+
+    def stream_command(self, command, prefix="", cancel=None, parser=None, classifier=None):
+        """Запускает команду и транслирует ее вывод в очередь, возвращает код возврата"""
+        from brew_progress import BrewOutputParser
+        from process_engine import default_engine
+
+        usage = CommandUsage()
+        on_output = usage.add_output
+        if classifier is not None:
+            def on_output(text):
+                usage.add_output(text)
+                classifier.feed(text)
+        # Маркеры brew превращаются в события прогресса, полосы загрузки не выводятся
+        result = default_engine().run(command, self.output_queue, prefix=prefix, on_output=on_output,
+                                      cancel=cancel or self._cancel, parser=parser or BrewOutputParser())
+        usage.add_rusage(result.rusage)
+        default_store().record(command, usage.stop(), result.returncode)
+        default_cache.notify_finished(command)
+        return result.returncode
+
+    def execute_step(self, step, cancel=None, tagged=False):
+        """Выполняет один шаг плана"""
+        from error_rules import default_rules
+
+        if callable(step.action):
+            return step.action(cancel)
+        # Вывод классифицируется по мере поступления, отчет нужен только при ошибке
+        classifier = self._classifiers[step.name] = default_rules().classifier()
+        # Вывод параллельных read-only шагов помечаем именем шага
+        return self.stream_command(step.action, prefix=f"[{step.name}] " if tagged else "", cancel=cancel,
+                                   classifier=classifier)
+
+    def on_step_start(self, step):
+        self.output_queue.put(f"\n🔄 {step.description}...\n")
+
+    def on_step_finish(self, result):
+        step = result.step
+        classifier = self._classifiers.pop(step.name, None)
+        if self._recorder is not None:
+            self._recorder.step_finished(result)
+        if result.status == STATUS_SKIPPED:
+            self.output_queue.put(f"⏭️ {step.description} пропущено: предыдущий шаг не выполнен\n")
+        elif result.status == STATUS_CANCELLED:
+            self.output_queue.put(f"⛔ {step.description} отменено\n")
+        elif result.error is not None:
+            self.output_queue.put(f"❌ Ошибка выполнения {step.description}: {str(result.error)}\n")
+        elif result.ok:
+            self.output_queue.put(f"✅ {step.description} завершено успешно ({result.duration:.1f}с)\n")
+        else:
+            self.output_queue.put(f"❌ {step.description} завершено с ошибкой (код: {result.returncode})\n")
+            # Анализируем ошибку
+            self.analyze_error(step.brew_command, result.returncode, classifier)
+
+    def run_steps(self, steps):
+        """Выполняет план шагов через планировщик и выводит длительности"""
+        tagged = len(steps) > 1
+        scheduler = Scheduler(lambda step, cancel: self.execute_step(step, cancel, tagged and not step.mutating),
+                              on_start=self.on_step_start, on_finish=self.on_step_finish)
+        results = scheduler.run(steps, cancel=self._cancel)
+
+        if tagged:
+            icons = {STATUS_OK: "✅", STATUS_FAILED: "❌", STATUS_SKIPPED: "⏭️", STATUS_CANCELLED: "⛔"}
+            self.output_queue.put("\n⏱️ Длительность шагов:\n")
+            for result in results:
+                self.output_queue.put(f"   {icons[result.status]} {result.step.description:<40} "
+                                      f"{result.duration:6.1f}с\n")
+        return results
+
+    def analyze_error(self, command, return_code, classifier=None):
+        """Выводит найденные в выводе команды проблемы и советы по их решению"""
+        from error_rules import default_rules
+
+        if classifier is None:
+            classifier = default_rules().classifier()
+        for line in classifier.report(command):
+            self.output_queue.put(line)
+
+    def analyze_sizes(self):
+        """Анализирует размеры установленных формул и cask'ов вместе с их приложениями"""
+        # Подсистема анализа загружается только при первом использовании
+        from cask_artifacts import artifact_dirs, artifact_paths
+        from inventory import load_inventory
+        from size_cache import SizeCache, scan_with_cache
+        from size_scanner import CASK_MAX_BYTES, CASK_MAX_FILES, SizeScanner
+
+        try:
+            self.output_queue.put("\n📊 Анализ размеров установленных пакетов...\n")
+
+            # Читаем установленные пакеты прямо из Cellar и Caskroom
+            inventory = load_inventory()
+
+            if not inventory.formulae and not inventory.casks:
+                self.output_queue.put("📦 Нет установленных пакетов\n")
+                return {"packages": [], "total": 0}
+
+            # Общая модель результатов для формул и cask'ов
+            package_sizes = []
+            self.output_queue.put(f"🔍 Найдено формул: {len(inventory.formulae)}, cask'ов: "
+                                  f"{len(inventory.casks)}. Анализирую размеры...\n\n")
+
+            # Сканирование кегов идет параллельно
+            targets = [(package.name, package.path) for package in inventory.formulae
+                       if package.path and os.path.exists(package.path)]
+            records = {package.name: package for package in inventory.formulae}
+            # Cask - это его каталог в Caskroom и установленные им приложения
+            dirs = artifact_dirs()
+            cask_targets = [(package.name, [package.path] + artifact_paths(package, dirs))
+                            for package in inventory.casks if package.path and os.path.exists(package.path)]
+            scanned_total = len(targets) + len(cask_targets)
+
+            processed = [0]
+
+            def report(package, kind, size_bytes, file_count, partial=False):
+                # Отправляем результат сразу, как только пакет обработан
+                processed[0] += 1
+                package_sizes.append({"name": package, "kind": kind, "size": size_bytes,
+                                      "files": file_count, "partial": partial})
+                label = " (cask)" if kind == "cask" else ""
+                approx = "≥" if partial else ""
+                limit = ", превышен лимит сканирования" if partial else ""
+                self.output_queue.put(f"📈 [{processed[0]}/{scanned_total}] {package}{label}: "
+                                      f"{approx}{self.format_size(size_bytes)} ({file_count} файлов{limit})\n")
+
+            def on_result(package, size_bytes, file_count):
+                records[package].size = size_bytes
+                report(package, "formula", size_bytes, file_count)
+
+            def on_cask(package, size_bytes, file_count, partial):
+                report(package, "cask", size_bytes, file_count, partial)
+
+            # Перечитываем с диска только новые и измененные кеги
+            size_cache = SizeCache.load()
+            scan_with_cache(SizeScanner(), size_cache, targets, on_result=on_result)
+            # Огромное приложение сканируется несколькими потоками и не дольше своего бюджета
+            SizeScanner().scan_packages(cask_targets, on_result=on_cask,
+                                        max_files=CASK_MAX_FILES, max_bytes=CASK_MAX_BYTES)
+            self.output_queue.put(f"🗃️ Кеш размеров: попаданий {size_cache.hits}, "
+                                  f"промахов {size_cache.misses}\n")
+
+            # Сортируем по размеру (от большего к меньшему)
+            package_sizes.sort(key=lambda record: record["size"], reverse=True)
+            rankings = {"all": package_sizes,
+                        "formula": [record for record in package_sizes if record["kind"] == "formula"],
+                        "cask": [record for record in package_sizes if record["kind"] == "cask"]}
+
+            analysis = self.update_dependency_graph(inventory)
+
+            # Выводим результаты
+            self.output_queue.put("\n📊 РЕЗУЛЬТАТЫ АНАЛИЗА РАЗМЕРОВ:\n")
+            self.output_queue.put("=" * 60 + "\n")
+
+            total_bytes = sum(record["size"] for record in package_sizes)
+            totals = {kind: sum(record["size"] for record in rankings[kind]) for kind in ("formula", "cask")}
+            self.output_queue.put(f"📦 Всего пакетов: {len(package_sizes)} (формул {len(rankings['formula'])}, "
+                                  f"cask'ов {len(rankings['cask'])})\n")
+            self.output_queue.put(f"💾 Общий размер: {self.format_size(total_bytes)} (формулы "
+                                  f"{self.format_size(totals['formula'])}, cask'и "
+                                  f"{self.format_size(totals['cask'])})\n\n")
+
+            # Топ 20 самых больших пакетов
+            self.output_queue.put("🔝 ТОП-20 САМЫХ БОЛЬШИХ ПАКЕТОВ:\n")
+            self.output_queue.put("-" * 60 + "\n")
+
+            for i, record in enumerate(package_sizes[:20]):
+                package, size_bytes = record["name"], record["size"]
+                size_str = ("≥" if record["partial"] else "") + self.format_size(size_bytes)
+                percentage = (size_bytes / total_bytes) * 100 if total_bytes > 0 else 0
+                if record["kind"] == "cask":
+                    self.output_queue.put(f"{i+1:2d}. {package:<25} {size_str:>8} ({percentage:.1f}%) "
+                                          f"🖥️ cask\n")
+                    continue
+                reclaimable = analysis.reclaimable.get(package, size_bytes)
+                dependents = analysis.dependents.get(package, 0)
+                needed_by = f", нужен {dependents} пакетам" if dependents else ""
+                self.output_queue.put(f"{i+1:2d}. {package:<25} {size_str:>8} ({percentage:.1f}%) "
+                                      f"♻️ при удалении освободится {self.format_size(reclaimable)}{needed_by}\n")
+
+            # Отдельные рейтинги по типам, если установлены оба
+            if rankings["formula"] and rankings["cask"]:
+                for kind, title in (("formula", "ФОРМУЛ"), ("cask", "CASK'ОВ")):
+                    self.output_queue.put(f"\n🔝 ТОП-10 {title}:\n")
+                    self.output_queue.put("-" * 60 + "\n")
+                    for i, record in enumerate(rankings[kind][:10]):
+                        size_str = ("≥" if record["partial"] else "") + self.format_size(record["size"])
+                        percentage = (record["size"] / totals[kind]) * 100 if totals[kind] > 0 else 0
+                        self.output_queue.put(f"{i+1:2d}. {record['name']:<25} {size_str:>8} "
+                                              f"({percentage:.1f}%)\n")
+
+            # Листья и сироты по графу зависимостей
+            self.output_queue.put("\n🌳 ГРАФ ЗАВИСИМОСТЕЙ:\n")
+            self.output_queue.put("-" * 60 + "\n")
+            self.output_queue.put(f"🍃 Листья (от них никто не зависит): {len(analysis.leaves)}\n")
+            if analysis.orphans:
+                orphan_bytes = sum(analysis.sizes[name] for name in analysis.orphans)
+                self.output_queue.put(f"🗑️ Сироты (удалит brew autoremove): {len(analysis.orphans)}, "
+                                      f"{self.format_size(orphan_bytes)}\n")
+                for name in sorted(analysis.orphans)[:10]:
+                    self.output_queue.put(f"   📦 {name} {self.format_size(analysis.sizes[name])}\n")
+                if len(analysis.orphans) > 10:
+                    self.output_queue.put(f"   ... и еще {len(analysis.orphans) - 10} пакетов\n")
+            else:
+                self.output_queue.put("✅ Сирот нет\n")
+
+            # Статистика по размерам
+            self.output_queue.put("\n📈 СТАТИСТИКА ПО РАЗМЕРАМ:\n")
+            self.output_queue.put("-" * 60 + "\n")
+
+            large_packages = [p for p in package_sizes if p["size"] > 100 * 1024 * 1024]  # > 100MB
+            medium_packages = [p for p in package_sizes if 10 * 1024 * 1024 < p["size"] <= 100 * 1024 * 1024]  # 10-100MB
+            small_packages = [p for p in package_sizes if p["size"] <= 10 * 1024 * 1024]  # <= 10MB
+
+            self.output_queue.put(f"🔴 Большие пакеты (>100MB): {len(large_packages)}\n")
+            self.output_queue.put(f"🟡 Средние пакеты (10-100MB): {len(medium_packages)}\n")
+            self.output_queue.put(f"🟢 Малые пакеты (<10MB): {len(small_packages)}\n")
+
+            # Рекомендации
+            if large_packages:
+                self.output_queue.put("\n💡 РЕКОМЕНДАЦИИ:\n")
+                self.output_queue.put("-" * 60 + "\n")
+                self.output_queue.put("🧹 Рассмотрите возможность удаления неиспользуемых больших пакетов\n")
+                self.output_queue.put("📦 Выполните 'brew cleanup' для очистки старых версий\n")
+                if len(large_packages) > 5:
+                    self.output_queue.put(f"⚠️ У вас {len(large_packages)} пакетов размером более 100MB\n")
+
+            packages = []
+            for record in package_sizes:
+                item = dict(record)
+                if record["kind"] == "formula":
+                    item.update({"reclaimable": analysis.reclaimable.get(record["name"], record["size"]),
+                                 "leaf": record["name"] in analysis.leaves,
+                                 "orphan": record["name"] in analysis.orphans})
+                packages.append(item)
+            return {
+                "packages": packages,
+                "total": total_bytes,
+                "totals": totals,
+                "top": {kind: [record["name"] for record in ranking[:20]] for kind, ranking in rankings.items()},
+                "cache": {"hits": size_cache.hits, "misses": size_cache.misses},
+            }
+
+        except subprocess.CalledProcessError as e:
+            self.output_queue.put(f"❌ Ошибка при получении списка пакетов: {str(e)}\n")
+        except Exception as e:
+            self.output_queue.put(f"❌ Ошибка анализа размеров: {str(e)}\n")
+        return None
+
+    def estimate_cleanup(self):
+        """Показывает, сколько места освободит очистка, ничего не удаляя"""
+        from cleanup_estimate import CATEGORY_TITLES, estimate_cleanup, homebrew_logs_path
+        from inventory import load_inventory
+        from outdated import homebrew_cache_path, pinned_formulae
+        from size_cache import SizeCache
+
+        try:
+            self.output_queue.put("\n🧮 Оценка места, которое освободит очистка...\n")
+            inventory = load_inventory()
+            # Сироты - то, что удалит brew autoremove, по тому же графу, что и в анализе размеров
+            orphans = self.update_dependency_graph(inventory).orphans
+            cache_path = homebrew_cache_path()
+            estimate = estimate_cleanup(inventory, orphans, pinned_formulae(inventory.prefix), cache_path,
+                                        homebrew_logs_path(cache_path), size_cache=SizeCache.load())
+
+            summary = []
+            categories = []
+            for category, (size_bytes, count, files) in estimate.by_category().items():
+                categories.append({"category": category, "title": CATEGORY_TITLES[category],
+                                   "size": size_bytes, "count": count, "files": files})
+                if not count:
+                    continue
+                summary.append(f"{CATEGORY_TITLES[category]}: {self.format_size(size_bytes)} ({files} файлов)")
+                self.output_queue.put(f"   🗑️ {summary[-1]}\n")
+                for candidate in estimate.largest(category):
+                    if candidate.size:
+                        self.output_queue.put(f"      📦 {candidate.name} {self.format_size(candidate.size)}\n")
+            summary.append(f"Всего освободится: {self.format_size(estimate.total)}")
+            self.output_queue.put(f"💾 {summary[-1]}\n")
+
+            return {"total": estimate.total, "categories": categories, "summary": summary,
+                    "cache_hits": estimate.cache_hits}
+
+        except Exception as e:
+            self.output_queue.put(f"❌ Ошибка оценки очистки: {str(e)}\n")
+        return None
+
+    def update_dependency_graph(self, inventory):
+        """Строит граф зависимостей или обновляет только изменившиеся узлы; возвращает снимок анализа"""
+        from dep_graph import DependencyGraph
+
+        created = self.dep_graph is None
+        if created:
+            self.dep_graph = DependencyGraph()
+        # Граф может быть общим с параллельным заданием: синхронизация и анализ идут под его блокировкой
+        changed, analysis = self.dep_graph.refresh(inventory.formulae)
+        if changed and not created:
+            self.output_queue.put(f"🌳 Граф зависимостей: обновлено узлов {changed}\n")
+        return analysis
+
+    def parse_size(self, size_str):
+        """Преобразует строку размера в байты"""
+        size_str = size_str.strip().upper()
+        multipliers = {
+            'B': 1,
+            'K': 1024,
+            'M': 1024 * 1024,
+            'G': 1024 * 1024 * 1024,
+            'T': 1024 * 1024 * 1024 * 1024
+        }
+
+        try:
+            if size_str[-1] in multipliers:
+                number = float(size_str[:-1])
+                multiplier = multipliers[size_str[-1]]
+                return int(number * multiplier)
+            else:
+                return int(float(size_str))
+        except (ValueError, IndexError):
+            return 0
+
+    def get_directory_size(self, path):
+        """Вычисляет размер директории в байтах"""
+        from size_scanner import scan_tree
+
+        size_bytes, _ = scan_tree(path)
+        return size_bytes
+
+    def format_size(self, size_bytes):
+        """Форматирует размер в читаемый вид"""
+        if size_bytes == 0:
+            return "0B"
+        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+            if size_bytes < 1024.0:
+                return f"{size_bytes:.1f}{unit}"
+            size_bytes /= 1024.0
+        return f"{size_bytes:.1f}PB"
+
+    def security_check(self, deep=False):
+        """Проверяет безопасность установленных пакетов; deep - еще и сигнатуры в файлах кегов"""
+        from inventory import load_inventory
+
+        try:
+            self.output_queue.put("\n🔒 Проверка безопасности установленных пакетов...\n")
+
+            # Получаем список установленных пакетов
+            inventory = load_inventory()
+            packages = inventory.formula_names
+
+            if not packages:
+                self.output_queue.put("📦 Нет установленных пакетов для проверки\n")
+                return {"outdated": [], "vulnerable": [], "suspicious": [], "signatures": []}
+
+            self.output_queue.put(f"🔍 Найдено {len(packages)} пакетов для проверки...\n\n")
+
+            # Проверяем устаревшие пакеты
+            self.output_queue.put("📅 Проверка устаревших пакетов...\n")
+            outdated_packages = self.report_outdated(inventory, limit=10) or []
+
+            # Проверяем известные уязвимые пакеты
+            self.output_queue.put("\n🛡️ Проверка известных уязвимостей...\n")
+            vulnerable_packages = self.check_known_vulnerabilities(
+                [(pkg.name, pkg.version) for pkg in inventory.formulae])
+
+            if vulnerable_packages:
+                self.output_queue.put(f"🚨 Найдены потенциально уязвимые пакеты:\n")
+                for match in vulnerable_packages:
+                    risk = match.severity
+                    risk_emoji = "🔴" if risk in ("critical", "high") else "🟡" if risk == "medium" else "🟢"
+                    version = f" {match.version}" if match.version else ""
+                    fixed = f", исправлено в {match.fixed}" if match.fixed else ""
+                    self.output_queue.put(f"   {risk_emoji} {match.package}{version} - риск: {risk} "
+                                          f"[{match.advisory_id}{fixed}]\n")
+                    if match.summary:
+                        self.output_queue.put(f"      {match.summary}\n")
+            else:
+                self.output_queue.put("✅ Известных уязвимостей не обнаружено\n")
+
+            # Проверяем подозрительные пакеты
+            self.output_queue.put("\n🔍 Проверка подозрительных пакетов...\n")
+            suspicious_packages = self.check_suspicious_packages(packages)
+
+            if suspicious_packages:
+                self.output_queue.put(f"⚠️ Найдены подозрительные пакеты:\n")
+                for pkg, reason in suspicious_packages:
+                    self.output_queue.put(f"   🔍 {pkg} - {reason}\n")
+            else:
+                self.output_queue.put("✅ Подозрительных пакетов не найдено\n")
+
+            signature_findings = {}
+            if deep:
+                self.output_queue.put("\n🧬 Поиск сигнатур в файлах кегов...\n")
+                signature_findings = self.scan_keg_signatures(inventory)
+                if signature_findings:
+                    self.output_queue.put("⚠️ Найдены сигнатуры в файлах:\n")
+                    for pkg, hits in sorted(signature_findings.items()):
+                        for path, reason in hits:
+                            self.output_queue.put(f"   🧬 {pkg}: {path} - {reason}\n")
+                else:
+                    self.output_queue.put("✅ Сигнатуры не найдены\n")
+
+            # Проверяем права доступа
+            self.output_queue.put("\n🔐 Проверка прав доступа Homebrew...\n")
+            self.check_homebrew_permissions()
+
+            # Итоговый отчет
+            self.output_queue.put("\n📋 ИТОГОВЫЙ ОТЧЕТ БЕЗОПАСНОСТИ:\n")
+            self.output_queue.put("=" * 60 + "\n")
+
+            total_issues = (len(outdated_packages) + len(vulnerable_packages) + len(suspicious_packages)
+                            + len(signature_findings))
+
+            if total_issues == 0:
+                self.output_queue.put("✅ Серьезных проблем безопасности не обнаружено\n")
+            else:
+                self.output_queue.put(f"⚠️ Обнаружено проблем: {total_issues}\n")
+
+            # Рекомендации
+            self.output_queue.put("\n💡 РЕКОМЕНДАЦИИ ПО БЕЗОПАСНОСТИ:\n")
+            self.output_queue.put("-" * 60 + "\n")
+            self.output_queue.put("🔄 Регулярно обновляйте пакеты: brew upgrade\n")
+            self.output_queue.put("🧹 Удаляйте неиспользуемые пакеты: brew uninstall <package>\n")
+            self.output_queue.put("🔍 Проверяйте источники перед установкой новых пакетов\n")
+            self.output_queue.put("📊 Используйте 'brew audit' для дополнительных проверок\n")
+
+            if outdated_packages:
+                self.output_queue.put(f"⚡ Обновите {len(outdated_packages)} устаревших пакетов\n")
+
+            self.output_queue.put(f"\n🗃️ Кеш команд brew: {default_cache.summary()}\n")
+
+            return {
+                "outdated": [pkg.to_dict() for pkg in outdated_packages],
+                "vulnerable": [{"name": match.package, "version": match.version, "risk": match.severity,
+                                "advisory": match.advisory_id, "fixed": match.fixed}
+                               for match in vulnerable_packages],
+                "suspicious": [{"name": pkg, "reason": reason} for pkg, reason in suspicious_packages],
+                "signatures": [{"name": pkg, "path": path, "reason": reason}
+                               for pkg, hits in sorted(signature_findings.items()) for path, reason in hits],
+            }
+
+        except subprocess.CalledProcessError as e:
+            self.output_queue.put(f"❌ Ошибка при проверке безопасности: {str(e)}\n")
+        except Exception as e:
+            self.output_queue.put(f"❌ Ошибка проверки безопасности: {str(e)}\n")
+        return None
+
+    def check_known_vulnerabilities(self, installed):
+        """Сверяет установленные версии [(имя, версия)] с локальной базой уязвимостей"""
+        from advisory_db import check_installed
+
+        try:
+            return check_installed(installed)
+        except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+            self.output_queue.put(f"ℹ️ База уязвимостей недоступна: {str(e)}\n")
+            return []
+
+    def check_suspicious_packages(self, packages):
+        """Проверяет имена пакетов по списку индикаторов"""
+        from indicators import IndicatorSet
+
+        try:
+            return IndicatorSet.load().match_names(packages)
+        except (OSError, ValueError, KeyError) as e:
+            self.output_queue.put(f"ℹ️ Список индикаторов недоступен: {str(e)}\n")
+            return []
+
+    def scan_keg_signatures(self, inventory):
+        """Глубокая проверка: ищет байтовые сигнатуры в файлах текущих кегов"""
+        from indicators import IndicatorSet, deep_scan
+
+        try:
+            indicators = IndicatorSet.load()
+        except (OSError, ValueError, KeyError) as e:
+            self.output_queue.put(f"ℹ️ Список индикаторов недоступен: {str(e)}\n")
+            return {}
+
+        kegs = [(pkg.name, os.path.join(inventory.cellar, pkg.name, pkg.version))
+                for pkg in inventory.formulae if pkg.version and inventory.cellar]
+        findings, cache = deep_scan(indicators, kegs)
+        self.output_queue.put(f"🗃️ Просканировано файлов: {cache.hits + cache.misses} "
+                              f"(из кеша: {cache.hits})\n")
+        return findings
+
+    def check_homebrew_permissions(self):
+        """Проверяет права доступа к Homebrew"""
+        from inventory import detect_prefix
+
+        try:
+            # Получаем путь к Homebrew
+            homebrew_prefix = detect_prefix()
+            if not homebrew_prefix:
+                raise subprocess.CalledProcessError(1, ["brew", "--prefix"])
+
+            # Проверяем владельца директории Homebrew
+            import pwd
+
+            current_user = pwd.getpwuid(os.getuid()).pw_name
+
+            try:
+                stat_info = os.stat(homebrew_prefix)
+                owner = pwd.getpwuid(stat_info.st_uid).pw_name
+
+                if owner == current_user:
+                    self.output_queue.put(f"✅ Права доступа корректны (владелец: {owner})\n")
+                else:
+                    self.output_queue.put(f"⚠️ Предупреждение: владелец Homebrew - {owner}, а не {current_user}\n")
+                    self.output_queue.put("💡 Рекомендуется: sudo chown -R $(whoami) $(brew --prefix)/*\n")
+
+            except (OSError, KeyError):
+                self.output_queue.put("⚠️ Не удалось проверить права доступа к Homebrew\n")
+
+        except subprocess.CalledProcessError:
+            self.output_queue.put("❌ Не удалось получить путь к Homebrew\n")
+        except Exception as e:
+            self.output_queue.put(f"⚠️ Ошибка при проверке прав доступа: {str(e)}\n")
@@ -0,0 +1,507 @@
+"""
+Графический интерфейс Homebrew Manager на tkinter
+Операции выполняет HomebrewCore, интерфейс только показывает их вывод
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+import sqlite3
+import subprocess
+import threading
+import queue
+import sys
+import time
+from datetime import datetime
+
+from brew_cache import run_brew
+from homebrew_core import HomebrewCore
+from jobs import JobManager
+from output_buffer import OutputBuffer, max_lines_from_env
+from output_pump import QUEUE_MAX_MESSAGES, OutputPump, finished_marker
+from output_view import VirtualOutputView
+
+class HomebrewManager:
+    def __init__(self, root, startup_probe=False, started_at=None):
+        self.root = root
+        self.root.title("Homebrew Manager")
+        self.root.geometry("800x600")
+
+        # Очередь для обновления GUI из потоков; ограничена, чтобы быстрый вывод притормаживал команды
+        self.output_queue = queue.Queue(maxsize=QUEUE_MAX_MESSAGES)
+        self.output_pump = OutputPump(self.output_queue)
+        # Каждая операция - отдельное задание со своим ядром; граф зависимостей живет между ними
+        self.dep_graph = None
+        self.jobs = JobManager(self.output_queue, self.make_job_core, on_finish=self.on_job_finish)
+        self.job_rows = {}
+        # Результаты оценки очистки и планы синхронизации ждут подтверждения пользователя
+        self.cleanup_estimates = {}
+        self.sync_plans = {}
+
+        # Переменные состояния
+        self.is_running = False
+        self.startup_probe = startup_probe
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.startup_timings = {}
+        self.brew_ready = threading.Event()
+        self.brew_error = None
+
+        self.create_widgets()
+        self.root.bind("<Map>", self.on_first_map, add="+")
+
+        # Homebrew проверяем в фоне, чтобы окно появилось сразу
+        thread = threading.Thread(target=self.check_homebrew_installation)
+        thread.daemon = True
+        thread.start()
+        self.root.after(50, self.poll_homebrew_ready)
+
+        # Обработка очереди вывода
+        self.root.after(100, self.process_queue)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def create_widgets(self):
+        # Главный фрейм
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        # Настройка сетки
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(2, weight=1)
+
+        # Заголовок
+        title_label = ttk.Label(main_frame, text="Homebrew Manager",
+                               font=("Arial", 16, "bold"))
+        title_label.grid(row=0, column=0, pady=(0, 20))
+
+        # Фрейм для кнопок
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        button_frame.columnconfigure((0, 1, 2), weight=1)
+
+        # Кнопки управления
+        self.update_btn = ttk.Button(button_frame, text="Обновить Homebrew",
+                                    command=self.update_homebrew)
+        self.update_btn.grid(row=0, column=0, padx=5, pady=5, sticky=(tk.W, tk.E))
+
+        self.doctor_btn = ttk.Button(button_frame, text="Диагностика",
+                                    command=self.run_doctor)
+        self.doctor_btn.grid(row=0, column=1, padx=5, pady=5, sticky=(tk.W, tk.E))
+
+        self.cleanup_btn = ttk.Button(button_frame, text="Очистка",
+                                     command=self.cleanup_homebrew)
+        self.cleanup_btn.grid(row=0, column=2, padx=5, pady=5, sticky=(tk.W, tk.E))
+
+        self.upgrade_btn = ttk.Button(button_frame, text="Обновить пакеты",
+                                     command=self.upgrade_packages)
+        self.upgrade_btn.grid(row=1, column=0, padx=5, pady=5, sticky=(tk.W, tk.E))
+
+        self.list_btn = ttk.Button(button_frame, text="Список пакетов",
+                                  command=self.list_packages)
+        self.list_btn.grid(row=1, column=1, padx=5, pady=5, sticky=(tk.W, tk.E))
+
+        self.maintenance_btn = ttk.Button(button_frame, text="Полное обслуживание",
+                                         command=self.full_maintenance)
+        self.maintenance_btn.grid(row=1, column=2, padx=5, pady=5, sticky=(tk.W, tk.E))
+
+        # Новый ряд кнопок для анализа
+        self.size_analysis_btn = ttk.Button(button_frame, text="Анализ размеров",
+                                           command=self.analyze_package_sizes)
+        self.size_analysis_btn.grid(row=2, column=0, padx=5, pady=5, sticky=(tk.W, tk.E))
+
+        self.security_check_btn = ttk.Button(button_frame, text="Проверка безопасности",
+                                           command=self.security_check)
+        self.security_check_btn.grid(row=2, column=1, padx=5, pady=5, sticky=(tk.W, tk.E))
+
+        # Глубокая проверка сканирует файлы кегов на байтовые сигнатуры
+        self.deep_scan_var = tk.BooleanVar(value=False)
+        self.deep_scan_check = ttk.Checkbutton(button_frame, text="Сканировать файлы кегов",
+                                               variable=self.deep_scan_var)
+        self.deep_scan_check.grid(row=2, column=2, padx=5, pady=5, sticky=tk.W)
+
+        # Область вывода
+        output_frame = ttk.LabelFrame(main_frame, text="Вывод команд", padding="5")
+        output_frame.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
+        output_frame.columnconfigure(0, weight=1)
+        output_frame.rowconfigure(0, weight=1)
+
+        # В Tk хранится только видимое окно, остальное - в ограниченном буфере
+        self.output_buffer = OutputBuffer(max_lines=max_lines_from_env())
+        self.output_view = VirtualOutputView(output_frame, self.output_buffer,
+                                             font=("Courier", 10), height=20)
+        self.output_view.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        # Нижняя панель с прогресс-баром и кнопкой очистки
+        bottom_frame = ttk.Frame(main_frame)
+        bottom_frame.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
+        bottom_frame.columnconfigure(1, weight=1)
+
+        # Прогресс-бар
+        self.progress_var = tk.StringVar()
+        self.progress_var.set("Готов к работе")
+
+        self.progress_bar = ttk.Progressbar(bottom_frame, mode='indeterminate')
+        self.progress_bar.grid(row=0, column=0, padx=(0, 10))
+
+        self.status_label = ttk.Label(bottom_frame, textvariable=self.progress_var)
+        self.status_label.grid(row=0, column=1, sticky=(tk.W))
+
+        # Отмена всех выполняемых заданий
+        self.cancel_btn = ttk.Button(bottom_frame, text="Отмена", command=self.cancel_operation,
+                                     state='disabled')
+        self.cancel_btn.grid(row=0, column=2, padx=(10, 0))
+
+        # Кнопка очистки
+        clear_btn = ttk.Button(bottom_frame, text="Очистить", command=self.clear_output)
+        clear_btn.grid(row=0, column=3, padx=(10, 0))
+
+        # Сохранение полной истории вывода
+        save_btn = ttk.Button(bottom_frame, text="Сохранить лог", command=self.save_output)
+        save_btn.grid(row=0, column=4, padx=(10, 0))
+
+        # История прошлых запусков из журнала
+        history_btn = ttk.Button(bottom_frame, text="История", command=self.show_history)
+        history_btn.grid(row=0, column=5, padx=(10, 0))
+
+        # Выполняемые задания: у каждого свой индикатор и отмена
+        self.jobs_frame = ttk.Frame(main_frame)
+        self.jobs_frame.grid(row=4, column=0, sticky=(tk.W, tk.E))
+
+    def on_first_map(self, event):
+        """Запоминает момент первого отображения окна"""
+        if "first_paint" not in self.startup_timings:
+            self.startup_timings["first_paint"] = time.perf_counter() - self.started_at
+
+    def check_homebrew_installation(self):
+        """Проверяет установку Homebrew (в фоновом потоке)"""
+        try:
+            result = run_brew(['brew', '--version'])
+            self.output_queue.put(f"✅ Homebrew установлен: {result.stdout}")
+            self.output_queue.put(f"📦 Homebrew {result.stdout.split()[1]}\n")
+        except (subprocess.CalledProcessError, FileNotFoundError, IndexError):
+            self.output_queue.put("❌ Homebrew не найден!\n")
+            self.brew_error = "Homebrew не установлен или не найден в PATH"
+        finally:
+            self.startup_timings["brew_ready"] = time.perf_counter() - self.started_at
+            self.brew_ready.set()
+
+    def poll_homebrew_ready(self):
+        """Ждет завершения фоновой проверки Homebrew в главном потоке"""
+        if not self.brew_ready.is_set() or "first_paint" not in self.startup_timings:
+            self.root.after(50, self.poll_homebrew_ready)
+            return
+
+        timings = self.startup_timings
+        # Главный поток пишет в вывод напрямую: ожидание места в очереди заблокировало бы ее откачку
+        self.append_output(f"⏱️ Запуск: окно за {timings['first_paint'] * 1000:.0f} мс, "
+                           f"Homebrew готов за {timings['brew_ready'] * 1000:.0f} мс\n")
+
+        if self.startup_probe:
+            import json
+
+            print(json.dumps({
+                "first_paint_ms": round(timings["first_paint"] * 1000, 1),
+                "brew_ready_ms": round(timings["brew_ready"] * 1000, 1),
+                "brew_ok": self.brew_error is None,
+            }))
+            self.on_close()
+            return
+
+        if self.brew_error:
+            messagebox.showerror("Ошибка", self.brew_error)
+
+    def update_homebrew(self):
+        """Обновляет Homebrew"""
+        self.start_job("update", "Обновление Homebrew...")
+
+    def run_doctor(self):
+        """Запускает диагностику Homebrew"""
+        self.start_job("doctor", "Диагностика Homebrew...")
+
+    def cleanup_homebrew(self):
+        """Очищает кеш и старые версии Homebrew; сначала показывает, сколько места освободится"""
+        if not self.jobs.can_start("cleanup"):
+            return
+        self.start_job("cleanup-estimate", "Оценка очистки...")
+
+    def confirm_cleanup(self, estimate):
+        """Спрашивает подтверждение очистки по результатам оценки"""
+        if not self.jobs.can_start("cleanup"):
+            return
+        summary = estimate.get("summary")
+        details = ("\n".join(summary) if summary
+                   else "Не удалось оценить, сколько места освободится (подробности в выводе).")
+        response = messagebox.askyesno(
+            "Очистка Homebrew",
+            "Будут удалены старые версии пакетов, неиспользуемые зависимости и кеш загрузок:\n\n"
+            + details + "\n\nПродолжить?"
+        )
+        if response:
+            self.start_job("cleanup", "Очистка Homebrew...")
+
+    def upgrade_packages(self):
+        """Обновляет все установленные пакеты"""
+        self.start_job("upgrade", "Обновление пакетов...")
+
+    def list_packages(self):
+        """Показывает список установленных пакетов"""
+        self.start_job("list", "Получение списка пакетов...")
+
+    def full_maintenance(self):
+        """Выполняет полное обслуживание Homebrew"""
+        from manifest import manifest_path
+
+        if not self.jobs.can_start("maintenance"):
+            return
+
+        # С манифестом выполняются только действия, которых не хватает до желаемого состояния
+        path = manifest_path()
+        if path is not None:
+            response = messagebox.askyesnocancel(
+                "Полное обслуживание",
+                f"Найден манифест {path}.\n\nДа - показать план и установить, обновить и закрепить только то, "
+                "что расходится с манифестом.\nНет - полное обслуживание: обновление Homebrew и всех "
+                "пакетов, диагностика и очистка."
+            )
+            if response:
+                # Сначала план: синхронизация начнется только после подтверждения списка действий
+                self.start_job("sync-plan", "План синхронизации с манифестом...")
+            elif response is not None:
+                self.start_job("maintenance", "Полное обслуживание...")
+            return
+
+        # Спрашиваем подтверждение
+        response = messagebox.askyesno(
+            "Полное обслуживание",
+            "Это выполнит обновление Homebrew, обновление всех пакетов, диагностику и очистку.\n\nПродолжить?"
+        )
+
+        if not response:
+            return
+
+        self.start_job("maintenance", "Полное обслуживание...")
+
+    def confirm_sync(self, plan):
+        """Показывает план синхронизации и запускает ее после подтверждения"""
+        from manifest import ACTION_TITLES
+
+        actions = plan.get("actions") or []
+        if not actions or not self.jobs.can_start("sync"):
+            return
+        lines = []
+        for action, title in ACTION_TITLES.items():
+            names = [item["name"] + (" (cask)" if item["kind"] == "cask" else "")
+                     for item in actions if item["action"] == action]
+            if names:
+                shown = ", ".join(names[:10]) + (f" и еще {len(names) - 10}" if len(names) > 10 else "")
+                lines.append(f"{title} ({len(names)}): {shown}")
+        unmanaged = plan.get("unmanaged") or []
+        if unmanaged:
+            lines.append(f"\nПакеты не из манифеста ({len(unmanaged)}) не удаляются.")
+        response = messagebox.askyesno(
+            "Синхронизация с манифестом",
+            f"Манифест {plan.get('manifest')}:\n\n" + "\n".join(lines) + "\n\nВыполнить?"
+        )
+        if response:
+            # Выполняется именно показанный план; если установка успела измениться, план придет снова
+            self.start_job("sync", "Синхронизация с манифестом...", actions)
+
+    def make_job_core(self, output):
+        """Ядро для одного задания"""
+        core = HomebrewCore(output)
+        core.dep_graph = self.dep_graph
+        return core
+
+    def on_job_finish(self, job):
+        """Вызывается в потоке задания; интерфейс обновится по маркеру в очереди"""
+        if job.operation in ("sizes", "cleanup-estimate") and job.core.dep_graph is not None:
+            self.dep_graph = job.core.dep_graph
+        if job.operation == "cleanup-estimate" and not job.cancel_token.is_set():
+            # Диалог показывается из потока интерфейса, когда до него дойдет маркер завершения;
+            # оценка необязательна: если она не удалась, очистку все равно предлагаем, но без разбивки
+            self.cleanup_estimates[job.id] = job.data if job.ok and job.data else {}
+        if job.operation == "sync-plan" and job.ok and job.data and not job.cancel_token.is_set():
+            self.sync_plans[job.id] = job.data
+        if job.operation == "sync" and job.data and job.data.get("changed") and not job.cancel_token.is_set():
+            # План изменился после подтверждения - показываем новый
+            self.sync_plans[job.id] = job.data
+        self.output_queue.put(finished_marker(job.id))
+
+    def start_job(self, operation, message, plan=None):
+        """Запускает операцию заданием, если она не конфликтует с выполняемыми"""
+        if not self.jobs.can_start(operation):
+            return
+        job = self.jobs.start(operation, message.rstrip("."), plan)
+        if job is None:
+            return
+        if not self.is_running:
+            self.start_progress(message)
+        else:
+            self.progress_var.set(f"Выполняется заданий: {len(self.job_rows) + 1}")
+        self.add_job_row(job)
+        self.refresh_buttons()
+
+    def add_job_row(self, job):
+        """Строка задания: описание, собственный индикатор и кнопка отмены"""
+        from brew_progress import ProgressTracker
+
+        row = ttk.Frame(self.jobs_frame)
+        row.pack(fill=tk.X, pady=(2, 0))
+        bar = ttk.Progressbar(row, mode='indeterminate', length=120, maximum=100)
+        bar.pack(side=tk.LEFT)
+        bar.start()
+        ttk.Label(row, text=job.description).pack(side=tk.LEFT, padx=(10, 0))
+        status_var = tk.StringVar()
+        ttk.Label(row, textvariable=status_var).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(row, text="✕", width=3, command=job.cancel).pack(side=tk.RIGHT)
+        self.job_rows[job.id] = {"frame": row, "bar": bar, "status": status_var,
+                                 "tracker": ProgressTracker()}
+
+    def remove_job_row(self, job_id):
+        row = self.job_rows.pop(job_id, None)
+        if row is not None:
+            row["frame"].destroy()
+
+    def update_job_progress(self, events):
+        """Переводит индикаторы заданий в определенный режим по событиям прогресса"""
+        touched = {}
+        for event in events:
+            row = self.job_rows.get(event.job)
+            if row is not None:
+                row["tracker"].update(event)
+                touched[event.job] = row
+        for row in touched.values():
+            fraction = row["tracker"].fraction()
+            if fraction is not None:
+                if str(row["bar"].cget("mode")) != "determinate":
+                    row["bar"].stop()
+                    row["bar"].configure(mode="determinate")
+                row["bar"]["value"] = fraction * 100
+            row["status"].set(row["tracker"].describe())
+
+    def refresh_buttons(self):
+        """Кнопка доступна, если ее операция не конфликтует с выполняемыми заданиями"""
+        for operation, widget in [("update", self.update_btn), ("doctor", self.doctor_btn),
+                                  ("cleanup", self.cleanup_btn), ("upgrade", self.upgrade_btn),
+                                  ("list", self.list_btn), ("maintenance", self.maintenance_btn),
+                                  ("sizes", self.size_analysis_btn)]:
+            widget.configure(state='normal' if self.jobs.can_start(operation) else 'disabled')
+        security_free = self.jobs.can_start("security") and self.jobs.can_start("security-deep")
+        for widget in [self.security_check_btn, self.deep_scan_check]:
+            widget.configure(state='normal' if security_free else 'disabled')
+
+    def start_progress(self, message):
+        """Запускает индикатор прогресса"""
+        self.is_running = True
+        self.output_pump.reset_stats()
+        self.progress_var.set(message)
+        self.progress_bar.start()
+        self.cancel_btn.configure(state='normal')
+
+    def stop_progress(self):
+        """Останавливает индикатор прогресса"""
+        self.is_running = False
+        if self.output_pump.lines:
+            self.progress_var.set(f"Готов к работе · {self.output_pump.lines} строк, "
+                                  f"{self.output_pump.lines_per_second():.0f} строк/с")
+        else:
+            self.progress_var.set("Готов к работе")
+        self.progress_bar.stop()
+        self.cancel_btn.configure(state='disabled')
+
+    def cancel_operation(self):
+        """Отменяет все задания; кнопки включатся, когда завершатся их шаги"""
+        if not self.is_running:
+            return
+        self.jobs.cancel_all()
+        self.cancel_btn.configure(state='disabled')
+        self.progress_var.set("Отмена...")
+
+    def process_queue(self):
+        """Обрабатывает очередь сообщений от фоновых потоков"""
+        text, backlog = "", False
+        try:
+            text, finished, events, backlog = self.output_pump.drain()
+
+            if text:
+                # Одна вставка за тик вместо вставки на каждую строку
+                started = time.perf_counter()
+                self.append_output(text)
+                self.output_pump.record(text, time.perf_counter() - started)
+
+            if events:
+                self.update_job_progress(events)
+
+            for job_id in finished:
+                self.remove_job_row(job_id)
+                estimate = self.cleanup_estimates.pop(job_id, None)
+                if estimate is not None:
+                    self.root.after_idle(self.confirm_cleanup, estimate)
+                plan = self.sync_plans.pop(job_id, None)
+                if plan is not None:
+                    self.root.after_idle(self.confirm_sync, plan)
+            if finished:
+                self.refresh_buttons()
+                if self.job_rows:
+                    self.progress_var.set(f"Выполняется заданий: {len(self.job_rows)}")
+                else:
+                    self.stop_progress()
+        finally:
+            delay = self.output_pump.next_delay(self.is_running, bool(text) or backlog)
+            self.root.after(delay, self.process_queue)
+
+    def on_close(self):
+        """Удаляет временную историю вывода и закрывает окно"""
+        self.output_buffer.close()
+        self.root.destroy()
+
+    def append_output(self, text):
+        """Добавляет текст в буфер вывода и обновляет видимое окно"""
+        self.output_buffer.append(text)
+        self.output_view.refresh()
+
+    def clear_output(self):
+        """Очищает область вывода"""
+        self.output_view.clear()
+
+    def save_output(self):
+        """Сохраняет всю историю вывода сессии в файл"""
+        path = filedialog.asksaveasfilename(
+            title="Сохранить лог",
+            defaultextension=".log",
+            initialfile=f"homebrew-manager-{datetime.now():%Y%m%d-%H%M%S}.log"
+        )
+        if not path:
+            return
+        try:
+            self.output_buffer.export(path)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить лог: {str(e)}")
+
+    def show_history(self):
+        """Открывает окно истории запусков"""
+        from history_view import HistoryWindow
+        from homebrew_core import OPERATIONS
+        from log_store import default_store as default_log
+
+        try:
+            HistoryWindow(self.root, default_log(), OPERATIONS)
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("Ошибка", f"Журнал запусков недоступен: {str(e)}")
+
+    def analyze_package_sizes(self):
+        """Анализирует размеры установленных пакетов"""
+        self.start_job("sizes", "Анализ размеров пакетов...")
+
+    def security_check(self):
+        """Проверяет безопасность установленных пакетов"""
+        operation = "security-deep" if self.deep_scan_var.get() else "security"
+        self.start_job(operation, "Проверка безопасности...")
+
+def check_platform():
+    """Проверяет, что приложение запущено на macOS"""
+    if sys.platform != 'darwin':
+        messagebox.showerror("Ошибка платформы",
+                           "Это приложение предназначено только для macOS")
+        return False
+    return True
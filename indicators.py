@@ -0,0 +1,229 @@
+"""
+Индикаторы подозрительных пакетов - имена, подстроки имен и байтовые сигнатуры
+Подстроки и сигнатуры компилируются в одно регулярное выражение-префиксное дерево,
+поэтому проверка не зависит от числа индикаторов линейно. Глубокий режим сканирует
+файлы кегов через mmap в нескольких процессах и кеширует результат по inode и mtime
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from app_paths import cache_dir
+
+# Список по умолчанию поставляется вместе с приложением
+BUNDLED_INDICATORS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "indicators.json")
+SCAN_CACHE_FILENAME = "signatures.json"
+SCAN_CACHE_FORMAT = 1
+# Файлы передаются процессам пачками, чтобы не платить за передачу каждого пути
+SCAN_BATCH = 64
+
+
+def indicators_path():
+    """Путь к списку индикаторов: HOMEBREW_MANAGER_INDICATORS или встроенный файл"""
+    return os.environ.get("HOMEBREW_MANAGER_INDICATORS") or BUNDLED_INDICATORS
+
+
+def trie_pattern(words):
+    """Строит регулярное выражение-дерево для набора строк"""
+    trie = {}
+    for word in words:
+        if not word:
+            continue
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        # Ключ "" отмечает конец слова; ветви объединяются в одну альтернативу
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def _compile(words, as_bytes=False):
+    if not words:
+        return None
+    if not as_bytes:
+        return re.compile(trie_pattern(words))
+    # Байты переводятся в latin-1 один к одному, дерево строится как для строк
+    pattern = trie_pattern([word.decode("latin-1") for word in words])
+    return re.compile(pattern.encode("latin-1"), re.DOTALL)
+
+
+class IndicatorSet:
+    """Скомпилированный набор индикаторов"""
+
+    def __init__(self, names=None, substrings=None, signatures=None):
+        # Точные имена проверяются по словарю, подстроки - одним выражением
+        self.names = {name.lower(): reason for name, reason in (names or {}).items()}
+        self.substrings = {text.lower(): reason for text, reason in (substrings or {}).items()}
+        self.signatures = {}
+        for item in signatures or []:
+            data = bytes.fromhex(item["hex"]) if "hex" in item else item["text"].encode("utf-8")
+            self.signatures[data] = item.get("reason") or item.get("id") or data.hex()
+        self._substring_re = _compile(self.substrings)
+        self.signature_bytes = sorted(self.signatures)
+        self.digest = hashlib.sha1(b"\0".join(self.signature_bytes)).hexdigest()
+
+    @classmethod
+    def load(cls, path=None):
+        """Загружает индикаторы из JSON-файла"""
+        with open(path or indicators_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("names"), data.get("substrings"), data.get("signatures"))
+
+    def match_names(self, packages):
+        """Возвращает [(пакет, причина)] для подозрительных имен"""
+        suspicious = []
+        for package in packages:
+            package_lower = package.lower()
+            if package_lower in self.names:
+                suspicious.append((package, self.names[package_lower]))
+            elif self._substring_re is not None:
+                found = self._substring_re.search(package_lower)
+                if found:
+                    suspicious.append((package, self.substrings[found.group(0)]))
+        return suspicious
+
+
+# Скомпилированное выражение сигнатур в процессе-исполнителе
+_worker_re = None
+
+
+def _init_worker(signature_bytes):
+    global _worker_re
+    _worker_re = _compile(signature_bytes, as_bytes=True)
+
+
+def scan_file(path, signature_re):
+    """Ищет сигнатуры в файле через mmap, возвращает список найденных сигнатур (hex)"""
+    found = set()
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for match in signature_re.finditer(data):
+                    found.add(match.group(0).hex())
+    except (OSError, ValueError):
+        return []
+    return sorted(found)
+
+
+def _scan_batch(paths):
+    return [(path, scan_file(path, _worker_re)) for path in paths]
+
+
+def iter_files(root):
+    """Обходит обычные файлы дерева, возвращает (путь, stat); симлинки пропускаются"""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry.path, entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+class SignatureScanCache:
+    """Результаты сканирования файлов; запись действительна, пока не изменились inode, mtime и размер"""
+
+    def __init__(self, digest, path=None):
+        self.path = path or os.path.join(cache_dir(), SCAN_CACHE_FILENAME)
+        self.digest = digest
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Другой набор сигнатур делает все записи недействительными
+            if data.get("format") == SCAN_CACHE_FORMAT and data.get("digest") == digest:
+                self.entries = data.get("files", {})
+        except (OSError, ValueError, AttributeError):
+            self.entries = {}
+
+    @staticmethod
+    def _key(stat_info):
+        return [stat_info.st_ino, stat_info.st_mtime_ns, stat_info.st_size]
+
+    def lookup(self, path, stat_info):
+        entry = self.entries.get(path)
+        if entry and entry[0] == self._key(stat_info):
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def store(self, path, stat_info, found):
+        self.entries[path] = [self._key(stat_info), found]
+
+    def save(self, seen):
+        """Атомарно записывает кеш, удаленные файлы выбрасываются"""
+        self.entries = {path: entry for path, entry in self.entries.items() if path in seen}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"format": SCAN_CACHE_FORMAT, "digest": self.digest, "files": self.entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+def deep_scan(indicators, kegs, max_workers=None, cache=None):
+    """Сканирует файлы кегов [(пакет, путь)] на сигнатуры, возвращает ({пакет: [(файл, причина)]}, кеш)"""
+    cache = cache or SignatureScanCache(indicators.digest)
+    findings = {}
+    if not indicators.signature_bytes:
+        return findings, cache
+
+    owners = {}
+    pending = []
+    seen = set()
+    for package, keg_path in kegs:
+        for path, stat_info in iter_files(keg_path):
+            owners[path] = package
+            seen.add(path)
+            found = cache.lookup(path, stat_info)
+            if found is None:
+                pending.append((path, stat_info))
+            else:
+                _add_findings(findings, indicators, package, path, found)
+
+    if pending:
+        stats = dict(pending)
+        paths = [path for path, _ in pending]
+        batches = [paths[i:i + SCAN_BATCH] for i in range(0, len(paths), SCAN_BATCH)]
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                 initializer=_init_worker,
+                                 initargs=(indicators.signature_bytes,)) as executor:
+            for results in executor.map(_scan_batch, batches):
+                for path, found in results:
+                    cache.store(path, stats[path], found)
+                    _add_findings(findings, indicators, owners[path], path, found)
+
+    cache.save(seen)
+    return findings, cache
+
+
+def _add_findings(findings, indicators, package, path, found):
+    for signature in found:
+        reason = indicators.signatures.get(bytes.fromhex(signature), signature)
+        findings.setdefault(package, []).append((path, reason))
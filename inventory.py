@@ -0,0 +1,202 @@
+"""
+Инвентарь Homebrew - список установленных формул и cask'ов без запуска brew
+Читает Cellar/*/<версия>/INSTALL_RECEIPT.json и Caskroom/* напрямую,
+к brew обращается только если структура каталогов не распознана
+"""
+
+import json
+import os
+import re
+import subprocess
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from brew_cache import default_cache, run_brew
+
+# Стандартные префиксы Homebrew: Apple Silicon, Intel, Linux
+DEFAULT_PREFIXES = ["/opt/homebrew", "/usr/local", "/home/linuxbrew/.linuxbrew"]
+
+RECEIPT_FILENAME = "INSTALL_RECEIPT.json"
+
+
+@dataclass
+class InstalledPackage:
+    """Установленная формула или cask"""
+    name: str
+    kind: str = "formula"
+    versions: List[str] = field(default_factory=list)
+    installed_on_request: bool = True
+    runtime_dependencies: List[str] = field(default_factory=list)
+    tap: Optional[str] = None
+    size: Optional[int] = None
+    path: Optional[str] = None
+
+    @property
+    def version(self):
+        """Текущая (последняя) установленная версия"""
+        return self.versions[-1] if self.versions else None
+
+
+@dataclass
+class Inventory:
+    """Снимок установленных пакетов"""
+    prefix: Optional[str]
+    formulae: List[InstalledPackage] = field(default_factory=list)
+    casks: List[InstalledPackage] = field(default_factory=list)
+    source: str = "disk"
+
+    @property
+    def cellar(self):
+        return os.path.join(self.prefix, "Cellar") if self.prefix else None
+
+    @property
+    def caskroom(self):
+        return os.path.join(self.prefix, "Caskroom") if self.prefix else None
+
+    @property
+    def formula_names(self):
+        return [pkg.name for pkg in self.formulae]
+
+    @property
+    def cask_names(self):
+        return [pkg.name for pkg in self.casks]
+
+    def get(self, name):
+        """Ищет пакет по имени среди формул и cask'ов"""
+        for pkg in self.formulae + self.casks:
+            if pkg.name == name:
+                return pkg
+        return None
+
+
+_VERSION_PART = re.compile(r'\d+|[a-zA-Z]+')
+# Суффиксы предварительных выпусков идут раньше выпуска, который они предваряют
+PRE_RELEASE_ORDER = {"alpha": 0, "beta": 1, "pre": 2, "rc": 3}
+# Конец версии: младше чисел и прочих букв (1.1.1 < 1.1.1w), но старше pre-release (1.0rc1 < 1.0)
+VERSION_END = (0, 0, "")
+
+
+def version_key(version):
+    """Ключ сортировки версий: числа сравниваются как числа, а не как строки"""
+    parts = []
+    for part in _VERSION_PART.findall(version or ""):
+        if part.isdigit():
+            parts.append((2, int(part), ""))
+        elif part.lower() in PRE_RELEASE_ORDER:
+            parts.append((-1, PRE_RELEASE_ORDER[part.lower()], part.lower()))
+        else:
+            # Прочие буквы (1.1.1w) - выпуск после числовой части
+            parts.append((1, 0, part.lower()))
+    parts.append(VERSION_END)
+    return parts
+
+
+def detect_prefix():
+    """Определяет префикс Homebrew без запуска brew, если это возможно"""
+    candidates = []
+    if os.environ.get("HOMEBREW_PREFIX"):
+        candidates.append(os.environ["HOMEBREW_PREFIX"])
+    candidates.extend(DEFAULT_PREFIXES)
+
+    prefix = None
+    for candidate in candidates:
+        if os.path.isdir(os.path.join(candidate, "Cellar")):
+            prefix = candidate
+            break
+
+    if prefix is None:
+        try:
+            prefix = run_brew(["brew", "--prefix"]).stdout.strip() or None
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return None
+        if prefix is None:
+            return None
+
+    # Изменения в Cellar/Caskroom сбрасывают кеш команд brew
+    default_cache.watch([os.path.join(prefix, "Cellar"), os.path.join(prefix, "Caskroom")])
+    return prefix
+
+
+def _list_subdirs(path):
+    try:
+        with os.scandir(path) as entries:
+            return sorted(entry.name for entry in entries
+                          if entry.is_dir() and not entry.name.startswith('.'))
+    except OSError:
+        return []
+
+
+def _current_version(prefix, name, versions):
+    """Версия, на которую указывает opt-симлинк, иначе самая новая"""
+    try:
+        target = os.readlink(os.path.join(prefix, "opt", name))
+        linked = os.path.basename(os.path.normpath(target))
+        if linked in versions:
+            return linked
+    except OSError:
+        pass
+    return versions[-1]
+
+
+def read_formula(prefix, name):
+    """Строит запись формулы по каталогу в Cellar"""
+    package_path = os.path.join(prefix, "Cellar", name)
+    versions = sorted(_list_subdirs(package_path), key=version_key)
+    package = InstalledPackage(name=name, kind="formula", path=package_path)
+    if not versions:
+        return package
+
+    # Текущая версия идет последней
+    current = _current_version(prefix, name, versions)
+    versions.remove(current)
+    package.versions = versions + [current]
+
+    try:
+        with open(os.path.join(package_path, current, RECEIPT_FILENAME), 'r', encoding='utf-8') as f:
+            receipt = json.load(f)
+    except (OSError, ValueError):
+        return package
+
+    package.installed_on_request = bool(receipt.get("installed_on_request", True))
+    package.runtime_dependencies = [
+        dep.get("full_name", "").split("/")[-1]
+        for dep in receipt.get("runtime_dependencies") or []
+        if isinstance(dep, dict) and dep.get("full_name")
+    ]
+    source = receipt.get("source") or {}
+    package.tap = source.get("tap")
+    return package
+
+
+def read_cask(prefix, token):
+    """Строит запись cask'а по каталогу в Caskroom"""
+    cask_path = os.path.join(prefix, "Caskroom", token)
+    versions = sorted(_list_subdirs(cask_path), key=version_key)
+    return InstalledPackage(name=token, kind="cask", versions=versions, path=cask_path)
+
+
+def _brew_list(kind):
+    """Запасной путь: имена пакетов из brew list"""
+    try:
+        result = run_brew(["brew", "list", f"--{kind}"])
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return []
+    return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+
+def load_inventory(prefix=None):
+    """Читает установленные формулы и cask'и с диска"""
+    prefix = prefix or detect_prefix()
+    inventory = Inventory(prefix=prefix)
+
+    if prefix and os.path.isdir(inventory.cellar):
+        inventory.formulae = [read_formula(prefix, name) for name in _list_subdirs(inventory.cellar)]
+        if os.path.isdir(inventory.caskroom):
+            inventory.casks = [read_cask(prefix, token) for token in _list_subdirs(inventory.caskroom)]
+        return inventory
+
+    # Структура не распознана - спрашиваем brew
+    inventory.source = "brew"
+    inventory.formulae = [InstalledPackage(name=name, kind="formula") for name in _brew_list("formula")]
+    inventory.casks = [InstalledPackage(name=name, kind="cask") for name in _brew_list("cask")]
+    return inventory
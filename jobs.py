@@ -0,0 +1,220 @@
+"""
+Менеджер заданий - одновременное выполнение операций с блокировкой читатель/писатель
+Изменяющие операции выполняются по одной. Read-only операции идут параллельно друг
+с другом; те, что только запускают brew или читают списки пакетов, идут и во время
+изменяющих, а те, что сканируют файлы Cellar и кешируют результат, ждут их завершения.
+Каждое задание получает свое ядро, свой токен отмены и помеченный вывод
+"""
+
+import dataclasses
+import itertools
+import queue
+import threading
+import time
+
+from brew_progress import ProgressEvent
+from homebrew_core import ACCESS_READ, ACCESS_SNAPSHOT, ACCESS_WRITE, operation_access
+from process_engine import add_prefix
+from scheduler import CancelToken
+
+JOB_WAITING = "waiting"
+JOB_RUNNING = "running"
+
+
+class ReadWriteLock:
+    """Блокировка читатель/писатель с приоритетом писателей; ожидание прерывается отменой"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def _wait(self, ready, cancel, on_wait):
+        # Вызывается под self._condition; возвращает False, если ожидание отменено
+        if ready():
+            return True
+        if on_wait is not None:
+            on_wait()
+        unregister = cancel.register(self._wake) if cancel is not None else None
+        try:
+            while not ready():
+                if cancel is not None and cancel.is_set():
+                    return False
+                self._condition.wait()
+            return True
+        finally:
+            if unregister is not None:
+                unregister()
+
+    def _wake(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    def acquire_read(self, cancel=None, on_wait=None):
+        with self._condition:
+            # Ожидающий писатель не пропускает новых читателей, иначе он может ждать бесконечно
+            if not self._wait(lambda: not self._writer and not self._waiting_writers, cancel, on_wait):
+                return False
+            self._readers += 1
+            return True
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            self._condition.notify_all()
+
+    def acquire_write(self, cancel=None, on_wait=None):
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                if not self._wait(lambda: not self._writer and not self._readers, cancel, on_wait):
+                    return False
+                self._writer = True
+                return True
+            finally:
+                self._waiting_writers -= 1
+                self._condition.notify_all()
+
+    def release_write(self):
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+
+class JobOutput:
+    """Вывод задания: пока заданий несколько, строки помечаются именем операции;
+    события прогресса получают id задания"""
+
+    def __init__(self, target, job, manager):
+        self.target = target
+        self.job = job
+        self.manager = manager
+
+    def _tag(self, message):
+        if isinstance(message, ProgressEvent):
+            return dataclasses.replace(message, job=self.job.id)
+        if isinstance(message, str) and self.manager.overlapping():
+            return add_prefix(message, f"[{self.job.operation}] ")
+        return message
+
+    def put(self, message):
+        self.target.put(self._tag(message))
+
+    def put_nowait(self, message):
+        put_nowait = getattr(self.target, "put_nowait", self.target.put)
+        put_nowait(self._tag(message))
+
+
+class Job:
+    """Выполняемая или ожидающая операция"""
+
+    def __init__(self, job_id, operation, description, plan=None):
+        self.id = job_id
+        self.operation = operation
+        self.description = description
+        # Подтвержденный план синхронизации для операции sync
+        self.plan = plan
+        self.access = operation_access(operation)
+        self.status = JOB_WAITING
+        self.cancel_token = CancelToken()
+        self.core = None
+        self.started = time.monotonic()
+        self.ok = None
+        self.data = None
+
+    def cancel(self):
+        self.cancel_token.cancel()
+
+
+class JobManager:
+    """Запускает операции заданиями с учетом их доступа к установке"""
+
+    def __init__(self, output, make_core, on_finish=None):
+        self.output = output
+        # make_core(вывод) -> HomebrewCore для одного задания
+        self.make_core = make_core
+        self.on_finish = on_finish
+        self.lock = ReadWriteLock()
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._mutex = threading.Lock()
+
+    def active(self):
+        with self._mutex:
+            return list(self.jobs.values())
+
+    def overlapping(self):
+        with self._mutex:
+            return len(self.jobs) > 1
+
+    def can_start(self, operation):
+        """Операция не выполняется сейчас, а изменяющая - еще и без другой изменяющей"""
+        access = operation_access(operation)
+        with self._mutex:
+            for job in self.jobs.values():
+                if job.operation == operation:
+                    return False
+                if access == ACCESS_WRITE and job.access == ACCESS_WRITE:
+                    return False
+        return True
+
+    def start(self, operation, description=None, plan=None):
+        """Запускает операцию в отдельном потоке, возвращает Job (или None, если нельзя)"""
+        with self._mutex:
+            if any(job.operation == operation for job in self.jobs.values()):
+                return None
+            job = Job(next(self._ids), operation, description or operation, plan)
+            self.jobs[job.id] = job
+        job.core = self.make_core(JobOutput(self.output, job, self))
+        thread = threading.Thread(target=self._run, args=(job,), name=f"job-{operation}")
+        thread.daemon = True
+        thread.start()
+        return job
+
+    def cancel_all(self):
+        for job in self.active():
+            job.cancel()
+
+    def _acquire(self, job):
+        if job.access == ACCESS_READ:
+            return True
+
+        # Сообщение пишется под блокировкой, поэтому очередь вывода должна принимать его сразу
+        def on_wait():
+            put_nowait = getattr(job.core.output_queue, "put_nowait", job.core.output_queue.put)
+            try:
+                put_nowait(f"⏳ {job.description}: ожидание завершения других операций\n")
+            except queue.Full:
+                pass
+
+        if job.access == ACCESS_SNAPSHOT:
+            return self.lock.acquire_read(job.cancel_token, on_wait)
+        return self.lock.acquire_write(job.cancel_token, on_wait)
+
+    def _release(self, job):
+        if job.access == ACCESS_SNAPSHOT:
+            self.lock.release_read()
+        elif job.access == ACCESS_WRITE:
+            self.lock.release_write()
+
+    def _run(self, job):
+        try:
+            if not self._acquire(job):
+                job.ok = False
+                job.core.output_queue.put(f"⛔ {job.description}: отменено до запуска\n")
+                return
+            try:
+                job.status = JOB_RUNNING
+                job.ok, job.data = job.core.run_operation(job.operation, cancel=job.cancel_token,
+                                                          plan=job.plan)
+            finally:
+                self._release(job)
+        except Exception as e:
+            job.ok = False
+            job.core.output_queue.put(f"❌ Ошибка выполнения: {str(e)}\n")
+        finally:
+            with self._mutex:
+                self.jobs.pop(job.id, None)
+            if self.on_finish:
+                self.on_finish(job)
@@ -0,0 +1,274 @@
+"""
+Журнал запусков - хранилище вывода всех операций между сессиями
+Вывод каждого запуска сжимается и дописывается в конец текущего сегмента (сегменты
+только растут и сменяются по размеру), метаданные запусков и шагов и обратный индекс
+слов хранятся в SQLite. Поиск находит запуски по индексу и распаковывает только их
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from app_paths import data_dir
+
+LOG_DIRNAME = "logs"
+INDEX_FILENAME = "index.sqlite3"
+LOCK_FILENAME = "append.lock"
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+READ_CHUNK = 64 * 1024
+
+_TERM = re.compile(r"\w{2,}")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    operation TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    ok INTEGER,
+    lines INTEGER,
+    segment TEXT,
+    offset INTEGER,
+    length INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs(started);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT,
+    description TEXT,
+    command TEXT,
+    status TEXT,
+    returncode INTEGER,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS steps_run ON steps(run_id);
+CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER NOT NULL,
+    run_id INTEGER NOT NULL,
+    PRIMARY KEY (term_id, run_id)
+) WITHOUT ROWID;
+"""
+
+
+def terms_of(text):
+    """Слова текста в нижнем регистре, как они попадают в индекс"""
+    return set(_TERM.findall(text.lower()))
+
+
+def log_dir():
+    """Каталог журнала: HOMEBREW_MANAGER_LOG_DIR или logs в каталоге данных"""
+    path = os.environ.get("HOMEBREW_MANAGER_LOG_DIR") or os.path.join(data_dir(), LOG_DIRNAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class RunRecorder:
+    """Записывает вывод одного запуска; сжатие идет по мере поступления вывода"""
+
+    def __init__(self, store, operation):
+        self.store = store
+        self.operation = operation
+        self.started = time.time()
+        self.lines = 0
+        self.terms = terms_of(operation)
+        self.steps = []
+        self._compressor = zlib.compressobj(6)
+        self._chunks = []
+        self._partial = ""
+        # Параллельные шаги пишут вывод из разных потоков
+        self._lock = threading.Lock()
+
+    def put(self, text):
+        if not isinstance(text, str):
+            return
+        with self._lock:
+            self.lines += text.count("\n")
+            # Слово может оказаться разрезанным между двумя вызовами put
+            self._partial += text
+            head, sep, tail = self._partial.rpartition("\n")
+            if sep:
+                self.terms.update(terms_of(head))
+                self._partial = tail
+            self._chunks.append(self._compressor.compress(text.encode("utf-8", "replace")))
+
+    def step_finished(self, result):
+        step = result.step
+        command = " ".join(step.brew_command) if step.brew_command else None
+        with self._lock:
+            self.steps.append((step.name, step.description, command, result.status, result.returncode,
+                               round(result.duration, 3)))
+            self.terms.update(terms_of(f"{step.name} {step.description}"))
+
+    def finish(self, ok):
+        """Дописывает запуск в сегмент и индекс, возвращает id запуска"""
+        with self._lock:
+            self.terms.update(terms_of(self._partial))
+            self._chunks.append(self._compressor.flush())
+            blob = b"".join(self._chunks)
+            self._chunks = []
+        return self.store.append(self, blob, ok)
+
+
+class LogStore:
+    """Сегментированное хранилище запусков с обратным индексом"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or log_dir()
+        self.conn = sqlite3.connect(os.path.join(self.directory, INDEX_FILENAME),
+                                    timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def start_run(self, operation):
+        return RunRecorder(self, operation)
+
+    def _segment_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _current_segment(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(".zlog"))
+        if names and os.path.getsize(self._segment_path(names[-1])) < SEGMENT_MAX_BYTES:
+            return names[-1]
+        number = int(names[-1][4:10]) + 1 if names else 1
+        return f"seg-{number:06d}.zlog"
+
+    def append(self, recorder, blob, ok):
+        """Дописывает сжатый вывод в конец сегмента и индексирует запуск"""
+        import fcntl
+
+        # Несколько процессов (GUI и headless) могут писать одновременно
+        with open(os.path.join(self.directory, LOCK_FILENAME), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            segment = self._current_segment()
+            with open(self._segment_path(segment), "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(blob)
+
+            with self.conn:
+                run_id = self.conn.execute(
+                    "INSERT INTO runs (operation, started, finished, ok, lines, segment, offset, length) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (recorder.operation, recorder.started, time.time(), int(bool(ok)), recorder.lines,
+                     segment, offset, len(blob))).lastrowid
+                self.conn.executemany(
+                    "INSERT INTO steps (run_id, name, description, command, status, returncode, duration) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", [(run_id, *step) for step in recorder.steps])
+                self.conn.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)",
+                                      [(term,) for term in recorder.terms])
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO postings (term_id, run_id) "
+                    "SELECT id, ? FROM terms WHERE term = ?", [(run_id, term) for term in recorder.terms])
+        return run_id
+
+    def runs(self, operation=None, limit=50, before=None):
+        """Последние запуски (новые первыми) без чтения их вывода"""
+        query = "SELECT id, operation, started, finished, ok, lines FROM runs WHERE 1 = 1"
+        params = []
+        if operation:
+            query += " AND operation = ?"
+            params.append(operation)
+        if before is not None:
+            query += " AND id < ?"
+            params.append(before)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return [dict(zip(("id", "operation", "started", "finished", "ok", "lines"), row))
+                for row in self.conn.execute(query, params)]
+
+    def steps(self, run_id):
+        rows = self.conn.execute("SELECT name, description, command, status, returncode, duration "
+                                 "FROM steps WHERE run_id = ? ORDER BY rowid", (run_id,))
+        return [dict(zip(("name", "description", "command", "status", "returncode", "duration"), row))
+                for row in rows]
+
+    def iter_lines(self, run_id):
+        """Строки вывода запуска; сжатый блок читается и распаковывается по частям"""
+        row = self.conn.execute("SELECT segment, offset, length FROM runs WHERE id = ?",
+                                (run_id,)).fetchone()
+        if row is None:
+            return
+        segment, offset, length = row
+        decompressor = zlib.decompressobj()
+        pending = b""
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                pending += decompressor.decompress(chunk)
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    yield line.decode("utf-8", "replace")
+        pending += decompressor.flush()
+        if pending:
+            yield pending.decode("utf-8", "replace")
+
+    def search(self, query, operation=None, limit=None):
+        """Ищет строки со всеми словами запроса; генератор (запуск, номер строки, строка)"""
+        words = terms_of(query)
+        if not words:
+            return
+        placeholders = ", ".join("?" * len(words))
+        sql = ("SELECT r.id, r.operation, r.started, r.finished, r.ok, r.lines FROM runs r "
+               "JOIN postings p ON p.run_id = r.id JOIN terms t ON t.id = p.term_id "
+               f"WHERE t.term IN ({placeholders})")
+        params = list(words)
+        if operation:
+            sql += " AND r.operation = ?"
+            params.append(operation)
+        sql += " GROUP BY r.id HAVING COUNT(DISTINCT t.term) = ? ORDER BY r.id DESC"
+        params.append(len(words))
+        candidates = self.conn.execute(sql, params).fetchall()
+
+        found = 0
+        for row in candidates:
+            run = dict(zip(("id", "operation", "started", "finished", "ok", "lines"), row))
+            for number, line in enumerate(self.iter_lines(run["id"]), start=1):
+                lowered = line.lower()
+                if all(word in lowered for word in words):
+                    yield run, number, line
+                    found += 1
+                    if limit and found >= limit:
+                        return
+
+
+class TeeOutput:
+    """Приемник вывода, который передает сообщения дальше и записывает их в журнал"""
+
+    def __init__(self, target, recorder):
+        self.target = target
+        self.recorder = recorder
+
+    def put(self, message):
+        self.recorder.put(message)
+        self.target.put(message)
+
+    def put_nowait(self, message):
+        # При заполненной очереди сообщение будет отправлено повторно - в журнал пишем после
+        put_nowait = getattr(self.target, "put_nowait", self.target.put)
+        put_nowait(message)
+        self.recorder.put(message)
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """Общий журнал процесса"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = LogStore()
+        return _default_store
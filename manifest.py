@@ -0,0 +1,285 @@
+"""
+Манифест желаемого состояния - Brewfile и план синхронизации с установкой
+Читаются записи tap, brew и cask в синтаксисе brew bundle (mas, vscode и прочие
+пропускаются); опция pin: true/false закрепляет или открепляет формулу. План строится
+одним проходом по манифесту и инвентарю и содержит только недостающие действия:
+tap, install, upgrade и pin/unpin. Пакеты, установленные не по манифесту, удаляются
+только по явному запросу, как brew bundle cleanup --force
+"""
+
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+from app_paths import data_dir
+
+MANIFEST_FILENAME = "Brewfile"
+
+KIND_TAP = "tap"
+KIND_FORMULA = "formula"
+KIND_CASK = "cask"
+
+ACTION_TAP = "tap"
+ACTION_UNPIN = "unpin"
+ACTION_INSTALL = "install"
+ACTION_UPGRADE = "upgrade"
+ACTION_PIN = "pin"
+ACTION_UNINSTALL = "uninstall"
+
+# Порядок выполнения: открепление до обновления, закрепление после установки и обновления
+ACTION_ORDER = [ACTION_TAP, ACTION_UNPIN, ACTION_INSTALL, ACTION_UPGRADE, ACTION_PIN, ACTION_UNINSTALL]
+ACTION_TITLES = {
+    ACTION_TAP: "Подключение репозиториев",
+    ACTION_UNPIN: "Открепление формул",
+    ACTION_INSTALL: "Установка",
+    ACTION_UPGRADE: "Обновление",
+    ACTION_PIN: "Закрепление формул",
+    ACTION_UNINSTALL: "Удаление пакетов не из манифеста",
+}
+
+# Какие действия должны завершиться успешно до начала действия
+SYNC_DEPENDENCIES = {
+    ACTION_INSTALL: [ACTION_TAP],
+    ACTION_UPGRADE: [ACTION_UNPIN],
+    ACTION_PIN: [ACTION_INSTALL, ACTION_UPGRADE],
+}
+
+# Эти репозитории brew берет из API, подключать их не нужно
+IMPLICIT_TAPS = {"homebrew/core", "homebrew/cask"}
+
+# brew "name", pin: true, args: ["HEAD"]
+_ENTRY = re.compile(r'^(tap|brew|cask)\s+(["\'])([^"\']+)\2\s*(?:,\s*(.*))?$')
+_PIN = re.compile(r'\bpin:\s*(true|false)\b')
+_ARGS = re.compile(r'\bargs:\s*\[([^\]]*)\]')
+_STRING = re.compile(r'["\']([^"\']+)["\']|:(\w+)')
+
+
+def manifest_path():
+    """HOMEBREW_BUNDLE_FILE, Brewfile в каталоге данных или ~/.Brewfile; None, если манифеста нет"""
+    candidates = [os.environ.get("HOMEBREW_BUNDLE_FILE"), os.path.join(data_dir(), MANIFEST_FILENAME),
+                  os.path.join(os.path.expanduser("~"), ".Brewfile")]
+    for path in candidates:
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+
+@dataclass
+class ManifestEntry:
+    """Запись манифеста"""
+    kind: str
+    name: str
+    full_name: str
+    pin: Optional[bool] = None
+    args: List[str] = field(default_factory=list)
+    line: int = 0
+
+
+@dataclass
+class Manifest:
+    """Разобранный Brewfile"""
+    path: Optional[str] = None
+    entries: List[ManifestEntry] = field(default_factory=list)
+    # Строки tap/brew/cask, которые не удалось разобрать: (номер, текст)
+    errors: list = field(default_factory=list)
+
+
+def _strip_comment(line):
+    # Комментарий - # вне кавычек
+    quote = None
+    for index, char in enumerate(line):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "#":
+            return line[:index]
+    return line
+
+
+def parse_brewfile(text, path=None):
+    """Разбирает Brewfile; неизвестные директивы пропускаются"""
+    manifest = Manifest(path=path)
+    for number, raw in enumerate(text.splitlines(), start=1):
+        line = _strip_comment(raw).strip()
+        if not line:
+            continue
+        keyword = line.split(None, 1)[0]
+        if keyword not in ("tap", "brew", "cask"):
+            continue
+        found = _ENTRY.match(line)
+        if found is None:
+            manifest.errors.append((number, raw.strip()))
+            continue
+        keyword, full_name, options = found.group(1), found.group(3), found.group(4) or ""
+        kind = {"tap": KIND_TAP, "brew": KIND_FORMULA, "cask": KIND_CASK}[keyword]
+        # Полное имя user/repo/name: сам пакет - последняя часть
+        name = full_name if kind == KIND_TAP else full_name.split("/")[-1]
+        entry = ManifestEntry(kind, name, full_name, line=number)
+        pin = _PIN.search(options)
+        if pin and kind == KIND_FORMULA:
+            entry.pin = pin.group(1) == "true"
+        args = _ARGS.search(options)
+        if args:
+            entry.args = [f"--{quoted or symbol}" for quoted, symbol in _STRING.findall(args.group(1))]
+        manifest.entries.append(entry)
+    return manifest
+
+
+def load_manifest(path=None):
+    """Читает манифест; None, если его нет"""
+    path = path or manifest_path()
+    if path is None:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_brewfile(f.read(), path)
+
+
+def installed_taps(prefix):
+    """Подключенные репозитории user/repo или None, если каталог Taps не найден"""
+    if not prefix:
+        return None
+    for repository in (prefix, os.path.join(prefix, "Homebrew")):
+        taps_dir = os.path.join(repository, "Library", "Taps")
+        if not os.path.isdir(taps_dir):
+            continue
+        taps = set()
+        for user in os.listdir(taps_dir):
+            try:
+                repos = os.listdir(os.path.join(taps_dir, user))
+            except OSError:
+                continue
+            for repo in repos:
+                taps.add(f"{user}/{repo[len('homebrew-'):] if repo.startswith('homebrew-') else repo}".lower())
+        return taps
+    return None
+
+
+@dataclass
+class SyncAction:
+    """Одно действие плана"""
+    action: str
+    kind: str
+    name: str
+    # Имя для команды brew (user/repo/name) и дополнительные аргументы
+    target: Optional[str] = None
+    args: List[str] = field(default_factory=list)
+    installed_version: Optional[str] = None
+    latest_version: Optional[str] = None
+
+    def to_dict(self):
+        return {key: value for key, value in asdict(self).items() if value not in (None, [])}
+
+
+@dataclass
+class SyncPlan:
+    """Минимальный набор действий, приводящий установку к манифесту"""
+    actions: List[SyncAction] = field(default_factory=list)
+    # Установленные по запросу пакеты не из манифеста, которые можно удалить
+    unmanaged: List[SyncAction] = field(default_factory=list)
+    # Пакеты манифеста с неизвестными зависимостями: пока они есть, формулы не удаляются
+    unresolved: List[str] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.actions)
+
+    def by_action(self):
+        """{действие: [SyncAction]} в порядке выполнения, только непустые"""
+        grouped = {action: [] for action in ACTION_ORDER}
+        for item in self.actions:
+            grouped[item.action].append(item)
+        return {action: items for action, items in grouped.items() if items}
+
+
+def plan_sync(manifest, inventory, outdated=(), pinned=(), taps=None, uninstall=False, dependencies=None):
+    """Сравнивает манифест с инвентарем за один проход и возвращает SyncPlan"""
+    # dependencies - {"formula" или "cask": {имя: [формулы]}} из кеша API и описаний cask'ов:
+    # по ним находятся зависимости пакетов, которые еще не установлены
+    installed = {(package.kind, package.name): package for package in inventory.formulae + inventory.casks}
+    outdated = {(item.kind, item.name): item for item in outdated}
+    pinned = set(pinned)
+    dependencies = dependencies or {}
+    plan = SyncPlan()
+    wanted = set()
+    # Формулы, без которых не обойдутся пакеты манифеста, в том числе устанавливаемые
+    required = []
+
+    def known_deps(kind, name):
+        # None - зависимости неизвестны: пакета нет ни в квитанциях, ни в кеше API
+        package = installed.get((kind, name))
+        if kind == KIND_FORMULA and package is not None:
+            # В квитанции runtime_dependencies уже рекурсивны
+            return package.runtime_dependencies
+        return (dependencies.get(kind) or {}).get(name)
+
+    for entry in manifest.entries:
+        if entry.kind == KIND_TAP:
+            tap = entry.name.lower()
+            # Если подключенные репозитории неизвестны, tap планируется всегда: brew tap идемпотентен,
+            # а без него установки из этого репозитория не пройдут
+            if tap not in IMPLICIT_TAPS and (taps is None or tap not in taps):
+                plan.actions.append(SyncAction(ACTION_TAP, KIND_TAP, entry.name))
+            continue
+
+        key = (entry.kind, entry.name)
+        if key in wanted:
+            continue
+        wanted.add(key)
+        deps = known_deps(entry.kind, entry.name)
+        if deps is None:
+            plan.unresolved.append(entry.name)
+        else:
+            required.extend(deps)
+        package = installed.get(key)
+        if package is None:
+            plan.actions.append(SyncAction(ACTION_INSTALL, entry.kind, entry.name, entry.full_name, entry.args))
+            if entry.pin:
+                plan.actions.append(SyncAction(ACTION_PIN, entry.kind, entry.name))
+            continue
+
+        is_pinned = entry.name in pinned
+        if entry.pin is True and not is_pinned:
+            plan.actions.append(SyncAction(ACTION_PIN, entry.kind, entry.name))
+        elif entry.pin is False and is_pinned:
+            plan.actions.append(SyncAction(ACTION_UNPIN, entry.kind, entry.name))
+        stale = outdated.get(key)
+        # Закрепленная (или закрепляемая) формула не обновляется, как и в brew upgrade
+        if stale is not None and not (entry.pin if entry.pin is not None else is_pinned):
+            plan.actions.append(SyncAction(ACTION_UPGRADE, entry.kind, entry.name,
+                                           installed_version=stale.installed_version,
+                                           latest_version=stale.latest_version))
+
+    # Замыкание: зависимости еще не установленных формул берутся из кеша API
+    needed = set()
+    while required:
+        name = required.pop()
+        if name in needed:
+            continue
+        needed.add(name)
+        deps = known_deps(KIND_FORMULA, name)
+        if deps is None:
+            if name not in plan.unresolved:
+                plan.unresolved.append(name)
+        else:
+            required.extend(dep for dep in deps if dep not in needed)
+
+    # Кандидаты на удаление - только пакеты, поставленные по запросу; зависимости потом уберет autoremove
+    removable = {key for key, package in installed.items()
+                 if key not in wanted and package.installed_on_request
+                 and not (package.kind == KIND_FORMULA and package.name in needed)}
+    # Формулу, которая нужна остающемуся пакету, brew uninstall удалить откажется
+    for key, package in installed.items():
+        if key not in removable and package.kind == KIND_FORMULA:
+            removable.difference_update((KIND_FORMULA, dep) for dep in package.runtime_dependencies)
+    plan.unmanaged = [SyncAction(ACTION_UNINSTALL, kind, name) for kind, name in sorted(removable)]
+
+    if uninstall:
+        # Если зависимости части манифеста неизвестны, формулы не трогаем: они могут ему понадобиться
+        plan.actions.extend(item for item in plan.unmanaged
+                            if item.kind == KIND_CASK or not plan.unresolved)
+
+    order = {action: index for index, action in enumerate(ACTION_ORDER)}
+    plan.actions.sort(key=lambda item: order[item.action])
+    return plan
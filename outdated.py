@@ -0,0 +1,246 @@
+"""
+Поиск устаревших пакетов без сети - сравнение версий из Cellar/Caskroom с индексом
+формул и cask'ов, который Homebrew уже хранит в своем кеше (api/formula.jws.json)
+Из большого файла API строится компактный индекс имя -> последняя версия (и зависимости
+для плана синхронизации), который перестраивается только при изменении исходного файла.
+Если кеша API нет, используется один вызов brew outdated --json=v2
+"""
+
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from app_paths import cache_dir
+from brew_cache import run_brew
+from inventory import load_inventory, version_key
+
+INDEX_FILENAME = "api_index.json"
+INDEX_FORMAT = 2
+API_FILES = {
+    "formula": ("formula.jws.json", "formula.json"),
+    "cask": ("cask.jws.json", "cask.json"),
+}
+
+# auto - кеш API, если он есть, иначе brew; api и brew - только указанный источник
+SOURCE_AUTO = "auto"
+SOURCE_API = "api"
+SOURCE_BREW = "brew"
+
+
+@dataclass
+class OutdatedPackage:
+    """Устаревший пакет"""
+    name: str
+    kind: str = "formula"
+    installed_versions: List[str] = field(default_factory=list)
+    installed_version: Optional[str] = None
+    latest_version: Optional[str] = None
+    pinned: bool = False
+
+    def to_dict(self):
+        return {"name": self.name, "kind": self.kind, "installed_versions": self.installed_versions,
+                "installed_version": self.installed_version, "latest_version": self.latest_version,
+                "pinned": self.pinned}
+
+
+def homebrew_cache_path():
+    """Каталог кеша Homebrew (HOMEBREW_CACHE или стандартное место) без запуска brew"""
+    path = os.environ.get("HOMEBREW_CACHE")
+    if not path:
+        if sys.platform == "darwin":
+            path = os.path.join(os.path.expanduser("~"), "Library", "Caches", "Homebrew")
+        else:
+            xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            path = os.path.join(xdg_cache, "Homebrew")
+    if os.path.isdir(path):
+        return path
+    try:
+        return run_brew(["brew", "--cache"]).stdout.strip() or None
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def find_api_file(kind, brew_cache=None):
+    """Путь к файлу API Homebrew для формул или cask'ов, если он есть"""
+    brew_cache = brew_cache or homebrew_cache_path()
+    if not brew_cache:
+        return None
+    for filename in API_FILES[kind]:
+        path = os.path.join(brew_cache, "api", filename)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _read_api_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    # Подписанный вариант (jws) хранит сам список строкой в payload
+    if isinstance(data, dict) and "payload" in data:
+        data = json.loads(data["payload"])
+    return data
+
+
+def _latest_versions(kind, entries):
+    """Имя -> последняя версия из записей API"""
+    versions = {}
+    for entry in entries:
+        if kind == "formula":
+            stable = (entry.get("versions") or {}).get("stable")
+            if not stable:
+                continue
+            # Ревизия формулы входит в имя каталога кега: 3.1.4_1
+            revision = entry.get("revision") or 0
+            versions[entry["name"]] = f"{stable}_{revision}" if revision else stable
+        else:
+            version = entry.get("version")
+            # Cask'и с версией latest и автообновлением brew outdated тоже пропускает
+            if not version or version == "latest" or entry.get("auto_updates"):
+                continue
+            versions[entry["token"]] = version
+    return versions
+
+
+def _dependencies(kind, entries):
+    """Имя -> формулы, нужные для работы пакета, из записей API (отсутствие имени - пакет неизвестен)"""
+    dependencies = {}
+    for entry in entries:
+        if kind == "formula":
+            name, deps = entry["name"], entry.get("dependencies") or []
+        else:
+            name, deps = entry["token"], (entry.get("depends_on") or {}).get("formula") or []
+            if isinstance(deps, str):
+                deps = [deps]
+        dependencies[name] = [dep.split("/")[-1] for dep in deps]
+    return dependencies
+
+
+class ApiIndex:
+    """Компактный индекс последних версий, производный от кеша API Homebrew"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir(), INDEX_FILENAME)
+        self.data = {}
+        self.rebuilt = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") == INDEX_FORMAT:
+                self.data = data
+        except (OSError, ValueError, AttributeError):
+            self.data = {}
+
+    def versions(self, kind, api_file):
+        """Последние версии из api_file; индекс перестраивается, если файл изменился"""
+        return self._section(kind, api_file)["versions"]
+
+    def dependencies(self, kind, api_file):
+        """Зависимости-формулы из api_file: имя -> список формул"""
+        return self._section(kind, api_file)["dependencies"]
+
+    def _section(self, kind, api_file):
+        stat = os.stat(api_file)
+        signature = [os.path.abspath(api_file), stat.st_mtime_ns, stat.st_size]
+        section = self.data.get(kind)
+        if section and section.get("source") == signature:
+            return section
+
+        entries = _read_api_file(api_file)
+        section = {"source": signature, "versions": _latest_versions(kind, entries),
+                   "dependencies": _dependencies(kind, entries)}
+        self.data[kind] = section
+        self.rebuilt.append(kind)
+        self._save()
+        return section
+
+    def _save(self):
+        self.data["format"] = INDEX_FORMAT
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+def pinned_formulae(prefix):
+    """Имена закрепленных формул (brew pin создает симлинки в var/homebrew/pinned)"""
+    try:
+        return set(os.listdir(os.path.join(prefix, "var", "homebrew", "pinned")))
+    except (OSError, TypeError):
+        return set()
+
+
+def api_dependencies(brew_cache=None):
+    """{формулы или cask'и: {имя: [формулы]}} из кеша API; для вида без файла API - None"""
+    brew_cache = brew_cache or homebrew_cache_path()
+    index = ApiIndex()
+    result = {}
+    for kind in ("formula", "cask"):
+        api_file = find_api_file(kind, brew_cache)
+        try:
+            result[kind] = index.dependencies(kind, api_file) if api_file else None
+        except (OSError, ValueError, KeyError):
+            result[kind] = None
+    return result
+
+
+def compare_installed(packages, latest, pinned=()):
+    """Сравнивает установленные пакеты с последними версиями, возвращает OutdatedPackage"""
+    outdated = []
+    for package in packages:
+        new = latest.get(package.name)
+        if not new or not package.versions:
+            continue
+        installed = max(package.versions, key=version_key)
+        if package.kind == "cask":
+            # У cask'ов нет упорядоченных ревизий: любая другая версия считается новой
+            is_outdated = new not in package.versions
+        else:
+            is_outdated = version_key(installed) < version_key(new)
+        if is_outdated:
+            outdated.append(OutdatedPackage(package.name, package.kind, list(package.versions),
+                                            installed, new, package.name in pinned))
+    return outdated
+
+
+def parse_outdated_json(data):
+    """Разбирает вывод brew outdated --json=v2 в список OutdatedPackage"""
+    outdated = []
+    for kind, key in (("formula", "formulae"), ("cask", "casks")):
+        for item in data.get(key, []):
+            installed = item.get("installed_versions") or []
+            outdated.append(OutdatedPackage(item["name"], kind, list(installed),
+                                            installed[-1] if installed else None,
+                                            item.get("current_version"), bool(item.get("pinned"))))
+    return outdated
+
+
+def outdated_from_brew():
+    """Один вызов brew outdated --json=v2"""
+    result = run_brew(["brew", "outdated", "--json=v2"])
+    return parse_outdated_json(json.loads(result.stdout or "{}"))
+
+
+def find_outdated(inventory=None, source=None):
+    """Возвращает (список OutdatedPackage, источник: api или brew)"""
+    source = source or os.environ.get("HOMEBREW_MANAGER_OUTDATED_SOURCE", SOURCE_AUTO)
+    if source != SOURCE_BREW:
+        brew_cache = homebrew_cache_path()
+        formula_api = find_api_file("formula", brew_cache)
+        if formula_api:
+            inventory = inventory or load_inventory()
+            index = ApiIndex()
+            outdated = compare_installed(inventory.formulae, index.versions("formula", formula_api),
+                                         pinned_formulae(inventory.prefix))
+            cask_api = find_api_file("cask", brew_cache)
+            if cask_api:
+                outdated += compare_installed(inventory.casks, index.versions("cask", cask_api))
+            return outdated, SOURCE_API
+        if source == SOURCE_API:
+            raise FileNotFoundError("кеш API Homebrew не найден")
+    return outdated_from_brew(), SOURCE_BREW
@@ -0,0 +1,138 @@
+"""
+Буфер вывода - ограниченное кольцо последних строк и сжатая история на диске
+Память не растет независимо от длительности сессии: вытесненные строки
+сжимаются блоками во временный файл и доступны для экспорта
+"""
+
+import gzip
+import os
+import tempfile
+
+DEFAULT_MAX_LINES = 5000
+SPOOL_BLOCK_BYTES = 256 * 1024
+
+
+def max_lines_from_env():
+    """Размер буфера из HOMEBREW_MANAGER_MAX_LINES; при некорректном значении - по умолчанию"""
+    try:
+        return int(os.environ.get("HOMEBREW_MANAGER_MAX_LINES", DEFAULT_MAX_LINES))
+    except ValueError:
+        return DEFAULT_MAX_LINES
+
+
+class OutputBuffer:
+    """Кольцевой буфер строк с абсолютной нумерацией"""
+
+    def __init__(self, max_lines=DEFAULT_MAX_LINES):
+        self.max_lines = max(1, max_lines)
+        self._lines = [None] * self.max_lines
+        self._start = 0
+        self._count = 0
+        self._partial = ""
+        self.total_lines = 0
+        self._spool_path = None
+        self._spool_pending = []
+        self._spool_pending_bytes = 0
+        self.spooled_lines = 0
+
+    @property
+    def first_line(self):
+        """Абсолютный номер самой старой строки в памяти"""
+        return self.total_lines - self._count
+
+    def __len__(self):
+        return self._count
+
+    def append(self, text):
+        """Добавляет текст; незавершенная строка дописывается при следующем вызове"""
+        if not text:
+            return
+        parts = (self._partial + text).split("\n")
+        self._partial = parts.pop()
+        for line in parts:
+            self._push(line)
+
+    def _push(self, line):
+        if self._count == self.max_lines:
+            self._spool(self._lines[self._start])
+            self._lines[self._start] = line
+            self._start = (self._start + 1) % self.max_lines
+        else:
+            self._lines[(self._start + self._count) % self.max_lines] = line
+            self._count += 1
+        self.total_lines += 1
+
+    def get_lines(self, start, count):
+        """Строки с абсолютными номерами [start, start + count), включая незавершенную"""
+        start = max(start, self.first_line)
+        end = min(start + count, self.total_lines)
+        result = [self._lines[(self._start + i - self.first_line) % self.max_lines]
+                  for i in range(start, end)]
+        if self._partial and len(result) < count and end == self.total_lines:
+            result.append(self._partial)
+        return result
+
+    def visible_total(self):
+        """Количество строк, доступных для отображения"""
+        return self.total_lines + (1 if self._partial else 0)
+
+    def _spool(self, line):
+        """Складывает вытесненную строку в сжатую историю"""
+        data = line + "\n"
+        self._spool_pending.append(data)
+        self._spool_pending_bytes += len(data)
+        self.spooled_lines += 1
+        if self._spool_pending_bytes >= SPOOL_BLOCK_BYTES:
+            self._flush_spool()
+
+    def _flush_spool(self):
+        if not self._spool_pending:
+            return
+        if self._spool_path is None:
+            fd, self._spool_path = tempfile.mkstemp(prefix="homebrew-manager-", suffix=".log.gz")
+            os.close(fd)
+        # Каждый блок - отдельный gzip-член, gzip.open читает их подряд
+        block = gzip.compress("".join(self._spool_pending).encode("utf-8"))
+        with open(self._spool_path, 'ab') as f:
+            f.write(block)
+        self._spool_pending = []
+        self._spool_pending_bytes = 0
+
+    def iter_history(self):
+        """Вся история сессии: сначала сжатая часть, затем строки в памяти"""
+        self._flush_spool()
+        if self._spool_path:
+            with gzip.open(self._spool_path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    yield line
+        for line in self.get_lines(self.first_line, self._count):
+            yield line + "\n"
+        if self._partial:
+            yield self._partial
+
+    def export(self, path):
+        """Сохраняет всю историю в текстовый файл"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in self.iter_history():
+                f.write(line)
+
+    def clear(self):
+        """Очищает буфер и удаляет сжатую историю"""
+        self._lines = [None] * self.max_lines
+        self._start = 0
+        self._count = 0
+        self._partial = ""
+        self.total_lines = 0
+        self.spooled_lines = 0
+        self._spool_pending = []
+        self._spool_pending_bytes = 0
+        self.close()
+
+    def close(self):
+        """Удаляет временный файл истории"""
+        if self._spool_path:
+            try:
+                os.remove(self._spool_path)
+            except OSError:
+                pass
+            self._spool_path = None
@@ -0,0 +1,100 @@
+"""
+Откачка вывода - забирает сообщения из очереди пачками с ограничением по времени кадра
+Не зависит от tkinter, поэтому пригодна и для замеров без дисплея
+"""
+
+import queue
+import time
+
+FINISHED_MARKER = "COMMAND_FINISHED"
+
+
+def finished_marker(job_id):
+    """Маркер завершения конкретного задания"""
+    return (FINISHED_MARKER, job_id)
+
+# Предел очереди вывода: при заполнении производители ждут, а не раздувают память
+QUEUE_MAX_MESSAGES = 1024
+
+# Бюджет одного тика и интервалы опроса
+FRAME_BUDGET = 0.012
+FAST_INTERVAL_MS = 16
+BUSY_INTERVAL_MS = 50
+IDLE_INTERVAL_MS = 250
+
+
+class OutputPump:
+    """Собирает все ожидающие строки в один блок за тик"""
+
+    def __init__(self, source_queue, frame_budget=FRAME_BUDGET,
+                 fast_interval=FAST_INTERVAL_MS, busy_interval=BUSY_INTERVAL_MS,
+                 idle_interval=IDLE_INTERVAL_MS):
+        self.queue = source_queue
+        self.frame_budget = frame_budget
+        self.fast_interval = fast_interval
+        self.busy_interval = busy_interval
+        self.idle_interval = idle_interval
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Сбрасывает счетчики пропускной способности"""
+        self.lines = 0
+        self.ticks = 0
+        self.render_seconds = 0.0
+        self.started = time.perf_counter()
+        self.last_line_at = self.started
+
+    def drain(self):
+        """Возвращает (текст, завершенные задания - id или None для простого маркера,
+        события прогресса, есть ли еще данные)"""
+        deadline = time.perf_counter() + self.frame_budget
+        chunks = []
+        finished = []
+        events = []
+        backlog = False
+
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if message == FINISHED_MARKER:
+                finished.append(None)
+            elif isinstance(message, tuple) and message[0] == FINISHED_MARKER:
+                finished.append(message[1])
+            elif isinstance(message, str):
+                chunks.append(message)
+            else:
+                events.append(message)
+
+            # Остаток уйдет в следующий тик, чтобы не блокировать интерфейс
+            if time.perf_counter() >= deadline:
+                backlog = not self.queue.empty()
+                break
+
+        return "".join(chunks), finished, events, backlog
+
+    def record(self, text, render_seconds):
+        """Учитывает отрисованный блок в статистике"""
+        if not text:
+            return
+        self.ticks += 1
+        self.lines += text.count("\n")
+        self.render_seconds += render_seconds
+        self.last_line_at = time.perf_counter()
+
+    def next_delay(self, busy, had_output):
+        """Интервал до следующего тика: часто при потоке вывода, редко в простое"""
+        if had_output:
+            return self.fast_interval
+        if busy:
+            return self.busy_interval
+        return self.idle_interval
+
+    def lines_per_second(self):
+        """Пропускная способность: строк в секунду с момента сброса"""
+        elapsed = self.last_line_at - self.started
+        if elapsed <= 0:
+            return 0.0
+        return self.lines / elapsed
@@ -0,0 +1,96 @@
+"""
+Виртуализированная область вывода - в Text материализуется только видимое окно строк
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualOutputView(ttk.Frame):
+    """Область вывода поверх OutputBuffer с собственной прокруткой"""
+
+    def __init__(self, parent, buffer, font=("Courier", 10), height=20):
+        super().__init__(parent)
+        self.buffer = buffer
+        self.top = 0
+        self.follow = True
+        self.rows = height
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.text = tk.Text(self, height=height, font=font, wrap='none')
+        self.text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        self.xscrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.text.xview)
+        self.xscrollbar.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        self.text.configure(xscrollcommand=self.xscrollbar.set)
+
+        self.text.bind("<Configure>", self._on_configure)
+        self.text.bind("<MouseWheel>", self._on_mousewheel)
+        self.text.bind("<Button-4>", lambda event: self.scroll_lines(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_lines(3))
+        self.text.bind("<Prior>", lambda event: self.scroll_lines(-self.rows))
+        self.text.bind("<Next>", lambda event: self.scroll_lines(self.rows))
+
+    def _on_configure(self, event):
+        linespace = max(1, self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace"))
+        rows = max(1, event.height // linespace)
+        if rows != self.rows:
+            self.rows = rows
+            self.refresh()
+
+    def _on_mousewheel(self, event):
+        # На macOS delta маленькая, на Windows кратна 120
+        delta = event.delta if abs(event.delta) < 120 else event.delta // 120
+        self.scroll_lines(-delta * 3)
+        return "break"
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            available = self.buffer.visible_total() - self.buffer.first_line
+            self._set_top(self.buffer.first_line + int(float(args[0]) * available))
+        elif action == "scroll":
+            amount = int(args[0])
+            self.scroll_lines(amount * self.rows if args[1] == "pages" else amount)
+
+    def scroll_lines(self, amount):
+        """Прокручивает на amount строк"""
+        self._set_top(self.top + amount)
+        return "break"
+
+    def _set_top(self, top):
+        total = self.buffer.visible_total()
+        last_top = max(self.buffer.first_line, total - self.rows)
+        self.top = min(max(top, self.buffer.first_line), last_top)
+        # Возврат к концу снова включает автопрокрутку
+        self.follow = self.top >= last_top
+        self.refresh()
+
+    def refresh(self):
+        """Перерисовывает видимое окно"""
+        total = self.buffer.visible_total()
+        first = self.buffer.first_line
+        if self.follow:
+            self.top = max(first, total - self.rows)
+        else:
+            self.top = max(self.top, first)
+
+        lines = self.buffer.get_lines(self.top, self.rows)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+
+        available = max(1, total - first)
+        start = (self.top - first) / available
+        end = (self.top - first + len(lines)) / available
+        self.scrollbar.set(start, min(1.0, end))
+
+    def clear(self):
+        """Очищает буфер и область вывода"""
+        self.buffer.clear()
+        self.top = 0
+        self.follow = True
+        self.refresh()
@@ -0,0 +1,245 @@
+"""
+Движок дочерних процессов - один asyncio-цикл в отдельном потоке обслуживает любое
+число одновременно работающих команд
+Вывод читается блоками до 64 КБ и режется на строки по мере поступления; готовые строки
+блока уходят в приемник одним сообщением. Если приемник - ограниченная очередь и она
+заполнена, чтение приостанавливается, и дочерний процесс упирается в заполненный канал
+Каждая команда запускается в своей группе процессов: при отмене группа получает SIGTERM,
+а по истечении паузы - SIGKILL
+Необязательный parser (например, brew_progress.BrewOutputParser) получает каждый блок:
+в приемник уходит возвращенный им видимый текст, а за ним - события прогресса
+"""
+
+import asyncio
+import codecs
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from command_metrics import wait_with_rusage
+
+READ_CHUNK = 64 * 1024
+# Пауза перед повторной попыткой отдать блок в заполненную очередь
+BACKPRESSURE_DELAY = 0.01
+# Пауза между SIGTERM и SIGKILL при отмене, с
+DEFAULT_KILL_GRACE = 5.0
+
+
+class ProcessCancelled(Exception):
+    """Команда завершена принудительно по отмене"""
+
+    def __init__(self, returncode):
+        super().__init__(f"команда прервана (код: {returncode})")
+        self.returncode = returncode
+
+
+def kill_grace_from_env():
+    """Пауза перед SIGKILL из HOMEBREW_MANAGER_KILL_GRACE"""
+    try:
+        return max(0.0, float(os.environ.get("HOMEBREW_MANAGER_KILL_GRACE", DEFAULT_KILL_GRACE)))
+    except ValueError:
+        return DEFAULT_KILL_GRACE
+
+
+def signal_group(process, sig):
+    """Посылает сигнал группе процессов команды (лидер группы - сам процесс)"""
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+@dataclass
+class ProcessResult:
+    """Итог выполнения дочернего процесса"""
+    returncode: int
+    duration: float
+    rusage: Any = None
+    output: Optional[str] = None
+
+
+class LineSplitter:
+    """Режет поток байтов на строки; \\r и \\r\\n считаются концом строки, как в текстовом режиме"""
+
+    def __init__(self, encoding="utf-8"):
+        self._decoder = codecs.getincrementaldecoder(encoding)("replace")
+        self._pending = ""
+
+    def feed(self, data, final=False):
+        """Возвращает завершенные строки блока одним текстом (пустая строка, если их нет)"""
+        text = self._pending + self._decoder.decode(data, final)
+        carry = ""
+        if not final and text.endswith("\r"):
+            # \r\n может оказаться разрезанным между блоками
+            text, carry = text[:-1], "\r"
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        if final:
+            self._pending = ""
+            return text
+        head, sep, tail = text.rpartition("\n")
+        self._pending = tail + carry
+        return head + sep
+
+
+def add_prefix(text, prefix):
+    """Добавляет префикс к каждой строке блока"""
+    if not prefix or not text:
+        return text
+    return "".join(prefix + line for line in text.splitlines(keepends=True))
+
+
+class ProcessEngine:
+    """Запуск команд с чтением вывода в общем цикле событий"""
+
+    def __init__(self, chunk_size=READ_CHUNK, kill_grace=None):
+        self.chunk_size = chunk_size
+        self.kill_grace = kill_grace_from_env() if kill_grace is None else kill_grace
+        self.active = 0
+        self._loop = None
+        self._reaper = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                thread = threading.Thread(target=self._run_loop, args=(loop, ready),
+                                          name="process-engine", daemon=True)
+                thread.start()
+                ready.wait()
+                # os.wait4 блокирует, поэтому процессы собираются вне цикла
+                self._reaper = ThreadPoolExecutor(thread_name_prefix="process-reaper")
+                self._loop = loop
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop, ready):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def submit(self, argv, sink=None, prefix="", env=None, on_output=None, capture=False, cancel=None,
+               parser=None):
+        """Запускает команду и возвращает concurrent.futures.Future с ProcessResult
+
+        При отмене токена cancel группа процессов завершается, а Future - ProcessCancelled
+        """
+        if cancel is not None and cancel.is_set():
+            raise ProcessCancelled(None)
+        started = time.monotonic()
+        # Процесс создается в вызывающем потоке: ошибки запуска видны сразу, а fork не держит цикл
+        process = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env,
+                                   start_new_session=True)
+        try:
+            loop = self._ensure_loop()
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        return asyncio.run_coroutine_threadsafe(
+            self._pump(process, sink, prefix, on_output, capture, started, cancel, parser), loop)
+
+    def run(self, argv, sink=None, prefix="", env=None, on_output=None, capture=False, cancel=None,
+            parser=None):
+        """Выполняет команду до конца и возвращает ProcessResult"""
+        return self.submit(argv, sink, prefix, env, on_output, capture, cancel, parser).result()
+
+    async def _pump(self, process, sink, prefix, on_output, capture, started, cancel, parser):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=self.chunk_size)
+        transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader),
+                                                    process.stdout)
+        splitter = LineSplitter()
+        captured = [] if capture else None
+        state = {"terminated": False, "kill": None}
+
+        def kill():
+            signal_group(process, signal.SIGKILL)
+            # Канал может держать открытым потомок, покинувший группу
+            transport.close()
+
+        def terminate():
+            if state["terminated"]:
+                return
+            state["terminated"] = True
+            signal_group(process, signal.SIGTERM)
+            state["kill"] = loop.call_later(self.kill_grace, kill)
+
+        unregister = None
+        if cancel is not None:
+            unregister = cancel.register(lambda: loop.call_soon_threadsafe(terminate))
+        self.active += 1
+        try:
+            while True:
+                chunk = await reader.read(self.chunk_size)
+                text = splitter.feed(chunk, final=not chunk)
+                if text:
+                    if on_output is not None:
+                        on_output(text)
+                    if captured is not None:
+                        captured.append(text)
+                    if sink is not None:
+                        events = ()
+                        if parser is not None:
+                            text, events = parser.feed(text)
+                        if text:
+                            await self._deliver(sink, add_prefix(text, prefix))
+                        for event in events:
+                            await self._deliver(sink, event)
+                if not chunk:
+                    break
+        finally:
+            self.active -= 1
+            if unregister is not None:
+                unregister()
+            transport.close()
+        returncode, rusage = await loop.run_in_executor(self._reaper, wait_with_rusage, process)
+        if state["kill"] is not None:
+            state["kill"].cancel()
+        if state["terminated"]:
+            raise ProcessCancelled(returncode)
+        return ProcessResult(returncode, time.monotonic() - started, rusage,
+                             "".join(captured) if captured is not None else None)
+
+    @staticmethod
+    async def _deliver(sink, message):
+        put_nowait = getattr(sink, "put_nowait", None)
+        if put_nowait is None:
+            sink.put(message)
+            return
+        # Пока очередь заполнена, блок не читается дальше - канал процесса заполняется и он ждет
+        while True:
+            try:
+                put_nowait(message)
+                return
+            except queue.Full:
+                await asyncio.sleep(BACKPRESSURE_DELAY)
+
+    def close(self):
+        """Останавливает цикл событий"""
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._reaper.shutdown(wait=False)
+                self._loop = None
+                self._reaper = None
+
+
+_default_engine = None
+_default_lock = threading.Lock()
+
+
+def default_engine():
+    """Общий движок процессов"""
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            _default_engine = ProcessEngine()
+        return _default_engine
@@ -0,0 +1,283 @@
+"""
+Планировщик операций - выполняет шаги с зависимостями (DAG)
+Read-only шаги выполняются параллельно друг с другом и с изменяющими шагами,
+изменяющие шаги - строго по одному. Если шаг завершился с ошибкой,
+зависящие от него шаги пропускаются. Шаг можно ограничить по времени,
+а весь план - отменить
+"""
+
+import os
+import threading
+import time
+
+# Команды brew, которые ничего не меняют в установке
+READ_ONLY_COMMANDS = {
+    '--version', '--prefix', '--cellar', '--cache', '--repository', 'config',
+    'doctor', 'list', 'leaves', 'deps', 'uses', 'info', 'outdated', 'search', 'desc',
+}
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+STATUS_CANCELLED = "cancelled"
+
+# Ограничения времени команд по умолчанию, с; upgrade не ограничен - его длительность
+# зависит от числа пакетов
+DEFAULT_STEP_TIMEOUTS = {"update": 900, "doctor": 600, "cleanup": 1800, "autoremove": 900}
+
+
+def is_read_only(command):
+    """Проверяет, что команда brew не изменяет установку"""
+    return (isinstance(command, (list, tuple)) and len(command) >= 2
+            and os.path.basename(command[0]) == 'brew' and command[1] in READ_ONLY_COMMANDS)
+
+
+def step_timeouts():
+    """Ограничения времени по подкомандам brew с учетом HOMEBREW_MANAGER_STEP_TIMEOUTS (update=300,doctor=60)"""
+    timeouts = dict(DEFAULT_STEP_TIMEOUTS)
+    for item in os.environ.get("HOMEBREW_MANAGER_STEP_TIMEOUTS", "").split(","):
+        name, sep, value = item.partition("=")
+        if not sep:
+            continue
+        try:
+            timeouts[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return timeouts
+
+
+class StepTimeout(Exception):
+    """Шаг не уложился в отведенное время"""
+
+    def __init__(self, timeout):
+        super().__init__(f"превышено время ожидания ({timeout:g} с)")
+        self.timeout = timeout
+
+
+class CancelToken:
+    """Флаг отмены; при отмене вызывает зарегистрированные обработчики (например, завершение процессов)"""
+
+    def __init__(self, parent=None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._detach = parent.register(self.cancel) if parent is not None else None
+
+    def is_set(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def register(self, callback):
+        """Регистрирует обработчик отмены, возвращает функцию для его снятия"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        # Отмена уже произошла
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def detach(self):
+        """Отвязывает токен от родителя"""
+        if self._detach is not None:
+            self._detach()
+            self._detach = None
+
+
+class Step:
+    """Шаг плана: команда brew или функция, возвращающая код возврата"""
+
+    def __init__(self, name, action, description, deps=(), mutating=None, brew_command=None,
+                 timeout=None):
+        self.name = name
+        self.action = action
+        self.description = description
+        self.deps = list(deps)
+        if mutating is None:
+            mutating = not is_read_only(action)
+        self.mutating = mutating
+        # Команда, по которой подбираются советы при ошибке
+        self.brew_command = brew_command or (action if not callable(action) else [])
+        # Ограничение времени в секундах; 0 в настройках снимает ограничение
+        if timeout is None and len(self.brew_command) >= 2:
+            timeout = step_timeouts().get(self.brew_command[1])
+        self.timeout = timeout or None
+
+
+class StepResult:
+    """Результат выполнения шага"""
+
+    def __init__(self, step, status, returncode=None, duration=0.0, error=None):
+        self.step = step
+        self.status = status
+        self.returncode = returncode
+        self.duration = duration
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.status == STATUS_OK
+
+
+def steps_from_commands(commands):
+    """Последовательный план из пар (команда, описание) без зависимостей"""
+    steps = []
+    for index, item in enumerate(commands):
+        if isinstance(item, Step):
+            steps.append(item)
+        else:
+            command, description = item
+            steps.append(Step(f"step{index}", command, description, mutating=True))
+    return steps
+
+
+class Scheduler:
+    """Выполняет план шагов с учетом зависимостей и типа операций"""
+
+    def __init__(self, execute, on_start=None, on_finish=None, max_parallel=4):
+        # execute(step, cancel) получает токен отмены шага
+        self.execute = execute
+        self.on_start = on_start
+        self.on_finish = on_finish
+        self.max_parallel = max(1, max_parallel)
+
+    def run(self, steps, cancel=None):
+        """Выполняет шаги, возвращает список StepResult в порядке объявления"""
+        steps = list(steps)
+        by_name = {step.name: step for step in steps}
+        for step in steps:
+            for dep in step.deps:
+                if dep not in by_name:
+                    raise ValueError(f"Шаг {step.name} зависит от неизвестного шага {dep}")
+
+        cancel = cancel or CancelToken()
+        results = {}
+        running = set()
+        condition = threading.Condition()
+
+        def wake():
+            # Вызывается из потока отмены (в GUI - из потока Tk), поэтому не ждет блокировку:
+            # если она занята, планировщик проснется при завершении выполняющегося шага
+            if condition.acquire(blocking=False):
+                try:
+                    condition.notify_all()
+                finally:
+                    condition.release()
+
+        def finish(result):
+            self._notify_finish(result)
+            with condition:
+                results[result.step.name] = result
+                running.discard(result.step.name)
+                condition.notify_all()
+
+        def worker(step):
+            started = time.monotonic()
+            # У каждого шага свой токен: его отменяет и отмена плана, и таймер шага
+            token = CancelToken(parent=cancel)
+            timer = None
+            if step.timeout:
+                timer = threading.Timer(step.timeout, token.cancel)
+                timer.daemon = True
+                timer.start()
+            returncode, error = None, None
+            try:
+                returncode = self.execute(step, token)
+            except Exception as e:
+                error = e
+            finally:
+                if timer is not None:
+                    timer.cancel()
+                token.detach()
+
+            duration = time.monotonic() - started
+            if error is None and returncode == 0:
+                result = StepResult(step, STATUS_OK, returncode, duration)
+            elif cancel.is_set():
+                result = StepResult(step, STATUS_CANCELLED, returncode, duration)
+            elif token.is_set():
+                result = StepResult(step, STATUS_FAILED, returncode, duration, StepTimeout(step.timeout))
+            else:
+                result = StepResult(step, STATUS_FAILED, returncode, duration, error)
+            finish(result)
+
+        unregister = cancel.register(wake)
+        try:
+            while True:
+                # Обработчики пишут в очередь вывода и могут ждать, поэтому вызываются без блокировки
+                started, finished = [], []
+                with condition:
+                    if len(results) >= len(steps):
+                        break
+                    launched = False
+                    mutating_running = any(by_name[name].mutating for name in running)
+
+                    for step in steps:
+                        if step.name in results or step.name in running:
+                            continue
+
+                        if cancel.is_set():
+                            # После отмены новые шаги не запускаются
+                            results[step.name] = StepResult(step, STATUS_CANCELLED)
+                            finished.append(results[step.name])
+                            launched = True
+                            continue
+
+                        dep_results = [results.get(dep) for dep in step.deps]
+                        if any(r is not None and not r.ok for r in dep_results):
+                            # Предпосылка не выполнена - пропускаем шаг
+                            results[step.name] = StepResult(step, STATUS_SKIPPED)
+                            finished.append(results[step.name])
+                            launched = True
+                            continue
+                        if any(r is None for r in dep_results):
+                            continue
+
+                        if len(running) >= self.max_parallel:
+                            break
+                        if step.mutating and mutating_running:
+                            continue
+
+                        running.add(step.name)
+                        mutating_running = mutating_running or step.mutating
+                        started.append(step)
+                        launched = True
+
+                    if not launched and len(results) < len(steps):
+                        if not running:
+                            raise ValueError("Циклическая зависимость между шагами")
+                        condition.wait()
+
+                for result in finished:
+                    self._notify_finish(result)
+                for step in started:
+                    if self.on_start:
+                        self.on_start(step)
+                    thread = threading.Thread(target=worker, args=(step,))
+                    thread.daemon = True
+                    thread.start()
+        finally:
+            unregister()
+
+        return [results[step.name] for step in steps]
+
+    def _notify_finish(self, result):
+        # Ошибка обработчика не должна останавливать план
+        if self.on_finish:
+            try:
+                self.on_finish(result)
+            except Exception:
+                pass
@@ -0,0 +1,137 @@
+"""
+Кеш размеров кегов - сохраняет результаты сканирования между запусками
+Запись кега действительна, пока не изменились mtime, inode и версия его каталога
+"""
+
+import json
+import os
+
+from app_paths import cache_dir
+
+CACHE_FILENAME = "sizes.json"
+CACHE_FORMAT = 1
+
+
+class SizeCache:
+    """Дисковый кеш размеров, ключ - путь к кегу"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir(), CACHE_FILENAME)
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen = set()
+
+    @classmethod
+    def load(cls, path=None):
+        """Загружает кеш с диска; поврежденный файл просто игнорируется"""
+        cache = cls(path)
+        try:
+            with open(cache.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("format") == CACHE_FORMAT:
+                cache.entries = data.get("kegs", {})
+        except (OSError, ValueError, AttributeError):
+            cache.entries = {}
+        return cache
+
+    @staticmethod
+    def _key(stat_info, version):
+        return [stat_info.st_mtime_ns, stat_info.st_ino, version]
+
+    def lookup(self, keg_path, stat_info, version):
+        """Возвращает (размер, файлы) из кеша или None, если кег изменился"""
+        self._seen.add(keg_path)
+        entry = self.entries.get(keg_path)
+        if entry and entry.get("key") == self._key(stat_info, version):
+            self.hits += 1
+            return entry["size"], entry["files"]
+        self.misses += 1
+        return None
+
+    def store(self, keg_path, stat_info, version, size_bytes, file_count):
+        """Запоминает результат сканирования кега"""
+        self._seen.add(keg_path)
+        self.entries[keg_path] = {
+            "key": self._key(stat_info, version),
+            "size": size_bytes,
+            "files": file_count,
+        }
+
+    def save(self, prune=True):
+        """Атомарно записывает кеш; удаленные кеги выбрасываются"""
+        if prune:
+            self.entries = {k: v for k, v in self.entries.items() if k in self._seen}
+
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"format": CACHE_FORMAT, "kegs": self.entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+def list_kegs(package_path):
+    """Возвращает список (путь, stat, версия) кегов пакета в Cellar"""
+    # opt-симлинк или сам кег (например, путь от brew --prefix) - один кег без версии
+    if os.path.islink(package_path) or os.path.exists(os.path.join(package_path, "INSTALL_RECEIPT.json")):
+        try:
+            return [(package_path, os.stat(package_path), None)]
+        except OSError:
+            return []
+
+    kegs = []
+    try:
+        with os.scandir(package_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    kegs.append((entry.path, entry.stat(follow_symlinks=False), entry.name))
+    except OSError:
+        pass
+    return kegs
+
+
+def scan_with_cache(scanner, cache, targets, on_result=None):
+    """Сканирует пакеты, перечитывая с диска только новые или измененные кеги"""
+    totals = {}
+    remaining = {}
+    pending = []
+    keg_owner = {}
+
+    def finish(package):
+        size_bytes, file_count = totals[package]
+        if on_result:
+            on_result(package, size_bytes, file_count)
+
+    for package, package_path in targets:
+        kegs = list_kegs(package_path)
+        totals[package] = [0, 0]
+        remaining[package] = 0
+
+        for keg_path, stat_info, version in kegs:
+            cached = cache.lookup(keg_path, stat_info, version)
+            if cached is not None:
+                totals[package][0] += cached[0]
+                totals[package][1] += cached[1]
+            else:
+                remaining[package] += 1
+                keg_owner[keg_path] = (package, stat_info, version)
+                pending.append((keg_path, keg_path))
+
+        if remaining[package] == 0:
+            finish(package)
+
+    def on_keg(keg_path, size_bytes, file_count):
+        package, stat_info, version = keg_owner[keg_path]
+        cache.store(keg_path, stat_info, version, size_bytes, file_count)
+        totals[package][0] += size_bytes
+        totals[package][1] += file_count
+        remaining[package] -= 1
+        if remaining[package] == 0:
+            finish(package)
+
+    scanner.scan(pending, on_result=on_keg)
+    cache.save()
+
+    return {package: tuple(value) for package, value in totals.items()}
@@ -0,0 +1,227 @@
+"""
+Сканер размеров Homebrew - параллельный подсчет размеров кегов через os.scandir
+Использует кешированный DirEntry.stat и учитывает каждый inode только один раз.
+Большие деревья (.app cask'ов) делятся на поддеревья и сканируются с бюджетом на пакет
+"""
+
+import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Ограничение пула: сканирование упирается в диск, а не в CPU
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 4) * 2)
+# Бюджет сканирования одного cask'а: огромный .app (Xcode) не задерживает весь отчет
+CASK_MAX_FILES = 100000
+CASK_MAX_BYTES = 20 * 1024 * 1024 * 1024
+
+
+class InodeSet:
+    """Потокобезопасное множество уже учтенных inode"""
+
+    def __init__(self):
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        """Добавляет inode, возвращает False если он уже был учтен"""
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            return True
+
+
+class ScanBudget:
+    """Лимит файлов и байтов на пакет, общий для всех потоков, сканирующих его части"""
+
+    def __init__(self, max_files=None, max_bytes=None):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.files = 0
+        self.bytes = 0
+        self.exceeded = False
+        self._lock = threading.Lock()
+
+    def charge(self, size_bytes, file_count):
+        """Учитывает просканированное, возвращает False, если лимит исчерпан"""
+        with self._lock:
+            self.files += file_count
+            self.bytes += size_bytes
+            if ((self.max_files and self.files >= self.max_files)
+                    or (self.max_bytes and self.bytes >= self.max_bytes)):
+                self.exceeded = True
+            return not self.exceeded
+
+
+def scan_tree(path, seen_inodes=None, budget=None):
+    """Возвращает (размер в байтах, количество файлов) для дерева каталогов"""
+    if seen_inodes is None:
+        seen_inodes = InodeSet()
+
+    total_size = 0
+    file_count = 0
+    charged_size = 0
+    charged_files = 0
+    stack = [path]
+
+    while stack:
+        if budget is not None:
+            # Бюджет списывается по каталогам, а не по файлам - без блокировки на каждый stat
+            within = budget.charge(total_size - charged_size, file_count - charged_files)
+            charged_size, charged_files = total_size, file_count
+            if not within:
+                break
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        # Симлинки не считаем, как и раньше
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        stat_info = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+
+                    # Жесткие ссылки учитываем только один раз
+                    if stat_info.st_nlink > 1:
+                        if not seen_inodes.add((stat_info.st_dev, stat_info.st_ino)):
+                            continue
+
+                    total_size += stat_info.st_size
+                    file_count += 1
+        except OSError:
+            continue
+
+    if budget is not None:
+        budget.charge(total_size - charged_size, file_count - charged_files)
+    return total_size, file_count
+
+
+def split_tree(path, depth, seen_inodes, enough=None):
+    """Раскрывает верхние уровни дерева: (размер и число файлов на них, каталоги глубины depth).
+    Раскрытие останавливается раньше, как только поддеревьев набирается enough"""
+    total_size = 0
+    file_count = 0
+    # Артефакт может быть файлом (например, шрифт); симлинки не считаем, как и в scan_tree
+    try:
+        stat_info = os.lstat(path)
+    except OSError:
+        return 0, 0, []
+    if not stat.S_ISDIR(stat_info.st_mode):
+        if not stat.S_ISREG(stat_info.st_mode) or (
+                stat_info.st_nlink > 1 and not seen_inodes.add((stat_info.st_dev, stat_info.st_ino))):
+            return 0, 0, []
+        return stat_info.st_size, 1, []
+    level = [path]
+    for _ in range(depth):
+        if enough and len(level) >= enough:
+            break
+        deeper = []
+        for current in level:
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                deeper.append(entry.path)
+                                continue
+                            if not entry.is_file(follow_symlinks=False):
+                                continue
+                            stat_info = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if stat_info.st_nlink > 1 and not seen_inodes.add((stat_info.st_dev, stat_info.st_ino)):
+                            continue
+                        total_size += stat_info.st_size
+                        file_count += 1
+            except OSError:
+                continue
+        level = deeper
+    return total_size, file_count, level
+
+
+class SizeScanner:
+    """Параллельно сканирует набор кегов ограниченным пулом потоков"""
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or DEFAULT_WORKERS
+
+    def scan(self, targets, on_result=None):
+        """Сканирует пары (имя, путь), вызывая on_result(имя, размер, файлы) по мере готовности"""
+        results = {}
+        targets = list(targets)
+        if not targets:
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Каждый кег считается отдельно, чтобы результат не зависел от порядка
+            futures = {executor.submit(scan_tree, path): name for name, path in targets}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    size_bytes, file_count = future.result()
+                except OSError:
+                    size_bytes, file_count = 0, 0
+                results[name] = (size_bytes, file_count)
+                if on_result:
+                    on_result(name, size_bytes, file_count)
+
+        return results
+
+    def scan_packages(self, packages, on_result=None, max_files=None, max_bytes=None, split_depth=2):
+        """Сканирует пакеты из нескольких деревьев (имя, [пути]) с бюджетом на пакет.
+        Верхние уровни деревьев раскрываются, и большой пакет (.app) сканируется
+        несколькими потоками; on_result(имя, размер, файлы, частично) - по мере готовности"""
+        results = {}
+        packages = [(name, list(paths)) for name, paths in packages]
+        if not packages:
+            return results
+
+        totals = {}
+        remaining = {}
+        budgets = {}
+
+        def finish(name):
+            size_bytes, file_count = totals[name]
+            results[name] = (size_bytes, file_count, budgets[name].exceeded)
+            if on_result:
+                on_result(name, size_bytes, file_count, budgets[name].exceeded)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            for name, paths in packages:
+                budget = budgets[name] = ScanBudget(max_files, max_bytes)
+                seen_inodes = InodeSet()
+                totals[name] = [0, 0]
+                remaining[name] = 0
+                for path in paths:
+                    # Поддеревьев ровно столько, чтобы занять пул: лишние задания только добавляют накладные расходы
+                    size_bytes, file_count, subtrees = split_tree(path, split_depth, seen_inodes,
+                                                                  enough=self.max_workers)
+                    budget.charge(size_bytes, file_count)
+                    totals[name][0] += size_bytes
+                    totals[name][1] += file_count
+                    remaining[name] += len(subtrees)
+                    for subtree in subtrees:
+                        futures[executor.submit(scan_tree, subtree, seen_inodes, budget)] = name
+                if not remaining[name]:
+                    finish(name)
+
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    size_bytes, file_count = future.result()
+                except OSError:
+                    size_bytes, file_count = 0, 0
+                totals[name][0] += size_bytes
+                totals[name][1] += file_count
+                remaining[name] -= 1
+                if remaining[name] == 0:
+                    finish(name)
+
+        return results
@@ -0,0 +1,180 @@
+"""
+Конвейер обновления пакетов - параллельная загрузка бутылок и последовательная установка
+Загрузки (brew fetch) идут в несколько потоков, установка (brew upgrade <пакет>)
+выполняется по одной и перекрывается с оставшимися загрузками
+Ход обновления передается событиями brew_progress, длительность каждого пакета
+запоминается для оценки оставшегося времени в следующий раз
+"""
+
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from brew_cache import default_cache
+from brew_progress import EVENT_DONE, EVENT_PLAN, BrewOutputParser, PackageTimings, ProgressEvent
+from command_metrics import CommandUsage, default_store
+from error_rules import default_rules
+from process_engine import ProcessCancelled, default_engine
+
+DEFAULT_FETCH_JOBS = 4
+
+# brew не должен запускать автообновление для каждой дочерней команды
+BREW_ENV = {"HOMEBREW_NO_AUTO_UPDATE": "1", "HOMEBREW_NO_ENV_HINTS": "1"}
+
+
+def fetch_jobs_from_env():
+    """Параллелизм загрузок из HOMEBREW_MANAGER_FETCH_JOBS"""
+    try:
+        return max(1, int(os.environ.get("HOMEBREW_MANAGER_FETCH_JOBS", DEFAULT_FETCH_JOBS)))
+    except ValueError:
+        return DEFAULT_FETCH_JOBS
+
+
+def get_outdated(brew="brew"):
+    """Возвращает список (имя, тип, установленная версия, новая версия) устаревших пакетов"""
+    from outdated import parse_outdated_json
+
+    result = subprocess.run([brew, "outdated", "--json=v2"],
+                          capture_output=True, text=True, check=True,
+                          env={**os.environ, **BREW_ENV})
+    # Закрепленные формулы brew upgrade не трогает
+    return [(item.name, item.kind, item.installed_version, item.latest_version)
+            for item in parse_outdated_json(json.loads(result.stdout or "{}")) if not item.pinned]
+
+
+class UpgradePipeline:
+    """Обновляет устаревшие пакеты: загрузки параллельно, установка последовательно"""
+
+    def __init__(self, output_queue, jobs=None, brew="brew", cancel=None):
+        self.output_queue = output_queue
+        self.cancel = cancel
+        self.jobs = jobs or fetch_jobs_from_env()
+        self.brew = brew
+        self.upgraded = []
+        self.failed = []
+        # Суммарные ресурсы всех fetch и upgrade - одна запись метрик "upgrade"
+        self.usage = CommandUsage()
+        self._usage_lock = threading.Lock()
+
+    def _env(self):
+        return {**os.environ, **BREW_ENV}
+
+    def _kind_args(self, kind):
+        return ["--cask"] if kind == "cask" else []
+
+    def fetch(self, name, kind):
+        """Скачивает бутылку пакета, возвращает (код возврата, длительность, вывод)"""
+        result = default_engine().run([self.brew, "fetch", *self._kind_args(kind), name],
+                                      env=self._env(), capture=True, cancel=self.cancel)
+        self._account(result.output, result.rusage)
+        return result.returncode, result.duration, result.output
+
+    def _account(self, output, rusage):
+        # Загрузки идут из нескольких потоков
+        with self._usage_lock:
+            self.usage.add_output(output)
+            self.usage.add_rusage(rusage)
+
+    def pour(self, name, kind, parser=None, classifier=None):
+        """Устанавливает скачанный пакет, транслируя вывод в очередь"""
+        def on_output(text):
+            self._account(text, None)
+            if classifier is not None:
+                classifier.feed(text)
+
+        result = default_engine().run([self.brew, "upgrade", *self._kind_args(kind), name],
+                                      self.output_queue, prefix="   ", env=self._env(), on_output=on_output,
+                                      cancel=self.cancel, parser=parser or BrewOutputParser())
+        self._account("", result.rusage)
+        return result.returncode, result.duration
+
+    def _report_error(self, output=None, classifier=None):
+        """Выводит проблемы, найденные в выводе неудачной команды"""
+        if classifier is None:
+            classifier = default_rules().classifier()
+            classifier.feed(output or "")
+        for line in classifier.report():
+            self.output_queue.put(line)
+
+    def run(self, outdated=None):
+        """Выполняет конвейер; возвращает True, если все пакеты обновлены"""
+        if outdated is None:
+            outdated = get_outdated(self.brew)
+
+        if not outdated:
+            self.output_queue.put("✅ Все пакеты актуальны\n")
+            return True
+
+        total = len(outdated)
+        self.output_queue.put(f"📦 Устаревших пакетов: {total}, параллельных загрузок: {self.jobs}\n")
+        names = [item[0] for item in outdated]
+        timings = PackageTimings()
+        self.output_queue.put(ProgressEvent(EVENT_PLAN, total=total, packages=names,
+                                            estimates=timings.estimates(names)))
+
+        poured = 0
+
+        cancelled = False
+        cancelled_code = None
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                futures = {executor.submit(self.fetch, name, kind): (name, kind, old, new)
+                           for name, kind, old, new in outdated}
+
+                # Установка идет в этом потоке по мере готовности загрузок
+                for future in as_completed(futures):
+                    name, kind, old, new = futures[future]
+                    try:
+                        returncode, duration, fetch_output = future.result()
+                    except OSError as e:
+                        returncode, duration, fetch_output = -1, 0.0, str(e)
+
+                    if returncode != 0:
+                        self.failed.append(name)
+                        self.output_queue.put(f"❌ Загрузка {name} не удалась (код: {returncode})\n")
+                        for line in fetch_output.splitlines()[-5:]:
+                            self.output_queue.put(f"   {line}\n")
+                        self._report_error(fetch_output)
+                        self.output_queue.put(ProgressEvent(EVENT_DONE, name))
+                        continue
+
+                    self.output_queue.put(f"⬇️ {name} загружен за {duration:.1f}с\n")
+
+                    poured += 1
+                    self.output_queue.put(f"🔧 [{poured}/{total}] Установка {name} {old or ''} → {new or ''}\n")
+                    parser = BrewOutputParser()
+                    classifier = default_rules().classifier()
+                    returncode, pour_duration = self.pour(name, kind, parser, classifier)
+                    if name not in parser.done:
+                        # Пакет не установлен или brew не вывел итоговую строку
+                        self.output_queue.put(ProgressEvent(EVENT_DONE, name))
+
+                    if returncode == 0:
+                        self.upgraded.append(name)
+                        timings.record(name, duration + pour_duration)
+                        self.output_queue.put(f"✅ {name} обновлен\n")
+                    else:
+                        self.failed.append(name)
+                        self.output_queue.put(f"❌ {name}: ошибка обновления (код: {returncode})\n")
+                        self._report_error(classifier=classifier)
+        except ProcessCancelled as e:
+            # Незапущенные загрузки завершаются сразу, запущенные процессы уже остановлены
+            cancelled = True
+            cancelled_code = e.returncode
+            self.output_queue.put("⛔ Обновление прервано\n")
+        cancelled = cancelled or (self.cancel is not None and self.cancel.is_set())
+
+        timings.save()
+        default_cache.invalidate()
+        # Прерванный прогон не считается успешным, даже если ни одна установка не упала
+        if cancelled:
+            exit_code = cancelled_code or 1
+        else:
+            exit_code = 1 if self.failed else 0
+        default_store().record([self.brew, "upgrade"], self.usage.stop(), exit_code)
+        self.output_queue.put(f"📋 Обновлено: {len(self.upgraded)}, с ошибками: {len(self.failed)}\n")
+        if self.failed:
+            self.output_queue.put(f"   Не обновлены: {', '.join(self.failed)}\n")
+        return not self.failed and not cancelled